@@ -1,4 +1,4 @@
-# gui_hexagram_predictor.py
+# GUA_hexagram_predictor.py
 # =============================================================
 # 「完整八卦大樂透預測器」
 #  • 以擲銅錢法 (三枚) 起一卦，6 爻決定本卦→變卦
@@ -6,13 +6,14 @@
 #  • 對應五行，並依陰陽 (奇偶) 給定選號規則
 #  • 每爻對應 1 顆號碼，共 6 顆；保證互不重複、符合奇偶與五行尾數
 #  • 可選「隨機銅錢」或「指定年月日時 (8 字) 起卦」
-#  • GUI 以 Tkinter 實作，顯示卦象圖、本卦→變卦、六顆預測號碼
+#  • 64 卦→上下卦/五行、(奇偶, 五行) 候選號碼池皆預先建表；
+#    generate_numbers_batch 可一次將 (M×6) 爻值轉為 (M×6) 號碼
+#  • GUI 見 gui_hexagram_predictor.py（本模組不依賴 tkinter）
 # =============================================================
 
-import tkinter as tk
-from tkinter import ttk, messagebox
-import random
 from datetime import datetime
+import numpy as np
+from rng_service import get_rng
 
 # ────────────── 卦象與五行基礎資料 ──────────────
 TRIGRAMS = [
@@ -32,18 +33,63 @@ ELEMENT_TAIL = {
 YIN_NUMS = {n for n in range(1, 50) if n % 2 == 0}
 YANG_NUMS = {n for n in range(1, 50) if n % 2 == 1}
 
+# ────────────── 預算表 ──────────────
+ELEMENTS = ['木', '火', '土', '金', '水']
+# (奇偶 0=陰/1=陽, 五行) → 候選號碼（升冪），不足 5 顆以 0 補齊
+CANDIDATE_POOLS = {
+    (p, e): sorted(n for n in (YANG_NUMS if p else YIN_NUMS) if n % 10 in ELEMENT_TAIL[e])
+    for p in (0, 1) for e in ELEMENTS
+}
+# 每個號碼恰屬一個 (奇偶, 五行) 池；池編號 = 奇偶*5 + 五行索引
+POOL_WIDTH = max(len(v) for v in CANDIDATE_POOLS.values())
+POOL_TABLE = np.zeros((2 * len(ELEMENTS), POOL_WIDTH), dtype=np.int64)
+for (p, e), nums in CANDIDATE_POOLS.items():
+    POOL_TABLE[p * len(ELEMENTS) + ELEMENTS.index(e), :len(nums)] = nums
+POOL_SIZE = (POOL_TABLE > 0).sum(axis=1)
+# 池內已選狀態 (POOL_WIDTH 位元) → 可選數量、第 r 個可選的槽位
+POOL_STATES = 1 << POOL_WIDTH
+POOL_AVAIL = np.zeros((len(POOL_TABLE), POOL_STATES), dtype=np.int64)
+POOL_CHOICE = np.zeros((len(POOL_TABLE), POOL_STATES, POOL_WIDTH), dtype=np.int64)
+for pool in range(len(POOL_TABLE)):
+    for state in range(POOL_STATES):
+        slots = [j for j in range(POOL_SIZE[pool]) if not state >> j & 1]
+        POOL_AVAIL[pool, state] = len(slots)
+        POOL_CHOICE[pool, state, :len(slots)] = slots
+# 同奇偶全部號碼的位元遮罩（第 n 位 = 號碼 n），尾數候選用完時放寬使用
+PARITY_MASKS = np.array([sum(1 << n for n in YIN_NUMS), sum(1 << n for n in YANG_NUMS)],
+                        dtype=np.int64)
+# 號碼 → (池編號, 槽位)
+NUMBER_POOL = np.zeros(50, dtype=np.int64)
+NUMBER_SLOT = np.zeros(50, dtype=np.int64)
+for pool, row in enumerate(POOL_TABLE):
+    for slot, n in enumerate(row[:POOL_SIZE[pool]]):
+        NUMBER_POOL[n], NUMBER_SLOT[n] = pool, slot
+
+# 64 卦：索引第 i 位 = 第 i 爻 (自下而上) 陰陽 → 下卦/上卦名稱與五行索引
+HEXAGRAM_TRIGRAMS = [(TRIGRAMS[h & 7], TRIGRAMS[h >> 3]) for h in range(64)]
+HEX_ELEMENTS = np.array([
+    [ELEMENTS.index(TRI_ELEMENT[lo])] * 3 + [ELEMENTS.index(TRI_ELEMENT[up])] * 3
+    for lo, up in HEXAGRAM_TRIGRAMS
+], dtype=np.int64)   # (64, 6)：每爻所屬卦的五行
+
 # ────────────── 擲銅錢起卦 ──────────────
 # 3 枚銅錢：H=3, T=2 →和 6=老陰,7=少陽,8=少陰,9=老陽
 COIN_MAP = {0: 2, 1: 3}  # 0=tail→2, 1=head→3 (新台幣：字面=tail)
 
 
-def toss_line() -> int:
-    return sum(random.choice([2, 3]) for _ in range(3))
+def toss_line(rng: np.random.Generator | None = None) -> int:
+    return int(get_rng(rng).choice([2, 3], size=3).sum())
 
 
-def auto_hexagram() -> list[int]:
+def auto_hexagram(rng: np.random.Generator | None = None) -> list[int]:
     """產生 6 爻 (自下而上)"""
-    return [toss_line() for _ in range(6)]
+    rng = get_rng(rng)
+    return [toss_line(rng) for _ in range(6)]
+
+
+def auto_hexagram_batch(m: int, rng: np.random.Generator | None = None) -> np.ndarray:
+    """一次擲 m 卦，回傳 (m,6) 爻值；三枚銅錢和 = 6 + 正面數"""
+    return 6 + get_rng(rng).binomial(3, 0.5, size=(m, 6))
 
 
 # ────────────── 八字時間起卦 (梅花易數簡化) ──────────────
@@ -70,97 +116,87 @@ def datetime_hexagram(dt: datetime) -> list[int]:
 
 # ────────────── 卦象工具 ──────────────
 
+def hexagram_index(lines) -> int:
+    # 第 i 爻陰陽 (陰=0,陽=1) 為第 i 位；低 3 位為下卦、高 3 位為上卦 (道家順序)
+    return sum((x % 2) << i for i, x in enumerate(lines))
+
+
 def lines_to_trigrams(lines: list[int]):
-    # 0–2 下卦，3–5 上卦, 取陰陽二進制 0/1 (陰=0,陽=1)
-    def tri_index(seg):
-        bits = [(1 if x % 2 == 1 else 0) for x in seg]
-        return bits[0] + bits[1]*2 + bits[2]*4  # 道家順序
-    lower = tri_index(lines[:3])
-    upper = tri_index(lines[3:])
-    return TRIGRAMS[lower], TRIGRAMS[upper]
+    # 0–2 下卦，3–5 上卦
+    return HEXAGRAM_TRIGRAMS[hexagram_index(lines)]
 
 
 # ────────────── 號碼生成規則 ──────────────
 
-def pick_number(pool, used, element):
+def pick_number(pool, used, element, rng: np.random.Generator | None = None):
     candidates = [n for n in pool if (n not in used) and (n % 10 in ELEMENT_TAIL[element])]
     if not candidates:
         # 放寬尾數限制
         candidates = [n for n in pool if n not in used]
-    return random.choice(candidates)
+    return int(get_rng(rng).choice(candidates))
 
 
-def generate_numbers(lines):
+def generate_numbers(lines, rng: np.random.Generator | None = None):
     """根據 6 爻陰陽 + 卦象五行產生 6 顆互不重複號碼"""
-    lower_tri, upper_tri = lines_to_trigrams(lines)
+    rng = get_rng(rng)
+    elems = HEX_ELEMENTS[hexagram_index(lines)]
     numbers = []
     for idx, v in enumerate(lines):
-        parity_pool = YANG_NUMS if v % 2 == 1 else YIN_NUMS
-        trigram = lower_tri if idx < 3 else upper_tri
-        elem = TRI_ELEMENT[trigram]
-        num = pick_number(parity_pool, numbers, elem)
-        numbers.append(num)
+        pool = CANDIDATE_POOLS[(v % 2, ELEMENTS[elems[idx]])]
+        candidates = [n for n in pool if n not in numbers]
+        if not candidates:
+            # 放寬尾數限制
+            parity_pool = YANG_NUMS if v % 2 == 1 else YIN_NUMS
+            candidates = [n for n in parity_pool if n not in numbers]
+        numbers.append(int(rng.choice(candidates)))
     return sorted(numbers)
 
-# ────────────── GUI ──────────────
-class HexagramGUI(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title('完整八卦預測器')
-        self.geometry('420x480')
-        self.lines = []
-        self.create_widgets()
-
-    def create_widgets(self):
-        frm = ttk.Frame(self)
-        frm.pack(pady=10)
-        ttk.Button(frm, text='隨機擲卦', command=self.random_hexagram).grid(row=0, column=0, padx=5)
-        ttk.Button(frm, text='以當前時間起卦', command=self.datetime_hexagram).grid(row=0, column=1, padx=5)
-        ttk.Button(frm, text='重新選號', command=self.refresh_numbers).grid(row=0, column=2, padx=5)
-
-        self.hex_text = tk.Text(self, height=8, width=40, state='disabled', font=('Consolas', 12))
-        self.hex_text.pack(pady=10)
-        self.num_var = tk.StringVar()
-        ttk.Label(self, text='預測號碼', font=('Arial', 12)).pack()
-        ttk.Label(self, textvariable=self.num_var, font=('Consolas', 20)).pack(pady=10)
-
-    # 事件
-    def random_hexagram(self):
-        self.lines = auto_hexagram()
-        self.display_hexagram()
-        self.generate_and_show()
-
-    def datetime_hexagram(self):
-        self.lines = datetime_hexagram(datetime.now())
-        self.display_hexagram()
-        self.generate_and_show()
-
-    def refresh_numbers(self):
-        if not self.lines:
-            messagebox.showinfo('提示', '請先起卦')
-            return
-        self.generate_and_show()
-
-    # Helper
-    def display_hexagram(self):
-        self.hex_text.configure(state='normal'); self.hex_text.delete('1.0', tk.END)
-        lines_disp = []
-        symbols = {6:'⚋ x', 7:'⚊', 8:'⚋', 9:'⚊ x'}
-        for v in self.lines[::-1]:  # 高爻在上
-            lines_disp.append(symbols[v])
-        lower, upper = lines_to_trigrams(self.lines)
-        self.hex_text.insert(tk.END, '\n'.join(lines_disp) + f"\n上卦: {upper}  下卦: {lower}\n")
-        self.hex_text.configure(state='disabled')
-
-    def generate_and_show(self):
-        nums = generate_numbers(self.lines)
-        self.num_var.set('  '.join(f"{n:02d}" for n in nums))
+
+def generate_numbers_batch(lines, rng: np.random.Generator | None = None) -> np.ndarray:
+    """批次版 generate_numbers：(M,6) 爻值 → (M,6) 升冪號碼，規則與機率分布相同
+
+    已選號碼依所屬候選池記錄為「池編號*POOL_WIDTH + 槽位」位元，
+    每爻只需取出該池 5 位元狀態，再查 POOL_AVAIL / POOL_CHOICE 即可均勻抽選；
+    候選池用完的少數列才退回同奇偶全池。
+    """
+    rng = get_rng(rng)
+    lines = np.asarray(lines, dtype=np.int64).reshape(-1, 6)
+    m = len(lines)
+    parity = lines % 2
+    hexes = parity[:, 0] | parity[:, 1] << 1 | parity[:, 2] << 2 | parity[:, 3] << 3 \
+        | parity[:, 4] << 4 | parity[:, 5] << 5
+    pools = parity * len(ELEMENTS) + HEX_ELEMENTS[hexes]               # (M,6)
+    avail_flat = POOL_AVAIL.ravel()
+    choice_flat = POOL_CHOICE.ravel()
+    table_flat = POOL_TABLE.ravel()
+    used = np.zeros(m, dtype=np.int64)
+    out = np.empty((m, 6), dtype=np.int64)
+    u = rng.random((m, 6))
+    state_mask = (1 << POOL_WIDTH) - 1
+    for i in range(6):
+        pool = pools[:, i]
+        shift = pool * POOL_WIDTH
+        idx = pool * POOL_STATES + ((used >> shift) & state_mask)
+        count = np.take(avail_flat, idx)
+        r = np.minimum((u[:, i] * count).astype(np.int64), POOL_WIDTH - 1)
+        slot = np.take(choice_flat, idx * POOL_WIDTH + r)
+        pick = np.take(table_flat, shift + slot)
+        empty = np.flatnonzero(count == 0)
+        if empty.size:
+            # 放寬尾數限制：同奇偶全池
+            taken = (np.int64(1) << out[empty, :i]).sum(axis=1)
+            free = PARITY_MASKS[parity[empty, i]] & ~taken
+            bits = ((free[:, None] >> np.arange(50)) & 1).astype(bool)
+            k = (u[empty, i] * bits.sum(axis=1)).astype(np.int64)
+            pick[empty] = (np.cumsum(bits, axis=1) > k[:, None]).argmax(axis=1)
+            slot[empty] = NUMBER_SLOT[pick[empty]]
+            shift[empty] = NUMBER_POOL[pick[empty]] * POOL_WIDTH
+        out[:, i] = pick
+        used |= np.int64(1) << (shift + slot)
+    out.sort(axis=1)
+    return out
 
 
 if __name__ == '__main__':
-    try:
-        import numpy  # ensure numpy available for randomness consistency (optional)
-    except ImportError:
-        pass
-    app = HexagramGUI()
-    app.mainloop()
+    from gui_hexagram_predictor import HexagramGUI
+    HexagramGUI().mainloop()
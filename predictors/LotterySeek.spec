@@ -6,7 +6,9 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # all_gui 以 importlib 延遲載入各分頁引擎，PyInstaller 無法自動偵測
+    hiddenimports=['GUA_hexagram_predictor', 'mystic_predictor', 'mapping_engine',
+                   'predict', 'QimenZiwei_predictor'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
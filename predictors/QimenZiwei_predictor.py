@@ -1,4 +1,4 @@
-# gui_qimen_ziwei_predictor.py
+# QimenZiwei_predictor.py
 # =============================================================
 # 彩券玄學加強版：奇門遁甲 + 紫微斗數
 # -------------------------------------------------------------
@@ -17,32 +17,22 @@
 #     - 提供 Top-k 與 權重隨機抽法
 # =============================================================
 
-import tkinter as tk
-from tkinter import ttk, messagebox
 from datetime import datetime
 import numpy as np
-import random
+from rng_service import get_rng
+from metrics import timed
+from palace_projection import LOSHU_TO_NUMBERS, LOSHU_PROJECTION, ZIWEI_PROJECTION, project_factors
 
 # ------------------ 映射工具 ------------------
-LOSHU_TO_NUMBERS = {
-    1: [1,10,19,28,37],
-    2: [2,11,20,29,38],
-    3: [3,12,21,30,39],
-    4: [4,13,22,31,40],
-    5: [5,14,23,32,41],
-    6: [6,15,24,33,42],
-    7: [7,16,25,34,43],
-    8: [8,17,26,35,44],
-    9: [9,18,27,36,45],
-}
-# 補 46~49 到中宮 5
-LOSHU_TO_NUMBERS[5] += [46,47,48,49]
+# 洛書 1~9 ×5 →45，46~49 補到中宮 5；紫微宮 (宮index-1)*4+1 起 4 碼
+# 兩者皆以 palace_projection 的投影矩陣表示，boost 即宮位倍率向量
 
 # ------------------ 奇門遁甲簡化 ------------------
 
 QIMEN_DOORS = ['休','生','傷','杜','景','死','驚','開','']  # 開門最吉
 
 
+@timed('weights', source='qimen')
 def qimen_weights(dt: datetime) -> np.ndarray:
     """簡化：
       • 地盤宮 = (年+月+日+時) % 9 +1  (洛書1~9)
@@ -51,20 +41,33 @@ def qimen_weights(dt: datetime) -> np.ndarray:
       • 開/值符 3x, 休/生 2x, 其餘 1x
     """
     num_sum = dt.year + dt.month + dt.day + dt.hour
+    return qimen_weights_from_sums(np.array([num_sum]))[0]
+
+
+def qimen_palace_factors(num_sum: np.ndarray) -> np.ndarray:
+    """(年+月+日+時) 陣列 → 九宮倍率 (K,9)"""
+    num_sum = np.asarray(num_sum)
     palace = num_sum % 9 + 1
     open_palace = (palace + 7) % 9 + 1
     # 簡化休門、生門：palace+1, palace+2
     rest_palace = (palace + 1) % 9 + 1
     growth_palace = (palace + 2) % 9 + 1
-    weights = np.ones(49)
-    def boost(p, factor):
-        for n in LOSHU_TO_NUMBERS[p]:
-            weights[n-1] *= factor
-    boost(palace, 3)
-    boost(open_palace, 3)
-    boost(rest_palace, 2)
-    boost(growth_palace, 2)
-    return weights / weights.sum()
+    factors = np.ones((len(num_sum), 9))
+    rows = np.arange(len(num_sum))
+    for p, factor in ((palace, 3), (open_palace, 3), (rest_palace, 2), (growth_palace, 2)):
+        factors[rows, p - 1] *= factor
+    return factors
+
+
+def qimen_weights_from_sums(num_sum) -> np.ndarray:
+    """批次簡化奇門權重 (K,49)"""
+    weights = project_factors(LOSHU_PROJECTION, qimen_palace_factors(num_sum))
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def qimen_weights_batch(dts) -> np.ndarray:
+    """批次簡化奇門權重；dts 為 datetime 序列"""
+    return qimen_weights_from_sums([dt.year + dt.month + dt.day + dt.hour for dt in dts])
 
 # ------------------ 紫微斗數簡化 ------------------
 
@@ -79,6 +82,7 @@ def year_ganzhi(year:int):
     return gan+zhi
 
 
+@timed('weights', source='ziwei')
 def ziwei_weights(birth: datetime) -> np.ndarray:
     """
     極簡：
@@ -86,73 +90,26 @@ def ziwei_weights(birth: datetime) -> np.ndarray:
       • 年干 mod4 -> 化祿宮 = 命宮+mod
       • 權=+1, 科=+2, 忌=+3 (示例)  ，但只做權重
     """
+    factors = np.ones(12)
     pal_idx = (birth.month + birth.day) % 12 + 1
     transform = (birth.year % 4)  # 0=祿,1=權,2=科,3=忌
-    weights = np.ones(49)
-    # 宮→候選號碼池 (宮index-1)*4+1 作示例
-    def palace_nums(p):
-        base = (p-1)*4+1
-        return list(range(base, min(base+4,50)))
-    # 加權
-    for n in palace_nums(pal_idx):
-        weights[n-1] *= 3  # 命宮最旺
+    # 宮→候選號碼池 (宮index-1)*4+1 作示例，經 ZIWEI_PROJECTION 投影
+    factors[pal_idx-1] *= 3  # 命宮最旺
+    trans_pal = (pal_idx+transform)%12 or 12
     if transform <3:
-        for n in palace_nums((pal_idx+transform)%12 or 12):
-            weights[n-1] *= 2  # 祿權科次旺
+        factors[trans_pal-1] *= 2  # 祿權科次旺
     else:
-        for n in palace_nums((pal_idx+transform)%12 or 12):
-            weights[n-1] *= 0.5  # 忌宮減半
+        factors[trans_pal-1] *= 0.5  # 忌宮減半
+    weights = project_factors(ZIWEI_PROJECTION, factors)
     return weights / weights.sum()
 
 # ------------------ 號碼生成 ------------------
 
-def pick_numbers(prob, k=6):
-    nums = np.random.choice(np.arange(1,50), size=k, replace=False, p=prob)
+def pick_numbers(prob, k=6, rng: np.random.Generator | None = None):
+    nums = get_rng(rng).choice(np.arange(1,50), size=k, replace=False, p=prob)
     return sorted(nums)
 
-# ------------------ GUI ------------------
-class PredictorGUI(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title('奇門遁甲 + 紫微斗數 預測器')
-        self.geometry('480x380')
-        self.create_widgets()
-
-    def create_widgets(self):
-        frm = ttk.Frame(self)
-        frm.pack(pady=8)
-        # 紫微生日輸入
-        ttk.Label(frm, text='出生年月日 (YYYY-MM-DD):').grid(row=0,column=0,sticky='e')
-        self.birth_var = tk.StringVar()
-        ttk.Entry(frm, textvariable=self.birth_var,width=12).grid(row=0,column=1)
-        # 比重
-        ttk.Label(frm, text='奇門 (0~1):').grid(row=1,column=0,sticky='e')
-        self.qm_var = tk.DoubleVar(value=0.5)
-        ttk.Entry(frm, textvariable=self.qm_var,width=6).grid(row=1,column=1,sticky='w')
-        ttk.Label(frm, text='紫微 (補足):').grid(row=1,column=2,sticky='e')
-        # 按鈕
-        ttk.Button(self, text='生成號碼', command=self.on_generate).pack(pady=15)
-        self.output = tk.Text(self,height=10,state='disabled',font=('Consolas',12))
-        self.output.pack(fill='both',expand=True,padx=10)
-
-    def on_generate(self):
-        try:
-            birth = datetime.strptime(self.birth_var.get().strip(), '%Y-%m-%d')
-        except ValueError:
-            messagebox.showerror('格式錯誤','請輸入 YYYY-MM-DD 格式生日'); return
-        alpha = min(max(self.qm_var.get(),0),1)
-        qm_w = qimen_weights(datetime.now())
-        zw_w = ziwei_weights(birth)
-        combined = qm_w*alpha + zw_w*(1-alpha)
-        combined /= combined.sum()
-        nums_top = np.argsort(combined)[-6:][::-1]+1
-        nums_rand = pick_numbers(combined,6)
-        self.output.configure(state='normal'); self.output.delete('1.0',tk.END)
-        self.output.insert(tk.END, f"奇門權重: {alpha:.2f}\n紫微權重: {1-alpha:.2f}\n")
-        self.output.insert(tk.END, f"Top6: {' '.join(f'{n:02d}' for n in nums_top)}\n")
-        self.output.insert(tk.END, f"隨機6: {' '.join(f'{n:02d}' for n in nums_rand)}\n")
-        self.output.configure(state='disabled')
 
 if __name__ == '__main__':
-    import numpy as np
+    from gui_qimen_ziwei_predictor import PredictorGUI
     PredictorGUI().mainloop()
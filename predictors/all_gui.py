@@ -11,47 +11,230 @@ Integrates:
  - 科學權重預測 (predict.py 方法集)
  - 簡易奇門紫微預測 (QimenZiwei_predictor)
 
+啟動只載入 PySide6；各分頁的預測引擎於分頁第一次開啟時在背景載入（TAB_ENGINES），
+以 --profile 啟動可列出各階段耗時（startup_profiler.Timeline）。
+
+各分頁的計算皆在 QThreadPool 背景執行：
+ - 按鈕只在主執行緒讀取輸入，計算函式 (_compute_*) 不碰任何 widget
+ - Worker 以 signal 回報結果 / 進度 / 錯誤；同一分頁再次點擊時，前一個請求標記為取消，
+   其結果即使稍後送達也會被丟棄
+ - 執行中顯示進度列（無進度資訊時為忙碌動畫）
+
 Requirements:
  - Python 3.13+
  - PySide6 (pip install PySide6)
  - 所有 predictor 模組與本檔放同一資料夾
 """
 import sys
+import time
+_T0 = time.perf_counter()                      # 啟動計時起點（--profile）
+import importlib
 import os
+import threading
+import traceback
 from datetime import datetime
-import numpy as np
 
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
 from PySide6.QtWidgets import (
     QApplication, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QTextEdit, QLineEdit, QDoubleSpinBox,
-    QSpinBox, QCheckBox, QComboBox, QMessageBox
+    QSpinBox, QCheckBox, QComboBox, QMessageBox, QProgressBar
 )
+from startup_profiler import Timeline
+# 各分頁的預測引擎（swisseph、lunardate、pandas 等）於分頁第一次開啟時才載入（對照表見 gui_tabs）
+from gui_tabs import TAB_ENGINES
 
-# ----- GUA 卦象預測 -----
-from GUA_hexagram_predictor import auto_hexagram, datetime_hexagram, generate_numbers
+TIMELINE = Timeline('--profile' in sys.argv, origin=_T0)
+_loaded = {}
+_engine_lock = threading.Lock()
 
-# ----- 玄學神秘預測 -----
-from mystic_predictor import generate_combo
 
-# ----- 映射(奇門紫微)預測 -----
-from mapping_engine import (
-    qimen_number_weights, ziwei_number_weights,
-    combine_weights, predict_top, predict_random
-)
+def load_tab(tab: str) -> list:
+    """載入分頁所需模組（已載入則直接回傳）；mystic 一併讀入歷史資料與規則"""
+    with _engine_lock:
+        if tab not in _loaded:
+            with TIMELINE.span(f'分頁 {tab} 載入'):
+                mods = [importlib.import_module(name) for name in TAB_ENGINES[tab]]
+                if tab == 'mystic':
+                    mods[0].get_rules()
+            _loaded[tab] = mods
+        return _loaded[tab]
 
-# ----- 科學權重預測 -----
-from predict import (
-    load_history, frequency_weights, recency_weights,
-    numerology_weights, fibonacci_weights, combine as sc_combine,
-    predict as sc_predict
-)
 
-# ----- 簡易奇門紫微預測 -----
-from QimenZiwei_predictor import (
-    qimen_weights as qz_qimen_weights,
-    ziwei_weights as qz_ziwei_weights,
-    pick_numbers as qz_pick_numbers
-)
+def _engine(tab: str):
+    return load_tab(tab)[0]
+
+# ----- 背景工作 -----
+class Cancelled(Exception):
+    """工作已被新的請求取代"""
+
+
+class WorkerSignals(QObject):
+    # 皆帶請求編號，讓主執行緒判斷是否為最新請求
+    result = Signal(int, object)
+    progress = Signal(int, int, int)      # (請求編號, 已完成, 總數)
+    error = Signal(int, str)
+    finished = Signal(int)
+
+
+class Task:
+    """傳給計算函式的控制物件：回報進度、檢查是否已取消"""
+
+    def __init__(self, request_id: int, signals: WorkerSignals):
+        self.request_id = request_id
+        self.signals = signals
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def progress(self, done: int, total: int):
+        self.check()
+        self.signals.progress.emit(self.request_id, done, total)
+
+
+class Worker(QRunnable):
+    def __init__(self, fn, task: Task, *args):
+        super().__init__()
+        self.fn, self.task, self.args = fn, task, args
+
+    def run(self):
+        t = self.task
+        try:
+            res = self.fn(t, *self.args)
+            if not t.cancelled():
+                t.signals.result.emit(t.request_id, res)
+        except Cancelled:
+            pass
+        except Exception as e:
+            traceback.print_exc()
+            t.signals.error.emit(t.request_id, str(e))
+        finally:
+            t.signals.finished.emit(t.request_id)
+
+
+class TabRunner(QObject):
+    """單一分頁的背景執行器：只保留最新請求，並控制進度列"""
+
+    def __init__(self, parent: QWidget, output: QTextEdit, pool: QThreadPool):
+        super().__init__(parent)
+        self.parent_widget, self.output, self.pool = parent, output, pool
+        self.bar = QProgressBar()
+        self.bar.setVisible(False)
+        self.signals = WorkerSignals()
+        self.signals.result.connect(self._on_result)
+        self.signals.progress.connect(self._on_progress)
+        self.signals.error.connect(self._on_error)
+        self.signals.finished.connect(self._on_finished)
+        self.request_id = 0
+        self.current = None
+        self.formatter = str
+
+    def submit(self, fn, *args, formatter=str):
+        if self.current is not None:
+            self.current.cancel()
+        self.request_id += 1
+        self.current = Task(self.request_id, self.signals)
+        self.formatter = formatter
+        self.bar.setRange(0, 0)               # 忙碌動畫，收到進度後改為百分比
+        self.bar.setVisible(True)
+        self.pool.start(Worker(fn, self.current, *args))
+
+    def _latest(self, request_id: int) -> bool:
+        return request_id == self.request_id
+
+    def preload(self, tab: str):
+        """分頁第一次開啟時在背景載入引擎，期間顯示忙碌動畫、不更動輸出"""
+        self.submit(lambda task: load_tab(tab), formatter=None)
+
+    def _on_result(self, request_id: int, res):
+        if self._latest(request_id) and self.formatter is not None:
+            self.output.setPlainText(self.formatter(res))
+
+    def _on_progress(self, request_id: int, done: int, total: int):
+        if self._latest(request_id):
+            self.bar.setRange(0, total)
+            self.bar.setValue(done)
+
+    def _on_error(self, request_id: int, msg: str):
+        if self._latest(request_id):
+            QMessageBox.critical(self.parent_widget, "錯誤", msg)
+
+    def _on_finished(self, request_id: int):
+        if self._latest(request_id):
+            self.current = None
+            self.bar.setVisible(False)
+
+# ----- 各分頁計算（背景執行緒，不存取 widget） -----
+
+def _compute_hex(task: Task, use_time: bool):
+    gua = _engine('gua')
+    lines = gua.datetime_hexagram(datetime.now()) if use_time else gua.auto_hexagram()
+    return lines, gua.generate_numbers(lines)
+
+
+def _compute_mystic(task: Task, count: int):
+    mystic = _engine('mystic')
+    combos = []
+    step = max(1, count // 100)                 # 進度最多回報約 100 次
+    for i in range(count):
+        task.check()
+        combo = mystic.generate_combo()
+        if not combo:
+            raise ValueError("無法生成符合條件的組合")
+        combos.append(combo)
+        if (i + 1) % step == 0 or i + 1 == count:
+            task.progress(i + 1, count)
+    return combos
+
+
+def _compute_map(task: Task, dt: datetime, tz: float, lon: float, alpha: float, k: int, method: str):
+    me = _engine('map')
+    w_qm = me.qimen_number_weights(datetime.now(), lon)
+    task.check()
+    w_zw = me.ziwei_number_weights(dt, tz)
+    w = me.combine_weights(w_qm, w_zw, alpha)
+    return me.predict_top(w, k) if method == 'top' else me.predict_random(w, k)
+
+
+# 勾選框名稱 → predict.py 的權重函式名稱
+SCI_FUNCS = {'頻率': 'frequency_weights', '時序': 'recency_weights',
+             '數字學': 'numerology_weights', 'Fibonacci': 'fibonacci_weights'}
+
+
+def _compute_sci(task: Task, names: list, k: int, method: str):
+    if not names:
+        raise ValueError("請至少選擇一種方法")
+    sc = _engine('sci')
+    reds = sc.load_history()
+    weights = []
+    for i, name in enumerate(names):
+        func = getattr(sc, SCI_FUNCS[name])
+        weights.append(func(reds) if name in ('頻率', '時序') else func())
+        task.progress(i + 1, len(names))
+    alphas = [1/len(weights)]*len(weights)
+    w = sc.combine(weights, alphas)
+    return sc.predict(w, method, k)
+
+
+def _compute_qz(task: Task, birth: datetime, alpha: float):
+    import numpy as np
+    qz = _engine('qz')
+    qm_w = qz.qimen_weights(datetime.now())
+    zw_w = qz.ziwei_weights(birth)
+    w = qm_w*alpha + zw_w*(1-alpha)
+    w /= w.sum()
+    top6 = np.argsort(w)[-6:][::-1]+1
+    rand6 = qz.pick_numbers(w, 6)
+    return list(top6), rand6
+
 
 class MainGUI(QWidget):
     def __init__(self):
@@ -61,12 +244,34 @@ class MainGUI(QWidget):
         main_layout = QVBoxLayout(self)
         self.tabs = QTabWidget()
         main_layout.addWidget(self.tabs)
+        self.pool = QThreadPool.globalInstance()
+        self.runners = {}          # 分頁代號 → TabRunner，順序與分頁相同
 
         self._init_tab_gua()
         self._init_tab_mystic()
         self._init_tab_map()
         self._init_tab_sci()
         self._init_tab_qz()
+        self.tabs.currentChanged.connect(self._on_tab_changed)
+
+    def _on_tab_changed(self, index: int):
+        tab = list(self.runners)[index]
+        if tab not in _loaded and self.runners[tab].current is None:
+            self.runners[tab].preload(tab)
+
+    def _runner(self, tab: str, layout, output: QTextEdit) -> TabRunner:
+        """建立分頁的背景執行器，進度列放在輸出框上方"""
+        runner = TabRunner(self, output, self.pool)
+        layout.addWidget(runner.bar)
+        layout.addWidget(output)
+        self.runners[tab] = runner
+        return runner
+
+    def closeEvent(self, event):
+        for runner in self.runners.values():
+            if runner.current is not None:
+                runner.current.cancel()
+        super().closeEvent(event)
 
     # Tab: 八卦卦象預測
     def _init_tab_gua(self):
@@ -78,44 +283,37 @@ class MainGUI(QWidget):
         layout.addWidget(btn_rand)
         layout.addWidget(btn_time)
         self.hex_output = QTextEdit(); self.hex_output.setReadOnly(True)
-        layout.addWidget(self.hex_output)
+        self.hex_runner = self._runner('gua', layout, self.hex_output)
         self.tabs.addTab(tab, "八卦預測")
 
+    @staticmethod
+    def _format_hex(res):
+        lines, nums = res
+        return f"爻: {lines}\n預測號碼: {nums}"
+
     def run_hex_random(self):
-        try:
-            lines = auto_hexagram()
-            nums = generate_numbers(lines)
-            self.hex_output.setPlainText(f"爻: {lines}\n預測號碼: {nums}")
-        except Exception as e:
-            QMessageBox.critical(self, "錯誤", str(e))
+        self.hex_runner.submit(_compute_hex, False, formatter=self._format_hex)
 
     def run_hex_time(self):
-        try:
-            lines = datetime_hexagram(datetime.now())
-            nums = generate_numbers(lines)
-            self.hex_output.setPlainText(f"爻: {lines}\n預測號碼: {nums}")
-        except Exception as e:
-            QMessageBox.critical(self, "錯誤", str(e))
+        self.hex_runner.submit(_compute_hex, True, formatter=self._format_hex)
 
     # Tab: 玄學神秘預測
     def _init_tab_mystic(self):
         tab = QWidget(); layout = QVBoxLayout(tab)
+        layout.addWidget(QLabel("注數:"))
+        self.mystic_count = QSpinBox(); self.mystic_count.setRange(1, 10000); self.mystic_count.setValue(1)
+        layout.addWidget(self.mystic_count)
         btn = QPushButton("生成神秘預測")
         btn.clicked.connect(self.run_mystic)
         layout.addWidget(btn)
         self.mystic_output = QTextEdit(); self.mystic_output.setReadOnly(True)
-        layout.addWidget(self.mystic_output)
+        self.mystic_runner = self._runner('mystic', layout, self.mystic_output)
         self.tabs.addTab(tab, "玄學神秘")
 
     def run_mystic(self):
-        try:
-            combo = generate_combo()
-            if combo:
-                self.mystic_output.setPlainText(f"預測號碼: {combo}")
-            else:
-                raise ValueError("無法生成符合條件的組合")
-        except Exception as e:
-            QMessageBox.critical(self, "錯誤", str(e))
+        self.mystic_runner.submit(
+            _compute_mystic, self.mystic_count.value(),
+            formatter=lambda combos: '\n'.join(f"預測號碼: {c}" for c in combos))
 
     # Tab: 映射(奇門紫微)預測
     def _init_tab_map(self):
@@ -148,35 +346,28 @@ class MainGUI(QWidget):
         btn.clicked.connect(self.run_map)
         layout.addWidget(btn)
         self.map_output = QTextEdit(); self.map_output.setReadOnly(True)
-        layout.addWidget(self.map_output)
+        self.map_runner = self._runner('map', layout, self.map_output)
         self.tabs.addTab(tab, "映射預測")
 
     def run_map(self):
         try:
             dt = datetime.strptime(self.map_birth.text(), '%Y-%m-%d %H:%M')
-            tz = self.map_tz.value()
-            lon = self.map_lon.value()
-            alpha = self.map_alpha.value()
-            k = self.map_k.value()
-            w_qm = qimen_number_weights(datetime.now(), lon)
-            w_zw = ziwei_number_weights(dt, tz)
-            w = combine_weights(w_qm, w_zw, alpha)
-            if self.map_method.currentText() == 'top':
-                nums = predict_top(w, k)
-            else:
-                nums = predict_random(w, k)
-            self.map_output.setPlainText(f"預測號碼: {nums}")
-        except Exception as e:
+        except ValueError as e:
             QMessageBox.critical(self, "錯誤", str(e))
+            return
+        self.map_runner.submit(
+            _compute_map, dt, self.map_tz.value(), self.map_lon.value(),
+            self.map_alpha.value(), self.map_k.value(), self.map_method.currentText(),
+            formatter=lambda nums: f"預測號碼: {nums}")
 
     # Tab: 科學權重預測
     def _init_tab_sci(self):
         tab = QWidget(); layout = QVBoxLayout(tab)
         # 方法選擇
         self.sci_checks = {}
-        for name, func in [('頻率', frequency_weights), ('時序', recency_weights), ('數字學', numerology_weights), ('Fibonacci', fibonacci_weights)]:
+        for name in SCI_FUNCS:
             cb = QCheckBox(name); cb.setChecked(True)
-            self.sci_checks[name] = (cb, func)
+            self.sci_checks[name] = cb
             layout.addWidget(cb)
         # 策略
         layout.addWidget(QLabel("策略:"))
@@ -190,26 +381,14 @@ class MainGUI(QWidget):
         btn.clicked.connect(self.run_sci)
         layout.addWidget(btn)
         self.sci_output = QTextEdit(); self.sci_output.setReadOnly(True)
-        layout.addWidget(self.sci_output)
+        self.sci_runner = self._runner('sci', layout, self.sci_output)
         self.tabs.addTab(tab, "科學預測")
 
     def run_sci(self):
-        try:
-            reds = load_history()
-            weights = []
-            for name, (cb, func) in self.sci_checks.items():
-                if cb.isChecked(): weights.append(func(reds))
-            if not weights: raise ValueError("請至少選擇一種方法")
-            alphas = [1/len(weights)]*len(weights)
-            w = sc_combine(weights, alphas)
-            k = self.sci_k.value()
-            if self.sci_method.currentText() == 'top':
-                nums = sc_predict(w, 'top', k)
-            else:
-                nums = sc_predict(w, 'random', k)
-            self.sci_output.setPlainText(f"預測號碼: {nums}")
-        except Exception as e:
-            QMessageBox.critical(self, "錯誤", str(e))
+        names = [name for name, cb in self.sci_checks.items() if cb.isChecked()]
+        self.sci_runner.submit(
+            _compute_sci, names, self.sci_k.value(), self.sci_method.currentText(),
+            formatter=lambda nums: f"預測號碼: {nums}")
 
     # Tab: 簡易奇門紫微
     def _init_tab_qz(self):
@@ -224,25 +403,36 @@ class MainGUI(QWidget):
         btn.clicked.connect(self.run_qz)
         layout.addWidget(btn)
         self.qz_output = QTextEdit(); self.qz_output.setReadOnly(True)
-        layout.addWidget(self.qz_output)
+        self.qz_runner = self._runner('qz', layout, self.qz_output)
         self.tabs.addTab(tab, "簡易奇門紫微")
 
     def run_qz(self):
         try:
             birth = datetime.strptime(self.qz_birth.text(), '%Y-%m-%d')
-            alpha = self.qz_alpha.value()
-            qm_w = qz_qimen_weights(datetime.now())
-            zw_w = qz_ziwei_weights(birth)
-            w = qm_w*alpha + zw_w*(1-alpha)
-            w /= w.sum()
-            top6 = np.argsort(w)[-6:][::-1]+1
-            rand6 = qz_pick_numbers(w, 6)
-            self.qz_output.setPlainText(f"Top6: {list(top6)}\nRandom6: {rand6}")
-        except Exception as e:
+        except ValueError as e:
             QMessageBox.critical(self, "錯誤", str(e))
+            return
+        self.qz_runner.submit(
+            _compute_qz, birth, self.qz_alpha.value(),
+            formatter=lambda res: f"Top6: {res[0]}\nRandom6: {res[1]}")
+
+def _on_shown(window: MainGUI):
+    """事件迴圈第一次執行：主視窗已顯示，接著在背景載入目前分頁的引擎"""
+    TIMELINE.mark('主視窗顯示')
+    window._on_tab_changed(window.tabs.currentIndex())
+    # 歷史檔由爬蟲更新時，共用服務在背景重新載入（科學 / 玄學分頁下次計算即使用新資料）
+    from history_service import get_service
+    get_service().start_watching()
+
 
 if __name__ == '__main__':
+    TIMELINE.mark('模組載入完成')
     app = QApplication(sys.argv)
-    window = MainGUI()
-    window.show()
-    sys.exit(app.exec())
+    with TIMELINE.span('建立主視窗'):
+        window = MainGUI()
+        window.show()
+    QTimer.singleShot(0, lambda: _on_shown(window))
+    code = app.exec()
+    if TIMELINE.enabled:
+        print(TIMELINE.report())
+    sys.exit(code)
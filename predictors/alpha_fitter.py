@@ -0,0 +1,249 @@
+# alpha_fitter.py
+"""
+權重組合比重 α 的最大概似估計
+
+模型：將各權重來源正規化為 1–49 的機率分布 q_s，
+每期開出的 6 顆號碼視為由混合分布 p = Σ α_s·q_s 抽出（忽略不放回），
+以 EM 求使歷史開獎對數概似最大的 α（α ≥ 0、總和 1）。
+
+功能：
+ 1. 依每期開獎「之前」可得的資料建立 (期數 × 來源 × 49) 權重張量，避免前視偏誤
+    - frequency / recency / numerology / fibonacci：與 predict.py 同名函式相同算法
+      （recency 依 predict.recency_weights，以檔案由新到舊的列序計算年齡）
+    - qimen / qimen_simple：開獎時刻的奇門權重（同 backtest.source_weights）
+    - uniform：均勻分布，作為混合的保底成分
+ 2. EM（SQUAREM 加速）：只需取出每期開獎號碼在各來源的機率 (期數×6 × 來源)，整批向量化更新
+ 3. Walk-forward 驗證：依時間切成數段，每段以之前的期數擬合、評估下一段的平均對數概似，
+    並與等比重及均勻分布比較
+ 4. 新增開獎時只計算新的列並以目前 α 為起點續跑 EM（AlphaFitter.add_draws）
+
+換算：predict.combine 使用未正規化的權重，對應比重為 α_s / Σ w_s（to_combine_alphas）；
+mapping_engine.combine_weights 的輸入已正規化，α 可直接使用。
+
+依賴：
+ - numpy, pandas
+ - backtest（load_draws / source_weights）
+
+使用：
+    python alpha_fitter.py --sources frequency recency qimen uniform --folds 5
+"""
+import argparse
+import math
+import numpy as np
+from backtest import load_draws, source_weights
+
+N_NUMBERS = 49
+TICKET_SIZE = 6
+HALF_LIFE = 50.0
+# 各來源與 ε 均勻分布混合，避免機率為 0
+SMOOTHING = 1e-3
+SOURCES = ['frequency', 'recency', 'numerology', 'fibonacci', 'qimen', 'qimen_simple', 'uniform']
+
+# --------- 權重來源（每期只用該期之前的資料） ---------
+
+def _minmax(w: np.ndarray) -> np.ndarray:
+    """逐列 min-max 正規化（同 predict.py）；全列相同時回傳全 1"""
+    lo = w.min(axis=-1, keepdims=True)
+    span = w.max(axis=-1, keepdims=True) - lo
+    return np.where(span > 0, (w - lo) / np.where(span > 0, span, 1.0), 1.0)
+
+
+def _normalize(w: np.ndarray) -> np.ndarray:
+    w = w / w.sum(axis=-1, keepdims=True)
+    return (1 - SMOOTHING) * w + SMOOTHING / N_NUMBERS
+
+
+def _numerology(days: np.ndarray, sigma: float = 8.0) -> np.ndarray:
+    sums = np.array([sum(int(c) for c in str(d).replace('-', '')) for d in days])
+    center = sums % 49 + 1
+    x = np.arange(1, N_NUMBERS + 1)
+    return _minmax(np.exp(-((x[None, :] - center[:, None]) ** 2) / (2 * sigma ** 2)))
+
+
+def _fibonacci() -> np.ndarray:
+    fib = [1, 1]
+    while len(fib) < N_NUMBERS:
+        fib.append(fib[-1] + fib[-2])
+    return _minmax(np.array([f % 49 for f in fib[:N_NUMBERS]], dtype=float))
+
+
+class SourceState:
+    """累積到目前為止的開獎，供逐期計算 frequency / recency"""
+
+    def __init__(self, half_life: float = HALF_LIFE):
+        self.half_life = half_life
+        self.count = 0                          # 已納入的期數
+        self.freq = np.zeros(N_NUMBERS)
+        # predict.recency_weights 的權重為 exp(-(j+1)/h)，j 為由舊到新的序號
+        self.rec = np.zeros(N_NUMBERS)
+
+    def rows(self, local: np.ndarray, reds: np.ndarray, sources: list[str]) -> np.ndarray:
+        """新增各期（由舊到新）的 (n, 來源, 49) 機率，並將其納入狀態"""
+        n = len(reds)
+        onehot = np.zeros((n, N_NUMBERS))
+        np.put_along_axis(onehot, reds - 1, 1.0, axis=1)
+        # 第 i 期之前：狀態 + 本批前 i 期
+        freq = self.freq + np.cumsum(onehot, axis=0) - onehot
+        j = self.count + np.arange(n)
+        decay = np.exp(-(j + 1) / self.half_life)[:, None] * onehot
+        rec = self.rec + np.cumsum(decay, axis=0) - decay
+
+        out = {}
+        if 'frequency' in sources:
+            out['frequency'] = _minmax(freq)
+        if 'recency' in sources:
+            out['recency'] = _minmax(rec)
+        if 'numerology' in sources:
+            out['numerology'] = _numerology(local.astype('datetime64[D]'))
+        if 'fibonacci' in sources:
+            out['fibonacci'] = np.broadcast_to(_fibonacci(), (n, N_NUMBERS))
+        if {'qimen', 'qimen_simple'} & set(sources):
+            out.update(source_weights(local))
+        if 'uniform' in sources:
+            out['uniform'] = np.ones((n, N_NUMBERS))
+
+        self.freq += onehot.sum(axis=0)
+        self.rec += decay.sum(axis=0)
+        self.count += n
+        return np.stack([_normalize(out[s]) for s in sources], axis=1)
+
+
+def drawn_probs(tensor: np.ndarray, reds: np.ndarray) -> np.ndarray:
+    """(D,S,49) 張量 → (D*6, S)：每顆開出號碼在各來源下的機率"""
+    idx = np.broadcast_to((reds - 1)[:, None, :], (len(reds), tensor.shape[1], TICKET_SIZE))
+    x = np.take_along_axis(tensor, idx, axis=2)                      # (D,S,6)
+    return x.transpose(0, 2, 1).reshape(-1, tensor.shape[1])
+
+# --------- EM ---------
+
+def log_likelihood(x: np.ndarray, alphas: np.ndarray) -> float:
+    """每顆號碼的平均對數概似 (nats)"""
+    return float(np.log(x @ alphas).mean()) if len(x) else float('nan')
+
+
+def _em_step(x: np.ndarray, a: np.ndarray) -> np.ndarray:
+    # E：責任值 r = α_s q_s / p；M：α_s = r 的平均
+    a = a * (x / (x @ a)[:, None]).mean(axis=0)
+    return a / a.sum()
+
+
+def fit_alphas(x: np.ndarray, alphas=None, max_iter: int = 2000, tol: float = 1e-12):
+    """EM（SQUAREM 外插加速）求 α；回傳 (α, 每輪的平均對數概似)
+
+    α 貼近邊界 (某些 α_s → 0) 時單純 EM 收斂極慢；每輪以兩步 EM 做外插，
+    外插結果投影回單體後若概似下降則退回兩步 EM 的結果，保證概似單調不減。
+    """
+    s = x.shape[1]
+    a = np.full(s, 1 / s) if alphas is None else np.asarray(alphas, dtype=float).copy()
+    history = [log_likelihood(x, a)]
+    for _ in range(max_iter):
+        a1 = _em_step(x, a)
+        a2 = _em_step(x, a1)
+        r, v = a1 - a, a2 - 2 * a1 + a
+        step = -np.sqrt((r @ r) / (v @ v)) if v @ v > 0 else -1.0
+        cand = np.clip(a - 2 * step * r + step * step * v, 0.0, None)
+        cand = _em_step(x, cand / cand.sum()) if cand.sum() > 0 else a2
+        ll = log_likelihood(x, cand)
+        if not ll >= log_likelihood(x, a2):
+            cand, ll = a2, log_likelihood(x, a2)
+        converged = ll - history[-1] < tol and np.abs(cand - a).max() < 1e-9
+        a = cand
+        history.append(ll)
+        if converged:
+            break
+    return a, history
+
+
+def walk_forward(x: np.ndarray, n_draws: int, folds: int = 5, min_train: int = 200) -> list[dict]:
+    """依時間切段；每段以之前所有期數擬合，評估該段的平均對數概似"""
+    cuts = np.linspace(min_train, n_draws, folds + 1).astype(int)
+    s = x.shape[1]
+    alphas = None
+    uniform = math.log(1 / N_NUMBERS)
+    report = []
+    for lo, hi in zip(cuts[:-1], cuts[1:]):
+        train, test = x[:lo * TICKET_SIZE], x[lo * TICKET_SIZE:hi * TICKET_SIZE]
+        alphas, _ = fit_alphas(train, alphas)                  # 以上一段結果為起點
+        report.append({
+            'train': int(lo), 'test': int(hi - lo), 'alphas': alphas.copy(),
+            'fitted': log_likelihood(test, alphas),
+            'equal': log_likelihood(test, np.full(s, 1 / s)),
+            'uniform': uniform,
+        })
+    return report
+
+# --------- 增量擬合 ---------
+
+class AlphaFitter:
+    """保存歷史機率列與目前 α；新增開獎時只計算新列並續跑 EM"""
+
+    def __init__(self, sources=None, half_life: float = HALF_LIFE):
+        self.sources = list(sources or SOURCES)
+        unknown = set(self.sources) - set(SOURCES)
+        if unknown:
+            raise ValueError(f"未知的權重來源：{sorted(unknown)}")
+        self.state = SourceState(half_life)
+        self.x = np.empty((0, len(self.sources)))
+        self.last = None
+        self.alphas = np.full(len(self.sources), 1 / len(self.sources))
+
+    @classmethod
+    def from_history(cls, path: str = 'lottery_results.xlsx', sources=None, **kw) -> 'AlphaFitter':
+        fitter = cls(sources, **kw)
+        fitter.add_draws(*load_draws(path))
+        return fitter
+
+    def add_draws(self, local: np.ndarray, reds: np.ndarray) -> np.ndarray:
+        """加入新開獎（開獎時刻 datetime64、(n,6) 號碼），只保留比已納入更新的期別"""
+        local = np.asarray(local, dtype='datetime64[m]')
+        reds = np.asarray(reds, dtype=np.int64).reshape(-1, TICKET_SIZE)
+        order = np.argsort(local, kind='stable')
+        local, reds = local[order], reds[order]
+        if self.last is not None:
+            keep = local > self.last
+            local, reds = local[keep], reds[keep]
+        if len(local):
+            rows = self.state.rows(local, reds, self.sources)
+            self.x = np.concatenate([self.x, drawn_probs(rows, reds)])
+            self.last = local[-1]
+            self.alphas, _ = fit_alphas(self.x, self.alphas)
+        return self.alphas
+
+    @property
+    def n_draws(self) -> int:
+        return len(self.x) // TICKET_SIZE
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.sources, self.alphas.tolist()))
+
+    def walk_forward(self, folds: int = 5, min_train: int = 200) -> list[dict]:
+        return walk_forward(self.x, self.n_draws, folds, min_train)
+
+
+def to_combine_alphas(alphas, raw_weights) -> np.ndarray:
+    """α（正規化分布的比重）→ predict.combine 用的比重（輸入為未正規化權重）"""
+    sums = np.array([np.asarray(w, dtype=float).sum() for w in raw_weights])
+    a = np.asarray(alphas, dtype=float) / sums
+    return a / a.sum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='權重組合比重 α 最大概似擬合')
+    parser.add_argument('--history', default='lottery_results.xlsx')
+    parser.add_argument('--sources', nargs='+', default=SOURCES, choices=SOURCES)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--min-train', type=int, default=200)
+    a = parser.parse_args(argv)
+    fitter = AlphaFitter.from_history(a.history, a.sources)
+    print(f"{fitter.n_draws} 期，全期擬合 α：")
+    for name, alpha in fitter.as_dict().items():
+        print(f"  {name:<14}{alpha:.4f}")
+    print(f"\nWalk-forward（每顆號碼平均對數概似，均勻 = {math.log(1 / N_NUMBERS):.5f}）")
+    print(f"{'訓練期數':>8}{'測試期數':>8}{'擬合':>12}{'等比重':>12}{'差值':>10}")
+    for r in fitter.walk_forward(a.folds, a.min_train):
+        print(f"{r['train']:>10}{r['test']:>10}{r['fitted']:>13.5f}{r['equal']:>13.5f}"
+              f"{r['fitted'] - r['uniform']:>+12.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,19 +3,27 @@
 天文曆算核心模組（M1）
 
 功能：
- 1. 公曆 ⇄ 農曆轉換（天文算法 + lunardate）
+ 1. 公曆 ⇄ 農曆轉換（天文算法 + lunardate；1900–2100 逐日查表，支援陣列）
  2. 真太陽時計算
- 3. 24 節氣精確時刻計算
-依賴：pyswisseph, lunardate
+ 3. 24 節氣精確時刻計算（平氣定初值 + 牛頓法修正，1900–2100 預算表磁碟快取）
+ 4. 太陽／月亮黃經批次計算（陣列介面、時間解析度記憶化、解析近似快速模式）
+依賴：pyswisseph, lunardate, numpy, metrics（熱點計時，預設停用）
 """
 import swisseph as swe
 import math
+import os
+import numpy as np
 from datetime import datetime, timedelta
 from lunardate import LunarDate
+from metrics import inc, timed
 
 # 設定瑞士曆書檔案路徑
 # swe.set_ephe_path('/path/to/ephe')
 
+# 預算表快取目錄，可由環境變數 LOTTERY_SEEK_CACHE 覆寫
+CACHE_DIR = os.environ.get('LOTTERY_SEEK_CACHE',
+                           os.path.join(os.path.expanduser('~'), '.lottery_seek'))
+
 # --------- 儒略日與天文計算 ---------
 
 def julian_day(dt: datetime) -> float:
@@ -25,6 +33,11 @@ def julian_day(dt: datetime) -> float:
     return swe.julday(year, month, day, hr)
 
 
+def jd_to_datetime(jd: float) -> datetime:
+    """儒略日轉 naive UTC datetime"""
+    return datetime(1970, 1, 1) + timedelta(days=jd - 2440587.5)
+
+
 def true_solar_time(dt: datetime, lon: float) -> float:
     """計算真太陽時 (Local True Solar Time, 小時)
     lon: 東經正數, 西經負數 (度)
@@ -43,6 +56,7 @@ def true_solar_time(dt: datetime, lon: float) -> float:
     return tse
 
 
+@timed('solar_longitude')
 def solar_longitude(jd: float) -> float:
     """返回太陽視黃經 (度)"""
     return swe.calc_ut(jd, swe.SUN)[0][0]
@@ -52,40 +66,336 @@ def lunar_longitude(jd: float) -> float:
     """返回月亮視黃經 (度)"""
     return swe.calc_ut(jd, swe.MOON)[0][0]
 
+# --------- 批次黃經計算 ---------
+# 快取以 (天體, 量化後時間鍵) 為索引；超過上限時整批清空
+EPHEMERIS_CACHE_SIZE = 1_000_000
+_EPHEMERIS_CACHE = {swe.SUN: {}, swe.MOON: {}}
+
+
+def _longitudes(body: int, jds, resolution, fast_fn, fast: bool) -> np.ndarray:
+    arr = np.asarray(jds, dtype=float)
+    if fast:
+        return fast_fn(arr)
+    if resolution:
+        keys = np.round(arr / resolution).astype(np.int64)
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        times = uniq * resolution
+    else:
+        uniq, inverse = np.unique(arr, return_inverse=True)
+        times = uniq
+    cache = _EPHEMERIS_CACHE[body]
+    if len(cache) + len(uniq) > EPHEMERIS_CACHE_SIZE:
+        cache.clear()
+    vals = np.empty(len(uniq))
+    misses = 0
+    for i, (key, jd) in enumerate(zip(uniq.tolist(), times.tolist())):
+        lon = cache.get((resolution, key))
+        if lon is None:
+            lon = swe.calc_ut(jd, body)[0][0]
+            cache[(resolution, key)] = lon
+            misses += 1
+        vals[i] = lon
+    inc('ephemeris_lookups', len(uniq) - misses, result='hit')
+    inc('ephemeris_lookups', misses, result='miss')
+    return vals[inverse].reshape(arr.shape)
+
+
+def _delta_t_days(jd: np.ndarray) -> np.ndarray:
+    """ΔT 粗略估計 (Morrison & Stephenson 拋物線)，誤差約數十秒，僅供快速模式使用"""
+    u = ((jd - 2451545.0) / 365.25 + 2000 - 1820) / 100
+    return (-20 + 32 * u * u) / 86400.0
+
+
+def _fast_solar_longitude(jd: np.ndarray) -> np.ndarray:
+    """Meeus 第 25 章低精度太陽視黃經"""
+    T = (jd + _delta_t_days(jd) - 2451545.0) / 36525
+    L0 = 280.46646 + 36000.76983 * T + 0.0003032 * T * T
+    M = np.radians(357.52911 + 35999.05029 * T - 0.0001537 * T * T)
+    C = ((1.914602 - 0.004817 * T - 0.000014 * T * T) * np.sin(M)
+         + (0.019993 - 0.000101 * T) * np.sin(2 * M)
+         + 0.000289 * np.sin(3 * M))
+    omega = np.radians(125.04 - 1934.136 * T)
+    return (L0 + C - 0.00569 - 0.00478 * np.sin(omega)) % 360
+
+
+# Meeus 表 47.A 前 25 項：(D, M, M', F, 係數 1e-6 度)
+_MOON_TERMS = np.array([
+    (0, 0, 1, 0, 6288774), (2, 0, -1, 0, 1274027), (2, 0, 0, 0, 658314),
+    (0, 0, 2, 0, 213618), (0, 1, 0, 0, -185116), (0, 0, 0, 2, -114332),
+    (2, 0, -2, 0, 58793), (2, -1, -1, 0, 57066), (2, 0, 1, 0, 53322),
+    (2, -1, 0, 0, 45758), (0, 1, -1, 0, -40923), (1, 0, 0, 0, -34720),
+    (0, 1, 1, 0, -30383), (2, 0, 0, -2, 15327), (0, 0, 1, 2, -12528),
+    (0, 0, 1, -2, 10980), (4, 0, -1, 0, 10675), (0, 0, 3, 0, 10034),
+    (4, 0, -2, 0, 8548), (2, 1, -1, 0, -7888), (2, 1, 0, 0, -6766),
+    (1, 0, -1, 0, -5163), (1, 1, 0, 0, 4987), (2, -1, 1, 0, 4036),
+    (2, 0, 2, 0, 3994),
+], dtype=float)
+
+
+def _fast_lunar_longitude(jd: np.ndarray) -> np.ndarray:
+    """Meeus 第 47 章截斷級數月亮視黃經"""
+    T = (jd + _delta_t_days(jd) - 2451545.0) / 36525
+    Lp = 218.3164477 + 481267.88123421 * T - 0.0015786 * T * T
+    D = 297.8501921 + 445267.1114034 * T - 0.0018819 * T * T
+    M = 357.5291092 + 35999.0502909 * T - 0.0001536 * T * T
+    Mp = 134.9633964 + 477198.8675055 * T + 0.0087414 * T * T
+    F = 93.2720950 + 483202.0175233 * T - 0.0036539 * T * T
+    E = 1 - 0.002516 * T - 0.0000074 * T * T
+    args = np.radians(np.multiply.outer(D, _MOON_TERMS[:, 0])
+                      + np.multiply.outer(M, _MOON_TERMS[:, 1])
+                      + np.multiply.outer(Mp, _MOON_TERMS[:, 2])
+                      + np.multiply.outer(F, _MOON_TERMS[:, 3]))
+    ecc = np.power.outer(E, np.abs(_MOON_TERMS[:, 1]))
+    sigma = (_MOON_TERMS[:, 4] * ecc * np.sin(args)).sum(axis=-1)
+    A1 = np.radians(119.75 + 131.849 * T)
+    A2 = np.radians(53.09 + 479264.290 * T)
+    sigma += 3958 * np.sin(A1) + 1962 * np.sin(np.radians(Lp - F)) + 318 * np.sin(A2)
+    omega = np.radians(125.04452 - 1934.136261 * T)
+    return (Lp + sigma / 1e6 - 0.00478 * np.sin(omega)) % 360
+
+
+def solar_longitudes(jds, resolution: float | None = None, fast: bool = False) -> np.ndarray:
+    """批次太陽視黃經 (度)
+
+    jds: 儒略日 (UT) 純量或陣列，回傳同形狀陣列
+    resolution: 記憶化時間解析度 (日)，例如 1/24 表示同一小時內共用一次星曆計算；
+                None 時僅合併完全相同的 JD
+    fast: 使用 Meeus 解析近似（不呼叫 swisseph），1900–2100 年與 swisseph 相比最大誤差 < 0.015°
+    """
+    return _longitudes(swe.SUN, jds, resolution, _fast_solar_longitude, fast)
+
+
+def lunar_longitudes(jds, resolution: float | None = None, fast: bool = False) -> np.ndarray:
+    """批次月亮視黃經 (度)
+
+    參數同 solar_longitudes；fast 模式使用 25 項截斷級數，
+    1900–2100 年與 swisseph 相比最大誤差 < 0.05°（月亮每小時約移動 0.5°）
+    """
+    return _longitudes(swe.MOON, jds, resolution, _fast_lunar_longitude, fast)
+
 # --------- 24 節氣計算 ---------
 
+SOLAR_TERM_NAMES = [
+    '春分','清明','穀雨','立夏','小滿','芒種','夏至','小暑','大暑','立秋',
+    '處暑','白露','秋分','寒露','霜降','立冬','小雪','大雪','冬至','小寒',
+    '大寒','立春','雨水','驚蟄'
+]
+# 預算表涵蓋年份（含頭尾）
+SOLAR_TERM_YEARS = (1900, 2100)
+
+TROPICAL_YEAR = 365.242189
+# 2000 年春分平均時刻 (Meeus, JDE0)
+MEAN_EQUINOX_2000 = 2451623.80984
+
+
+def _mean_term_jd(year: int, angle: float) -> float:
+    """平氣法估計節氣時刻：以春分為基準，黃經 285° 以上者（小寒至驚蟄）落在春分之前"""
+    offset = angle if angle < 285 else angle - 360
+    equinox = MEAN_EQUINOX_2000 + TROPICAL_YEAR * (year - 2000)
+    return equinox + offset / 360.0 * TROPICAL_YEAR
+
+
+def solar_term_jd(year: int, angle: float, tol: float = 1e-7) -> float:
+    """求該年太陽視黃經到達 angle 的儒略日
+
+    以平氣時刻 ±5 日為區間，利用太陽黃經速度做牛頓迭代；
+    若迭代跳出區間則退回二分，確保在 0°/360° 交界處亦收斂。
+    """
+    jd = _mean_term_jd(year, angle)
+    low, high = jd - 5.0, jd + 5.0
+    for _ in range(50):
+        pos = swe.calc_ut(jd, swe.SUN, swe.FLG_SWIEPH | swe.FLG_SPEED)[0]
+        diff = ((pos[0] - angle + 180) % 360) - 180
+        if diff > 0:
+            high = jd
+        else:
+            low = jd
+        nxt = jd - diff / pos[3]
+        if not low <= nxt <= high:
+            nxt = (low + high) / 2
+        if abs(nxt - jd) < tol:
+            return nxt
+        jd = nxt
+    return jd
+
+
+def build_solar_term_table(first: int, last: int) -> np.ndarray:
+    """計算 first..last 年的節氣儒略日表，形狀 (年數, 24)，欄位順序同 SOLAR_TERM_NAMES"""
+    return np.array([
+        [solar_term_jd(y, i * 15.0) for i in range(24)]
+        for y in range(first, last + 1)
+    ])
+
+
+def _cached_table(name: str, builder, shape: tuple) -> np.ndarray:
+    """讀取 CACHE_DIR/<name>.npy；不存在或形狀不符時重新建表並寫回（唯讀陣列）"""
+    path = os.path.join(CACHE_DIR, f'{name}.npy')
+    table = None
+    if os.path.exists(path):
+        try:
+            table = np.load(path)
+        except (OSError, ValueError):
+            table = None
+        if table is not None and table.shape != shape:
+            table = None
+    if table is None:
+        table = builder()
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            np.save(path, table)
+        except OSError:
+            pass  # 快取不可寫時僅保留於記憶體
+    table.flags.writeable = False
+    return table
+
+
+_SOLAR_TERM_TABLE = None
+
+
+def solar_term_table() -> np.ndarray:
+    """取得 1900–2100 節氣表：記憶體 → 磁碟快取 → 重新計算（並寫回快取）"""
+    global _SOLAR_TERM_TABLE
+    if _SOLAR_TERM_TABLE is None:
+        first, last = SOLAR_TERM_YEARS
+        _SOLAR_TERM_TABLE = _cached_table(
+            f'solar_terms_{first}_{last}',
+            lambda: build_solar_term_table(first, last),
+            (last - first + 1, 24))
+    return _SOLAR_TERM_TABLE
+
+
 def compute_solar_terms(year: int) -> dict:
     """計算該年 24 節氣時間，回傳 {節氣名: datetime}"""
-    terms = {}
-    solar_terms = [i * 15.0 for i in range(24)]
-    names = [
-        '春分','清明','穀雨','立夏','小滿','芒種','夏至','小暑','大暑','立秋',
-        '處暑','白露','秋分','寒露','霜降','立冬','小雪','大雪','冬至','小寒',
-        '大寒','立春','雨水','驚蟄'
-    ]
-    # 二分搜尋求節氣時刻
-    dt_start = datetime(year, 1, 1)
-    dt_end = datetime(year+1, 1, 1)
-    jd_start = julian_day(dt_start)
-    jd_end = julian_day(dt_end)
-    for angle, name in zip(solar_terms, names):
-        low, high = jd_start, jd_end
-        for _ in range(40):
-            mid = (low + high)/2
-            diff = ((solar_longitude(mid) - angle + 180) % 360) - 180
-            if diff > 0:
-                high = mid
-            else:
-                low = mid
-        dt_term = datetime.utcfromtimestamp((low - 2440587.5)*86400)
-        terms[name] = dt_term
-    return terms
+    first, last = SOLAR_TERM_YEARS
+    if first <= year <= last:
+        jds = solar_term_table()[year - first]
+    else:
+        jds = [solar_term_jd(year, i * 15.0) for i in range(24)]
+    return {name: jd_to_datetime(jd) for name, jd in zip(SOLAR_TERM_NAMES, jds)}
+
+
+_TERM_TIMELINE = None
+
+
+def term_index_at(jd):
+    """查表取得當下所在節氣索引 (0=春分 … 23=驚蟄)，即 floor(太陽黃經/15)
+
+    jd 可為純量或 NumPy 陣列；超出預算表範圍時改以星曆直接計算。
+    """
+    global _TERM_TIMELINE
+    if _TERM_TIMELINE is None:
+        table = solar_term_table()
+        order = np.argsort(table, axis=None)
+        _TERM_TIMELINE = (table.ravel()[order], (order % 24).astype(np.int8))
+    times, idx = _TERM_TIMELINE
+    arr = np.asarray(jd, dtype=float)
+    pos = np.searchsorted(times, arr, side='right') - 1
+    inside = (pos >= 0) & (arr < times[-1])
+    out = idx[np.clip(pos, 0, len(idx) - 1)].astype(int)
+    if not inside.all():
+        for i in np.flatnonzero(~inside.ravel()):
+            out.flat[i] = int(math.floor(solar_longitude(float(arr.flat[i])) % 360 / 15.0))
+    return int(out) if out.ndim == 0 else out
 
 # --------- 農曆轉換 ---------
+# 逐日查表：索引 = 日序 (1970-01-01 起算) - LUNAR_TABLE_START
+# 每日一個 uint32：(農曆年-1900) << 10 | 月 << 6 | 日 << 1 | 閏月旗標
+LUNAR_TABLE_START = int(np.datetime64('1900-01-31', 'D').astype(np.int64))  # 農曆 1900/1/1
+LUNAR_TABLE_END = int(np.datetime64('2100-02-09', 'D').astype(np.int64))    # 農曆 2100/1/1（不含）
+LUNAR_YEARS = (1900, 2099)
+
+
+def _to_solar_date(ld: LunarDate):
+    # lunardate 0.3 起改名為 to_solar_date，舊版僅有 toSolarDate
+    fn = getattr(ld, 'to_solar_date', None) or ld.toSolarDate
+    return fn()
+
+
+def _leap_month(year: int):
+    fn = getattr(LunarDate, 'leap_month_for_year', None) or LunarDate.leapMonthForYear
+    return fn(year)
+
+
+def build_lunar_table() -> np.ndarray:
+    """由 lunardate 的各月初一建立逐日農曆表"""
+    starts, heads = [], []
+    for y in range(LUNAR_YEARS[0], LUNAR_YEARS[1] + 1):
+        leap = _leap_month(y)
+        for m in range(1, 13):
+            for is_leap in ((False, True) if leap == m else (False,)):
+                d = _to_solar_date(LunarDate(y, m, 1, is_leap))
+                starts.append(int(np.datetime64(d, 'D').astype(np.int64)))
+                heads.append(((y - 1900) << 10) | (m << 6) | (1 << 1) | int(is_leap))
+    # 最後一個月的天數：初三十不存在則為小月
+    try:
+        _to_solar_date(LunarDate(y, m, 30, is_leap))
+        last_len = 30
+    except ValueError:
+        last_len = 29
+    starts = np.array(starts + [starts[-1] + last_len], dtype=np.int64)
+    lengths = np.diff(starts)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return (np.repeat(np.array(heads, dtype=np.uint32), lengths)
+            + (offsets.astype(np.uint32) << 1))
+
+
+_LUNAR_TABLE = None
+
+
+def lunar_table() -> np.ndarray:
+    """取得逐日農曆表（記憶體 → 磁碟快取 → 重新建表）"""
+    global _LUNAR_TABLE
+    if _LUNAR_TABLE is None:
+        _LUNAR_TABLE = _cached_table(
+            f'lunar_{LUNAR_YEARS[0]}_{LUNAR_YEARS[1]}', build_lunar_table,
+            (LUNAR_TABLE_END - LUNAR_TABLE_START,))
+    return _LUNAR_TABLE
+
+
+def solar_to_lunar_array(dates):
+    """批次公曆轉農曆，回傳 (年, 月, 日, 是否閏月) 四個陣列
+
+    dates: datetime / date / datetime64 的純量或序列（只取日期部分）
+    """
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64) - LUNAR_TABLE_START
+    table = lunar_table()
+    if days.size and (days.min() < 0 or days.max() >= len(table)):
+        raise ValueError("日期超出農曆表範圍 [1900-01-31, 2100-02-08]")
+    packed = table[days]
+    return ((packed >> 10).astype(np.int64) + 1900,
+            ((packed >> 6) & 0xF).astype(np.int64),
+            ((packed >> 1) & 0x1F).astype(np.int64),
+            (packed & 1).astype(bool))
+
+
+def verify_lunar_table() -> int:
+    """逐日與 LunarDate.fromSolarDate 交叉比對，回傳不一致天數"""
+    table = lunar_table()
+    base = datetime(1970, 1, 1) + timedelta(days=LUNAR_TABLE_START)
+    y, m, d, leap = solar_to_lunar_array(
+        np.arange(len(table)) + np.datetime64(base.date(), 'D'))
+    bad = 0
+    for i in range(len(table)):
+        dt = base + timedelta(days=i)
+        ld = LunarDate.fromSolarDate(dt.year, dt.month, dt.day)
+        is_leap = getattr(ld, 'is_leap_month', None)
+        if is_leap is None:
+            is_leap = ld.isLeapMonth  # 舊版 lunardate
+        if (ld.year, ld.month, ld.day, bool(is_leap)) != (y[i], m[i], d[i], leap[i]):
+            bad += 1
+    return bad
+
 
 def solar_to_lunar(dt: datetime) -> LunarDate:
     """公曆轉農曆，包含閏月標記"""
-    return LunarDate.fromSolarDate(dt.year, dt.month, dt.day)
+    day = (datetime(dt.year, dt.month, dt.day) - datetime(1970, 1, 1)).days - LUNAR_TABLE_START
+    table = lunar_table()
+    if not 0 <= day < len(table):
+        inc('lunar_table_fallbacks')
+        return LunarDate.fromSolarDate(dt.year, dt.month, dt.day)
+    packed = int(table[day])
+    return LunarDate((packed >> 10) + 1900, (packed >> 6) & 0xF,
+                     (packed >> 1) & 0x1F, bool(packed & 1))
 
 
 def lunar_to_solar(ld: LunarDate) -> datetime:
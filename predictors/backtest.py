@@ -0,0 +1,150 @@
+# backtest.py
+"""
+奇門權重歷史回測
+
+功能：
+ 1. 以每期開獎日的官方開獎時刻（台灣 20:30）批次計算權重
+    - qimen：mapping_engine 奇門盤權重
+    - qimen_simple：QimenZiwei_predictor 簡化奇門權重
+ 2. 計分：Top-k 命中數、依權重抽樣 k 顆的平均命中數
+ 3. 與均勻隨機基準（超幾何分布期望 k×6/49）比較，附 95% 信賴區間、z 值與雙尾 p 值
+ 4. 抽樣部分依期數分塊，多核心平行執行；種子固定，結果可重現
+
+依賴：
+ - numpy
+ - history_service（共用歷史快照）
+ - mapping_engine.qimen_number_weights_batch
+ - QimenZiwei_predictor.qimen_weights_from_sums
+
+使用：
+    python backtest.py --k 6 --samples 2000
+"""
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from mapping_engine import qimen_number_weights_batch
+from QimenZiwei_predictor import qimen_weights_from_sums
+from rng_service import RngService
+from history_service import DEFAULT_PATH, get_service
+
+DRAW_HOUR, DRAW_MINUTE = 20, 30   # 大樂透開獎時刻（台灣時間）
+DRAW_TZ = 8.0
+Z95 = 1.959963984540054
+
+# --------- 資料與權重 ---------
+
+def load_draws(path: str = DEFAULT_PATH):
+    """回傳 (開獎時刻 datetime64[m] 當地時間, (D,6) 紅球陣列)，依日期由舊到新
+
+    資料取自 history_service 的目前快照，與其他模組看到同一版本且不重複讀檔。
+    """
+    snap = get_service(path).snapshot()
+    order = np.argsort(snap.dates, kind='stable')
+    local = snap.dates[order] + np.timedelta64(DRAW_HOUR * 60 + DRAW_MINUTE, 'm')
+    return local, snap.reds[order]
+
+
+def source_weights(local: np.ndarray) -> dict:
+    """各權重來源在每期開獎時刻的 (D,49) 權重"""
+    utc = local - np.timedelta64(int(DRAW_TZ * 60), 'm')
+    days = local.astype('datetime64[D]')
+    years = days.astype('datetime64[Y]').astype(int) + 1970
+    months = days.astype('datetime64[M]').astype(int) % 12 + 1
+    mdays = (days - days.astype('datetime64[M]')).astype(int) + 1
+    return {
+        'qimen': qimen_number_weights_batch(utc),
+        'qimen_simple': qimen_weights_from_sums(years + months + mdays + DRAW_HOUR),
+    }
+
+# --------- 計分 ---------
+
+def hit_matrix(reds: np.ndarray) -> np.ndarray:
+    """(D,6) 開獎號碼 → (D,49) 0/1 命中矩陣"""
+    hits = np.zeros((len(reds), 49), dtype=np.int8)
+    np.put_along_axis(hits, reds - 1, 1, axis=1)
+    return hits
+
+
+def top_k_hits(weights: np.ndarray, hits: np.ndarray, k: int) -> np.ndarray:
+    top = np.argsort(-weights, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(hits, top, axis=1).sum(axis=1)
+
+
+def _sampled_hits(weights: np.ndarray, hits: np.ndarray, k: int, samples: int,
+                  seed: np.random.SeedSequence) -> np.ndarray:
+    """每期依權重不放回抽 k 顆 samples 次（Gumbel top-k），回傳每期平均命中數"""
+    rng = np.random.default_rng(seed)
+    with np.errstate(divide='ignore'):
+        logw = np.log(weights)
+    out = np.empty(len(weights))
+    for i in range(len(weights)):
+        keys = logw[i] + rng.gumbel(size=(samples, 49))
+        picks = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        out[i] = hits[i][picks].sum(axis=1).mean()
+    return out
+
+
+def sampled_hits(weights: np.ndarray, hits: np.ndarray, k: int, samples: int,
+                 seed: int = 0, workers: int | None = None) -> np.ndarray:
+    workers = workers or os.cpu_count() or 1
+    bounds = np.linspace(0, len(weights), workers + 1).astype(int)
+    seeds = RngService(seed).seed_sequences(workers)
+    parts = [(weights[a:b], hits[a:b], k, samples, s)
+             for (a, b), s in zip(zip(bounds[:-1], bounds[1:]), seeds)]
+    if workers == 1:
+        return _sampled_hits(*parts[0])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(_sampled_hits, *zip(*parts))))
+
+
+def summarize(per_draw: np.ndarray, k: int) -> dict:
+    """平均命中數與 95% CI，並與均勻基準 k×6/49 比較（z 值以樣本標準誤計算）"""
+    n = len(per_draw)
+    mean = float(per_draw.mean())
+    se = float(per_draw.std(ddof=1)) / math.sqrt(n) if n > 1 else float('nan')
+    half = Z95 * se
+    baseline = k * 6 / 49
+    z = (mean - baseline) / se if se > 0 else 0.0
+    return {
+        'draws': n, 'mean_hits': mean, 'ci95': (mean - half, mean + half),
+        'baseline': baseline, 'z': z, 'p_value': math.erfc(abs(z) / math.sqrt(2)),
+    }
+
+
+def run_backtest(path: str = 'lottery_results.xlsx', k: int = 6, samples: int = 1000,
+                 seed: int = 0, workers: int | None = None) -> dict:
+    """回傳 {來源: {'top_k': 摘要, 'sampled': 摘要}}"""
+    local, reds = load_draws(path)
+    hits = hit_matrix(reds)
+    report = {}
+    for name, w in source_weights(local).items():
+        report[name] = {
+            'top_k': summarize(top_k_hits(w, hits, k), k),
+            'sampled': summarize(sampled_hits(w, hits, k, samples, seed, workers), k),
+        }
+    return report
+
+
+def format_report(report: dict, k: int) -> str:
+    lines = [f"{'來源':<14}{'方式':<9}{'期數':>6}{'平均命中':>10}{'95% CI':>20}{'基準':>8}{'z':>8}{'p':>8}"]
+    for name, parts in report.items():
+        for mode, s in parts.items():
+            lo, hi = s['ci95']
+            label = f'top{k}' if mode == 'top_k' else 'sampled'
+            lines.append(f"{name:<16}{label:<10}{s['draws']:>6}{s['mean_hits']:>10.4f}"
+                         f"   [{lo:.4f}, {hi:.4f}]{s['baseline']:>8.4f}{s['z']:>8.2f}{s['p_value']:>8.3f}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='奇門權重歷史回測')
+    parser.add_argument('--history', default='lottery_results.xlsx')
+    parser.add_argument('--k', type=int, default=6, help='每期選取號碼數')
+    parser.add_argument('--samples', type=int, default=1000, help='每期抽樣次數')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    a = parser.parse_args()
+    rep = run_backtest(a.history, a.k, a.samples, a.seed, a.workers)
+    print(format_report(rep, a.k))
@@ -0,0 +1,166 @@
+# batch_pipeline.py
+"""
+客戶批次預測流程（無 GUI）
+
+功能：
+ 1. 以固定大小分塊串流讀取客戶 CSV（birth, tz, lon，可選 id）
+ 2. 每塊以向量化方式計算奇門權重（開獎時刻）與紫微權重（客戶生辰）
+ 3. 依 α 合併權重後為每位客戶產生號碼，亂數種子由 (seed, 客戶) 決定，結果可重現
+    - 奇門權重只取決於開獎時刻，每塊只算一次後廣播到所有客戶
+    - top 方法每位客戶只有一組確定號碼，--tickets 必須為 1
+ 4. 多核心平行處理，限制同時在途的區塊數，記憶體用量與檔案大小無關
+ 5. 結果依輸入順序串流寫出 CSV：id, ticket, n1..n6
+ 6. 無法計算的客戶列（birth 無法解析、tz 非有限數值、換算後超出農曆表 1900-01-31–2100-02-08）略過並計入 skipped
+
+依賴：
+ - numpy, pandas
+ - mapping_engine（qimen_number_weights_batch / ziwei_number_weights_batch）
+ - astronomical_core（農曆表範圍）
+
+使用：
+    python batch_pipeline.py customers.csv tickets.csv --tickets 3 --seed 2025
+"""
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from astronomical_core import LUNAR_TABLE_END, LUNAR_TABLE_START
+from mapping_engine import qimen_number_weights_batch, ziwei_number_weights_batch
+from rng_service import RngService
+
+BIRTH_FORMAT = '%Y-%m-%d %H:%M'
+OUTPUT_COLUMNS = ['id', 'ticket'] + [f'n{i}' for i in range(1, 7)]
+
+# --------- 亂數與抽號 ---------
+
+def draw_tickets(weights: np.ndarray, n_tickets: int, rng: np.random.Generator, k: int = 6) -> np.ndarray:
+    """依權重不放回抽 k 顆（Gumbel top-k，分布同 np.random.choice(replace=False, p=...)）"""
+    with np.errstate(divide='ignore'):
+        logp = np.log(weights)
+    keys = logp + rng.gumbel(size=(n_tickets, weights.size))
+    picks = np.argpartition(-keys, k - 1, axis=1)[:, :k] + 1
+    return np.sort(picks, axis=1)
+
+
+def top_ticket(weights: np.ndarray, k: int = 6) -> np.ndarray:
+    return np.sort(np.argsort(weights)[-k:][::-1] + 1)
+
+# --------- 分塊處理 ---------
+
+def _valid_rows(births: np.ndarray, tz: np.ndarray) -> np.ndarray:
+    """可計算紫微權重的列：birth 已解析、tz 為有限數值，且換算後的日期在農曆表範圍內"""
+    valid = ~np.isnat(births) & np.isfinite(tz)
+    offset = np.round(np.where(valid, tz, 0.0) * 60).astype(np.int64).astype('timedelta64[m]')
+    days = (births - offset).astype('datetime64[D]').astype(np.int64)
+    return valid & (days >= LUNAR_TABLE_START) & (days < LUNAR_TABLE_END)
+
+
+def process_chunk(chunk: pd.DataFrame, at: np.datetime64, alpha: float,
+                  n_tickets: int, method: str, seed: int) -> pd.DataFrame:
+    births = pd.to_datetime(chunk['birth'], format=BIRTH_FORMAT, errors='coerce').to_numpy(dtype='datetime64[m]')
+    tz = (pd.to_numeric(chunk['tz'], errors='coerce').to_numpy(dtype=float) if 'tz' in chunk
+          else np.full(len(chunk), 8.0))
+    valid = _valid_rows(births, tz)
+    chunk, births, tz = chunk[valid], births[valid], tz[valid]
+    n = len(chunk)
+    if n == 0:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+    w_qm = qimen_number_weights_batch(np.array([at]))[0]      # 所有客戶共用的 (49,)
+    w_zw = ziwei_number_weights_batch(births, tz)
+    comb = alpha * w_qm + (1 - alpha) * w_zw
+    comb /= comb.sum(axis=1, keepdims=True)
+
+    ids = chunk['id'].to_numpy()
+    if method == 'top':
+        tickets = np.stack([top_ticket(w) for w in comb])[:, None, :]
+    else:
+        # 每位客戶一條由 (seed, id) 決定的串流，與分塊方式、處理順序無關
+        rngs = RngService(seed)
+        tickets = np.stack([
+            draw_tickets(w, n_tickets, rngs.stream(cid))
+            for w, cid in zip(comb, ids)
+        ])
+    out = pd.DataFrame(tickets.reshape(-1, 6), columns=OUTPUT_COLUMNS[2:])
+    out.insert(0, 'ticket', np.tile(np.arange(1, n_tickets + 1), n))
+    out.insert(0, 'id', np.repeat(ids, n_tickets))
+    return out
+
+
+def _iter_chunks(path: str, chunk_size: int):
+    row = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype={'birth': str}):
+        if 'id' not in chunk:
+            chunk = chunk.assign(id=np.arange(row, row + len(chunk)))
+        row += len(chunk)
+        yield chunk
+
+
+def run_pipeline(input_path: str, output_path: str, at: datetime | None = None,
+                 alpha: float = 0.5, n_tickets: int = 1, method: str = 'random',
+                 seed: int = 0, chunk_size: int = 10_000, workers: int | None = None) -> dict:
+    """執行批次流程，回傳 {'customers', 'skipped', 'tickets'} 統計"""
+    if method == 'top' and n_tickets != 1:
+        raise ValueError("top 方法每位客戶只有一組號碼，注數必須為 1")
+    # 與 qimen_number_weights(dt) 相同，以 dt.timestamp() 換算為 UTC
+    at = np.datetime64(int((at or datetime.now()).timestamp()), 's')
+    workers = workers or os.cpu_count() or 1
+    stats = {'customers': 0, 'skipped': 0, 'tickets': 0}
+    args = (at, alpha, n_tickets, method, seed)
+
+    with open(output_path, 'w', encoding='utf-8', newline='') as out:
+        out.write(','.join(OUTPUT_COLUMNS) + '\n')
+
+        def emit(chunk_len: int, result: pd.DataFrame):
+            result.to_csv(out, header=False, index=False)
+            done = len(result) // max(n_tickets, 1)
+            stats['customers'] += done
+            stats['skipped'] += chunk_len - done
+            stats['tickets'] += len(result)
+
+        if workers == 1:
+            for chunk in _iter_chunks(input_path, chunk_size):
+                emit(len(chunk), process_chunk(chunk, *args))
+            return stats
+
+        # 在途區塊上限：每核 2 塊，依輸入順序寫出
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in _iter_chunks(input_path, chunk_size):
+                pending.append((len(chunk), pool.submit(process_chunk, chunk, *args)))
+                if len(pending) >= workers * 2:
+                    n, fut = pending.popleft()
+                    emit(n, fut.result())
+            while pending:
+                n, fut = pending.popleft()
+                emit(n, fut.result())
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='客戶批次號碼預測（CSV 串流）')
+    parser.add_argument('input', help='輸入 CSV，欄位：birth (YYYY-MM-DD HH:MM), tz, lon，可選 id')
+    parser.add_argument('output', help='輸出 CSV')
+    parser.add_argument('--at', help='奇門起盤時刻 (YYYY-MM-DD HH:MM，預設現在)')
+    parser.add_argument('--alpha', type=float, default=0.5, help='奇門比重 α (0~1)')
+    parser.add_argument('--tickets', type=int, default=1, help='每位客戶的注數')
+    parser.add_argument('--method', choices=['random', 'top'], default='random')
+    parser.add_argument('--seed', type=int, default=0, help='全域亂數種子')
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=None, help='平行行程數（預設 CPU 核心數）')
+    a = parser.parse_args(argv)
+    if a.method == 'top' and a.tickets != 1:
+        parser.error('--method top 每位客戶只有一組號碼，--tickets 必須為 1')
+    at = datetime.strptime(a.at, BIRTH_FORMAT) if a.at else None
+    stats = run_pipeline(a.input, a.output, at, a.alpha, a.tickets, a.method,
+                         a.seed, a.chunk_size, a.workers)
+    print(f"✅ 共處理 {stats['customers']} 位客戶、{stats['tickets']} 注，"
+          f"略過 {stats['skipped']} 筆無效資料（格式錯誤或超出曆表範圍）", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
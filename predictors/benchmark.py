@@ -0,0 +1,346 @@
+# benchmark.py
+"""
+引擎與預測器效能基準測試（離線、固定種子）
+
+功能：
+ 1. synthetic_history(n, seed)：產生 n 期合成開獎（格式同 lottery_results.xlsx，由新到舊）
+ 2. 每個案例先暖身，再重複執行至少 min_runs 次且累計 min_time 秒（上限 max_runs）
+    回報延遲百分位 (p50 / p90 / p99 / max)、吞吐量（次/秒）與 tracemalloc 峰值記憶體
+    （記憶體另以單次執行量測，不影響計時）
+ 3. 與基準 JSON 比較：最短耗時 (min) 超過基準 ×(1+threshold) 視為退步，程式以狀態碼 1 結束
+    - min 受排程 / 快取干擾最小，比 p50 穩定；雙方執行次數皆達 MIN_COMPARE_RUNS 才判定
+    - --quick 的次數通常不足，只供檢查案例能否執行，不應用於 --baseline 判定
+ 4. 案例
+    - recency_weights / frequency_weights（10k、100k 期合成歷史）
+    - generate_combo（規則以 10k、100k 期合成歷史編譯）
+    - check_rules_batch 對照最初的逐注 Python check_rules（同一批 10k 注、10k 期歷史），
+      另列加速倍數（目標 ≥ 100×）
+    - compute_solar_terms（節氣表內年份 / 表外年份直接以 swisseph 求解）
+    - generate_qimen_chart、generate_chart（紫微）
+    - generate_numbers（單注）、generate_numbers_batch（10k 注）
+
+依賴：
+ - numpy, pandas
+ - predict, mystic_predictor, rule_engine, astronomical_core, qimen_engine, ziwei_engine,
+   GUA_hexagram_predictor, rng_service（各案例執行時才載入）
+
+使用：
+    python benchmark.py                               # 全部案例
+    python benchmark.py --filter recency --quick
+    python benchmark.py --save benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, datetime
+import numpy as np
+from rng_service import RngService
+
+SEED = 20240501
+SIZES = (10_000, 100_000)
+PERCENTILES = (50, 90, 99, 100)
+# 與基準比較時，雙方執行次數皆須達此數才判定退步
+MIN_COMPARE_RUNS = 20
+
+# --------- 合成資料 ---------
+
+def synthetic_history(n: int, seed: int = SEED):
+    """n 期合成開獎 DataFrame（date, red1..red6, special），依日期由新到舊"""
+    import pandas as pd
+    rng = RngService(seed).stream('history', n)
+    keys = rng.random((n, 49))
+    picks = np.argpartition(keys, 7, axis=1)[:, :7] + 1
+    reds = np.sort(picks[:, :6], axis=1)
+    # 每週兩期（間隔 3、4 天交替），最新一期為 2025-05-20
+    gaps = np.where(np.arange(n) % 2 == 0, 3, 4).cumsum() - 3
+    dates = np.datetime64('2025-05-20') - gaps.astype('timedelta64[D]')
+    df = pd.DataFrame(reds, columns=[f'red{i}' for i in range(1, 7)])
+    df.insert(0, 'date', dates)
+    df['special'] = picks[:, 6]
+    return df
+
+# --------- 量測 ---------
+
+class Case:
+    """setup() 回傳 (函式, 參數 tuple)；setup 不計時"""
+
+    def __init__(self, name: str, setup, context=None):
+        self.name, self.setup, self.context = name, setup, context
+
+
+def measure(func, args, min_time: float = 1.0, min_runs: int = 5, max_runs: int = 1000) -> dict:
+    func(*args)                                  # 暖身（載入、快取）
+    times = []
+    total = 0.0
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(times) < max_runs and (len(times) < min_runs or total < min_time):
+            t0 = time.perf_counter()
+            func(*args)
+            dt = time.perf_counter() - t0
+            times.append(dt)
+            total += dt
+    finally:
+        if gc_enabled:
+            gc.enable()
+    times = np.array(times)
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'runs': len(times),
+        **{f'p{q}_ms': float(np.percentile(times, q) * 1000) for q in PERCENTILES},
+        'min_ms': float(times.min() * 1000),
+        'mean_ms': float(times.mean() * 1000),
+        'throughput': float(len(times) / total),
+        'peak_kib': peak / 1024,
+    }
+
+# --------- 案例 ---------
+
+def _reds(n: int):
+    return synthetic_history(n)[[f'red{i}' for i in range(1, 7)]]
+
+
+@contextmanager
+def _mystic_history(n: int):
+    """以 n 期合成歷史編譯玄學規則，結束後還原"""
+    import mystic_predictor as mystic
+    from rule_engine import combo_keys, compile_rules
+    saved = vars(mystic).get('RULES')
+    mystic.RULES = compile_rules(mystic.MYSTIC_RULES,
+                                 history_keys=combo_keys(_reds(n).to_numpy()))
+    try:
+        yield
+    finally:
+        if saved is None:
+            del mystic.RULES
+        else:
+            mystic.RULES = saved
+
+
+def _recency(n):
+    from predict import recency_weights
+    return recency_weights, (_reds(n),)
+
+
+def _frequency(n):
+    from predict import frequency_weights
+    return frequency_weights, (_reds(n),)
+
+
+def _combo(n):
+    from mystic_predictor import generate_combo
+    rng = RngService(SEED).stream('generate_combo', n)
+    return (lambda: generate_combo(rng=rng)), ()
+
+
+def _tickets(m: int) -> np.ndarray:
+    rng = RngService(SEED).stream('tickets', m)
+    return np.argpartition(rng.random((m, 49)), 6, axis=1)[:, :6] + 1
+
+
+def _reference_check(nums, history, mystic) -> bool:
+    """最初的逐注 Python 版 check_rules（僅作為效能對照組）"""
+    key = '-'.join(f"{n:02d}" for n in sorted(nums))
+    if key in history:
+        return False
+    yang_cnt = sum(1 for n in nums if n in mystic.YANG)
+    if yang_cnt not in (3, 4):
+        return False
+    elements = [mystic.TAIL_ELEMENT[n % 10] for n in nums]
+    if elements.count('木') < 1 or elements.count('水') < 1 or elements.count('金') > 2:
+        return False
+    if any(n in mystic.UNLUCKY for n in nums) and not any(n in mystic.LUCKY for n in nums):
+        return False
+    return sum(1 for n in nums if n in mystic.UNLUCKY) <= 1
+
+
+def _check_python(m):
+    import mystic_predictor as mystic
+    history = mystic._combo_texts(_reds(SIZES[0]).to_numpy())
+    tickets = _tickets(m).tolist()
+    return (lambda: [_reference_check(nums, history, mystic) for nums in tickets]), ()
+
+
+def _check_batch(m):
+    from mystic_predictor import check_rules_batch
+    return check_rules_batch, (_tickets(m),)
+
+
+def _solar_terms(year):
+    from astronomical_core import compute_solar_terms
+    return compute_solar_terms, (year,)
+
+
+def _qimen():
+    from qimen_engine import generate_qimen_chart
+    return generate_qimen_chart, (datetime(2025, 5, 20, 20, 30), 121.5)
+
+
+def _ziwei():
+    from ziwei_engine import generate_chart
+    return generate_chart, (datetime(1990, 5, 17, 15, 30), 'M')
+
+
+def _numbers():
+    from GUA_hexagram_predictor import generate_numbers
+    rng = RngService(SEED).stream('generate_numbers')
+    return (lambda: generate_numbers([7, 8, 9, 6, 7, 8], rng)), ()
+
+
+def _numbers_batch(m):
+    from GUA_hexagram_predictor import auto_hexagram_batch, generate_numbers_batch
+    rng = RngService(SEED).stream('generate_numbers_batch', m)
+    lines = auto_hexagram_batch(m, rng)
+    return (lambda: generate_numbers_batch(lines, rng)), ()
+
+
+CASES = (
+    [Case(f'recency_weights[{n // 1000}k]', lambda n=n: _recency(n)) for n in SIZES]
+    + [Case(f'frequency_weights[{n // 1000}k]', lambda n=n: _frequency(n)) for n in SIZES]
+    + [Case(f'generate_combo[{n // 1000}k]', lambda n=n: _combo(n), lambda n=n: _mystic_history(n))
+       for n in SIZES]
+    + [Case('check_rules_python[10k]', lambda: _check_python(10_000), lambda: _mystic_history(SIZES[0])),
+       Case('check_rules_batch[10k]', lambda: _check_batch(10_000), lambda: _mystic_history(SIZES[0]))]
+    + [Case('compute_solar_terms[2025]', lambda: _solar_terms(2025)),
+       Case('compute_solar_terms[2150]', lambda: _solar_terms(2150)),
+       Case('generate_qimen_chart', _qimen),
+       Case('generate_chart', _ziwei),
+       Case('generate_numbers', _numbers),
+       Case('generate_numbers_batch[10k]', lambda: _numbers_batch(10_000))]
+)
+
+
+# (案例, 對照案例, 目標倍數)：以最短耗時計算加速倍數
+SPEEDUPS = [('check_rules_batch[10k]', 'check_rules_python[10k]', 100.0)]
+
+
+def run_cases(cases, min_time: float = 1.0, min_runs: int = 5, progress=None) -> dict:
+    results = {}
+    for case in cases:
+        ctx = case.context() if case.context else _null()
+        with ctx:
+            func, args = case.setup()
+            results[case.name] = measure(func, args, min_time, min_runs)
+        if progress:
+            progress(case.name, results[case.name])
+    return results
+
+
+@contextmanager
+def _null():
+    yield
+
+# --------- 基準比較 ---------
+
+def environment() -> dict:
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(),
+            'cpus': os.cpu_count(), 'date': date.today().isoformat()}
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.25,
+            min_runs: int = MIN_COMPARE_RUNS) -> list[dict]:
+    """回傳各案例 {name, current, baseline, ratio, regressed, enough}（以最短耗時比較）
+
+    任一方執行次數少於 min_runs 時 enough 為 False，不判定退步。
+    舊版基準沒有 min_ms 時退回比較 p50。
+    """
+    rows = []
+    for name, r in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            rows.append({'name': name, 'current': r['min_ms'], 'baseline': None,
+                         'ratio': None, 'regressed': False, 'enough': True})
+            continue
+        stat = 'min_ms' if 'min_ms' in base else 'p50_ms'
+        ratio = r[stat] / base[stat] if base[stat] > 0 else float('inf')
+        enough = min(r['runs'], base['runs']) >= min_runs
+        rows.append({'name': name, 'current': r[stat], 'baseline': base[stat], 'ratio': ratio,
+                     'regressed': enough and ratio > 1 + threshold, 'enough': enough})
+    return rows
+
+
+def format_row(name: str, r: dict) -> str:
+    return (f"{name:<30}{r['runs']:>6}{r['p50_ms']:>11.3f}{r['p90_ms']:>11.3f}{r['p99_ms']:>11.3f}"
+            f"{r['p100_ms']:>11.3f}{r['throughput']:>12.1f}{r['peak_kib']:>12.1f}")
+
+
+HEADER = (f"{'案例':<28}{'次數':>4}{'p50 ms':>11}{'p90 ms':>11}{'p99 ms':>11}"
+          f"{'max ms':>11}{'次/秒':>10}{'峰值 KiB':>10}")
+
+
+def format_speedups(results: dict) -> str:
+    lines = []
+    for name, ref, target in SPEEDUPS:
+        if name in results and ref in results:
+            ratio = results[ref]['min_ms'] / results[name]['min_ms']
+            mark = '✓' if ratio >= target else '✗ 未達目標'
+            lines.append(f"{name} 相對 {ref}：×{ratio:.0f}（目標 ≥ {target:.0f}×）{mark}")
+    return '\n'.join(lines)
+
+
+def format_compare(rows: list[dict], threshold: float) -> str:
+    lines = [f"與基準比較（最短耗時，退步門檻 +{threshold:.0%}，至少 {MIN_COMPARE_RUNS} 次）"]
+    for row in rows:
+        if row['baseline'] is None:
+            lines.append(f"  {row['name']:<30}{row['current']:>11.3f} ms（基準無此案例）")
+            continue
+        mark = '✗ 退步' if row['regressed'] else ('✓' if row['enough'] else '– 次數不足，未判定')
+        lines.append(f"  {row['name']:<30}{row['current']:>11.3f} / {row['baseline']:.3f} ms"
+                     f"  ×{row['ratio']:.2f}  {mark}")
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='引擎與預測器效能基準測試')
+    parser.add_argument('--filter', '-k', action='append', help='只執行名稱包含此字串的案例（可多次指定）')
+    parser.add_argument('--quick', action='store_true', help='每案例至少 0.2 秒 / 1 次（快速檢查；次數不足的案例不做基準判定）')
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--min-runs', type=int, default=5)
+    parser.add_argument('--save', help='將結果寫成基準 JSON')
+    parser.add_argument('--baseline', help='與基準 JSON 比較')
+    parser.add_argument('--threshold', type=float, default=0.25, help='最短耗時退步門檻（比例）')
+    parser.add_argument('--json', help='將完整結果寫成 JSON')
+    a = parser.parse_args(argv)
+    if a.quick:
+        a.min_time, a.min_runs = 0.2, 1
+    cases = [c for c in CASES if not a.filter or any(f in c.name for f in a.filter)]
+    if not cases:
+        parser.error('沒有符合 --filter 的案例')
+
+    print(HEADER)
+    results = run_cases(cases, a.min_time, a.min_runs,
+                        progress=lambda name, r: print(format_row(name, r), flush=True))
+    speedups = format_speedups(results)
+    if speedups:
+        print('\n' + speedups)
+    doc = {'environment': environment(), 'seed': SEED, 'results': results}
+    for path in (a.save, a.json):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(doc, f, ensure_ascii=False, indent=2)
+    if a.baseline:
+        with open(a.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, a.threshold)
+        print('\n' + format_compare(rows, a.threshold))
+        if any(row['regressed'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
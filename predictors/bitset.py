@@ -0,0 +1,63 @@
+# bitset.py
+"""
+號碼組合的 uint64 位元集合工具
+
+一注 (或一期開獎) 以 uint64 表示，第 n 位代表號碼 n（1–49，第 0 位不用），
+與 rule_engine.combo_keys 的編碼相同。交集 / 聯集為位元運算，命中數為 popcount。
+
+功能：
+ 1. to_masks / from_masks：(M,k) 號碼陣列 ↔ (M,) uint64
+ 2. popcount：NumPy ≥ 2.0 使用 np.bitwise_count，否則以 16 位元查表
+ 3. weighted_popcount：依號碼權重加總集合內的號碼（逐位元組查表）
+
+依賴：numpy
+"""
+import numpy as np
+
+MAX_NUMBER = 49
+ALL_NUMBERS = np.uint64(((1 << (MAX_NUMBER + 1)) - 1) & ~1)
+# HIGHER[n]：大於 n 的所有號碼
+HIGHER = np.array([ALL_NUMBERS & ~np.uint64((2 << n) - 1) for n in range(MAX_NUMBER + 1)],
+                  dtype=np.uint64)
+_POPCOUNT16 = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.uint8)
+
+
+def to_masks(numbers) -> np.ndarray:
+    """(M,k) 號碼 → (M,) uint64；一維輸入視為單一組合"""
+    arr = np.asarray(numbers, dtype=np.uint64)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    return np.bitwise_or.reduce(np.uint64(1) << arr, axis=1)
+
+
+def from_masks(masks, k: int = 6) -> np.ndarray:
+    """(M,) uint64（每列恰 k 個號碼）→ (M,k) 升冪號碼"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    bits = (masks[:, None] >> np.arange(MAX_NUMBER + 1, dtype=np.uint64)) & np.uint64(1)
+    rows, nums = np.nonzero(bits)
+    return nums.reshape(len(masks), k)
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(x) -> np.ndarray:
+        return np.bitwise_count(np.asarray(x, dtype=np.uint64))
+else:
+    def popcount(x) -> np.ndarray:
+        x = np.ascontiguousarray(x, dtype=np.uint64)
+        parts = _POPCOUNT16[x.view(np.uint16)].reshape(x.shape + (4,))
+        return parts.sum(axis=-1, dtype=np.uint8)
+
+
+def weight_table(weights) -> np.ndarray:
+    """號碼權重 (49,) → (8,256) 逐位元組加總表（little-endian 位元組序）"""
+    w = np.zeros(64)
+    w[1:MAX_NUMBER + 1] = np.asarray(weights, dtype=float)
+    byte_bits = (np.arange(256)[:, None] >> np.arange(8)) & 1           # (256,8)
+    return np.stack([byte_bits @ w[8 * k:8 * k + 8] for k in range(8)])
+
+
+def weighted_popcount(masks, table: np.ndarray) -> np.ndarray:
+    """集合內號碼權重和；table 由 weight_table 建立"""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    b = masks.view(np.uint8).reshape(masks.shape + (8,))
+    return table[np.arange(8), b].sum(axis=-1)
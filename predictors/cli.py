@@ -0,0 +1,119 @@
+# cli.py
+"""
+lottery-seek：無 GUI 的命令列入口
+
+功能：
+ 1. 每個預測方法一個子命令（prediction_api.PREDICTORS），參數由註冊表自動產生
+ 2. --count 批次注數、--seed 可重現、--format text / json / jsonl / csv、--out 輸出檔
+ 3. list 子命令列出所有方法與參數
+ 4. 不載入 tkinter / PySide6；只載入所選方法需要的引擎，可在 cron 或腳本中大量呼叫
+ 5. --metrics 路徑：啟用 metrics 並於結束時寫出熱點計時（.json 為 JSON，其餘為 Prometheus 文字格式）
+
+依賴：
+ - prediction_api, metrics
+
+使用：
+    python cli.py list
+    python cli.py mystic --count 10 --seed 7 --format json
+    python cli.py mapping --birth "1990-05-17 15:30" --alpha 0.6 --method top
+    python cli.py weights --sources frequency,recency --count 100 --format csv --out picks.csv
+    python cli.py mystic --count 1000 --metrics metrics.prom
+    （PyInstaller：pyinstaller lottery-seek.spec → lottery-seek 執行檔）
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+import metrics
+from prediction_api import PREDICTORS, run
+
+FORMATS = ['text', 'json', 'jsonl', 'csv']
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat(timespec='minutes')
+    raise TypeError(f"{type(obj).__name__} 無法輸出為 JSON")
+
+
+def render(name: str, params: dict, seed, results: list[dict], fmt: str) -> str:
+    if fmt == 'json':
+        doc = {'method': name, 'params': params, 'seed': seed, 'count': len(results), 'results': results}
+        return json.dumps(doc, ensure_ascii=False, default=_json_default) + '\n'
+    if fmt == 'jsonl':
+        return ''.join(json.dumps({'index': i, **r}, ensure_ascii=False) + '\n'
+                       for i, r in enumerate(results))
+    if fmt == 'csv':
+        k = max(len(r['numbers']) for r in results)
+        extra = [key for key in results[0] if key != 'numbers']
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator='\n')
+        writer.writerow(['index'] + [f'n{i}' for i in range(1, k + 1)] + extra)
+        for i, r in enumerate(results):
+            writer.writerow([i] + r['numbers'] + [None] * (k - len(r['numbers']))
+                            + [' '.join(map(str, r[key])) if isinstance(r[key], list) else r[key]
+                               for key in extra])
+        return buf.getvalue()
+    return ''.join(' '.join(f'{n:02d}' for n in r['numbers']) + '\n' for r in results)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='lottery-seek', description='Lottery Seek 命令列預測')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='列出所有預測方法與參數')
+    for name, predictor in PREDICTORS.items():
+        p = sub.add_parser(name, help=predictor.help, description=predictor.help)
+        for param in predictor.params:
+            default = '現在時間' if callable(param.default) and param.type is datetime else param.default
+            if callable(default):
+                default = default()
+            p.add_argument(f"--{param.name.replace('_', '-')}", dest=param.name, default=None,
+                           help=f"{param.help}（預設：{default}）")
+        p.add_argument('--count', '-n', type=int, default=1, help='注數')
+        p.add_argument('--seed', type=int, default=None, help='亂數種子（同種子結果可重現）')
+        p.add_argument('--format', '-f', choices=FORMATS, default='text')
+        p.add_argument('--out', '-o', help='輸出檔（預設 stdout）')
+        p.add_argument('--metrics', help='寫出熱點計時（.json 或 Prometheus 文字檔）')
+    return parser
+
+
+def list_predictors() -> str:
+    lines = []
+    for name, predictor in PREDICTORS.items():
+        lines.append(f"{name:<14}{predictor.help}")
+        for param in predictor.params:
+            choices = f" [{'/'.join(param.choices)}]" if param.choices else ''
+            lines.append(f"    --{param.name.replace('_', '-'):<16}{param.help}{choices}")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None) -> int:
+    a = build_parser().parse_args(argv)
+    if a.command == 'list':
+        sys.stdout.write(list_predictors())
+        return 0
+    predictor = PREDICTORS[a.command]
+    if a.metrics:
+        metrics.enable()
+    raw = {p.name: getattr(a, p.name) for p in predictor.params if getattr(a, p.name) is not None}
+    try:
+        params = predictor.parse(raw)
+        results = run(a.command, params, a.count, a.seed)
+    except (ValueError, RuntimeError) as e:
+        print(f"lottery-seek {a.command}: {e}", file=sys.stderr)
+        return 2
+    text = render(a.command, params, a.seed, results, a.format)
+    if a.out:
+        with open(a.out, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    if a.metrics:
+        metrics.write(a.metrics)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# distribution_analyzer.py
+"""
+號碼產生器輸出分布分析
+
+功能：
+ 1. 精確計算（狀態空間可窮舉時）
+    - hexagram：銅錢 4^6 種爻值依奇偶合併為 64 種卦，逐爻對「已選號碼集合」做動態規劃
+    - mystic：窮舉全部 C(49,6) 組合套用玄學規則；generate_combo 的輸出即為通過組合上的均勻分布
+ 2. 其餘（依權重不放回抽號）以平行 Monte Carlo 估計，
+    直到每個號碼出現率的標準誤皆 < tol 或達樣本上限
+ 3. 各產生器輸出同格式報告：單號出現率、號碼對出現率、熵
+
+報告欄位：
+ - marginals  (49,)    各號碼出現在一注中的機率（總和 = 6）
+ - pairs      (49,49)  兩號碼同時出現的機率（對角線 = marginals）
+ - entropy    整注分布的熵 (bits)；Monte Carlo 無法估計時為 None
+ - marginal_entropy  marginals/6 的熵 (bits)，均勻時為 log2(49)
+ - method / samples / max_stderr
+
+依賴：
+ - numpy
+ - GUA_hexagram_predictor, mystic_predictor, mapping_engine, QimenZiwei_predictor（各產生器使用時才載入）
+
+使用：
+    python distribution_analyzer.py hexagram mystic qimen --tol 5e-4
+    python distribution_analyzer.py hexagram --mc          # 以 Monte Carlo 交叉驗證
+"""
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+import numpy as np
+from rng_service import RngService
+
+N_NUMBERS = 49
+TICKET_SIZE = 6
+UNIFORM_ENTROPY = math.log2(N_NUMBERS)
+# 組合中兩兩位置 (15 組)，用於號碼對計數
+PAIR_POS = np.array([(i, j) for i in range(TICKET_SIZE) for j in range(i + 1, TICKET_SIZE)])
+
+# --------- 共用 ---------
+
+def _combinations(values, k: int) -> np.ndarray:
+    """values 取 k 的所有組合（字典序），回傳 (C, k) 陣列"""
+    values = np.asarray(values)
+    n = len(values)
+    idx = np.arange(n)[:, None]
+    for _ in range(k - 1):
+        last = idx[:, -1]
+        reps = n - 1 - last
+        offsets = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+        nxt = np.repeat(last, reps) + 1 + offsets
+        idx = np.hstack([np.repeat(idx, reps, axis=0), nxt[:, None]])
+    return values[idx]
+
+
+def _mask_bits(keys: np.ndarray) -> np.ndarray:
+    """位元遮罩鍵 (K,) → (K,49) 0/1，第 n-1 欄代表號碼 n"""
+    return ((keys[:, None] >> np.arange(1, N_NUMBERS + 1)) & 1).astype(np.float64)
+
+
+def _count_combos(combos: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(M,6) 升冪組合 → (單號計數 (49,), 號碼對計數 (49,49) 上三角)"""
+    c = combos - 1
+    marg = np.bincount(c.ravel(), minlength=N_NUMBERS)
+    flat = (c[:, PAIR_POS[:, 0]] * N_NUMBERS + c[:, PAIR_POS[:, 1]]).ravel()
+    pairs = np.bincount(flat, minlength=N_NUMBERS * N_NUMBERS).reshape(N_NUMBERS, N_NUMBERS)
+    return marg, pairs
+
+
+def _symmetric_pairs(upper: np.ndarray, marginals: np.ndarray) -> np.ndarray:
+    pairs = upper + upper.T
+    np.fill_diagonal(pairs, marginals)
+    return pairs
+
+
+def _entropy(p: np.ndarray) -> float:
+    p = p[p > 0]
+    return float(-(p * np.log2(p)).sum())
+
+
+def make_report(name: str, method: str, marginals: np.ndarray, pairs: np.ndarray,
+                entropy: float | None = None, samples: int | None = None,
+                max_stderr: float = 0.0, **extra) -> dict:
+    return {
+        'generator': name, 'method': method, 'samples': samples,
+        'marginals': marginals, 'pairs': pairs,
+        'entropy': entropy, 'marginal_entropy': _entropy(marginals / TICKET_SIZE),
+        'max_stderr': max_stderr, **extra,
+    }
+
+# --------- 精確：六爻 ---------
+# 老陰 6 / 少陽 7 / 少陰 8 / 老陽 9 的機率（三枚銅錢）
+LINE_PROBS = {6: 1 / 8, 7: 3 / 8, 8: 3 / 8, 9: 1 / 8}
+
+
+def exact_hexagram() -> dict:
+    """GUA_hexagram_predictor.generate_numbers（隨機擲卦）的精確分布"""
+    import GUA_hexagram_predictor as gua
+    p_odd = sum(p for v, p in LINE_PROBS.items() if v % 2)
+    pool_masks = np.zeros(len(gua.POOL_TABLE), dtype=np.int64)
+    for pool, row in enumerate(gua.POOL_TABLE):
+        pool_masks[pool] = sum(1 << int(n) for n in row[:gua.POOL_SIZE[pool]])
+    bit = np.int64(1) << np.arange(N_NUMBERS + 1, dtype=np.int64)
+
+    final_keys, final_probs = [], []
+    for hexagram in range(64):
+        parity = [(hexagram >> i) & 1 for i in range(TICKET_SIZE)]
+        p_hex = math.prod(p_odd if b else 1 - p_odd for b in parity)
+        keys = np.zeros(1, dtype=np.int64)
+        probs = np.array([p_hex])
+        for i, b in enumerate(parity):
+            pool = b * len(gua.ELEMENTS) + gua.HEX_ELEMENTS[hexagram, i]
+            free = pool_masks[pool] & ~keys
+            # 候選池用完時放寬為同奇偶全池（與 generate_numbers 相同）
+            free = np.where(free == 0, gua.PARITY_MASKS[b] & ~keys, free)
+            choice = (free[:, None] & bit) != 0
+            rows, nums = np.nonzero(choice)
+            step_probs = probs[rows] / choice.sum(axis=1)[rows]
+            keys, inv = np.unique(keys[rows] | bit[nums], return_inverse=True)
+            probs = np.bincount(inv.ravel(), weights=step_probs, minlength=len(keys))
+        final_keys.append(keys)
+        final_probs.append(probs)
+
+    keys, inv = np.unique(np.concatenate(final_keys), return_inverse=True)
+    probs = np.bincount(inv.ravel(), weights=np.concatenate(final_probs), minlength=len(keys))
+    bits = _mask_bits(keys)
+    marginals = probs @ bits
+    pairs = (bits * probs[:, None]).T @ bits
+    return make_report('hexagram', 'exact', marginals, pairs, _entropy(probs), support=len(keys))
+
+# --------- 精確：玄學規則 ---------
+
+def exact_mystic(max_attempts: int = 10000) -> dict:
+    """mystic_predictor.generate_combo 的精確分布（條件於成功產生）
+
+    generate_combo 以均勻隨機組合做拒絕取樣，因此輸出為通過規則之組合上的均勻分布；
+    另回報接受率與 max_attempts 次內失敗 (回傳 None) 的機率。
+    """
+    import mystic_predictor as mystic
+    marg = np.zeros(N_NUMBERS, dtype=np.int64)
+    upper = np.zeros((N_NUMBERS, N_NUMBERS), dtype=np.int64)
+    accepted = total = 0
+    # 依首號分塊窮舉，單塊至多 C(48,5) 列
+    for first in range(1, N_NUMBERS - TICKET_SIZE + 2):
+        rest = _combinations(np.arange(first + 1, N_NUMBERS + 1), TICKET_SIZE - 1)
+        combos = np.hstack([np.full((len(rest), 1), first), rest])
+        ok = combos[mystic.RULES(combos)]
+        total += len(combos)
+        accepted += len(ok)
+        m, p = _count_combos(ok)
+        marg += m
+        upper += p
+    if accepted == 0:
+        raise ValueError("沒有任何組合通過目前的規則")
+    marginals = marg / accepted
+    pairs = _symmetric_pairs(upper / accepted, marginals)
+    acceptance = accepted / total
+    return make_report('mystic', 'exact', marginals, pairs, math.log2(accepted),
+                       support=accepted, acceptance=acceptance,
+                       failure_prob=(1 - acceptance) ** max_attempts)
+
+# --------- Monte Carlo 取樣器 ---------
+# 取樣器簽名：sampler(n, rng) → (n,6) 升冪號碼；需可 pickle（模組層級函式或 partial）
+
+def sample_hexagram(n: int, rng: np.random.Generator) -> np.ndarray:
+    import GUA_hexagram_predictor as gua
+    return gua.generate_numbers_batch(gua.auto_hexagram_batch(n, rng), rng)
+
+
+def sample_mystic(n: int, rng: np.random.Generator, batch_size: int = 65536) -> np.ndarray:
+    import mystic_predictor as mystic
+    parts, got = [], 0
+    while got < n:
+        batch = np.argpartition(rng.random((batch_size, N_NUMBERS)), TICKET_SIZE, axis=1)[:, :TICKET_SIZE] + 1
+        ok = batch[mystic.RULES(batch)]
+        parts.append(ok)
+        got += len(ok)
+    return np.sort(np.concatenate(parts)[:n], axis=1)
+
+
+def sample_weighted(n: int, rng: np.random.Generator, weights: np.ndarray) -> np.ndarray:
+    """依權重不放回抽 6 顆（Gumbel top-k，分布同 np.random.choice(replace=False, p=...)）"""
+    with np.errstate(divide='ignore'):
+        logw = np.log(np.asarray(weights, dtype=float))
+    keys = logw + rng.gumbel(size=(n, N_NUMBERS))
+    return np.sort(np.argpartition(-keys, TICKET_SIZE - 1, axis=1)[:, :TICKET_SIZE] + 1, axis=1)
+
+
+def _mc_counts(sampler, n: int, seed: np.random.SeedSequence):
+    return _count_combos(sampler(n, np.random.default_rng(seed)))
+
+
+def monte_carlo(name: str, sampler, tol: float = 1e-3, batch: int = 200_000,
+                max_samples: int = 50_000_000, seed: int = 0, workers: int | None = None) -> dict:
+    """平行 Monte Carlo：每輪各行程抽 batch 注，直到單號出現率標準誤上限 < tol"""
+    workers = workers or os.cpu_count() or 1
+    # 每輪接續衍生 workers 個子種子；輪數不受 batch / max_samples 限制，結果仍由 seed 決定
+    rngs = RngService(seed)
+    marg = np.zeros(N_NUMBERS, dtype=np.int64)
+    upper = np.zeros((N_NUMBERS, N_NUMBERS), dtype=np.int64)
+    n = 0
+    se = float('inf')
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while n < max_samples and se >= tol:
+            size = min(batch, max(1, (max_samples - n) // workers))
+            jobs = [(sampler, size, s) for s in rngs.seed_sequences(workers)]
+            results = pool.map(_mc_counts, *zip(*jobs)) if pool else [_mc_counts(*jobs[0])]
+            for m, p in results:
+                marg += m
+                upper += p
+                n += size
+            p_hat = marg / n
+            se = float(np.sqrt(p_hat * (1 - p_hat) / n).max())
+    finally:
+        if pool:
+            pool.shutdown()
+    marginals = marg / n
+    return make_report(name, 'monte_carlo', marginals, _symmetric_pairs(upper / n, marginals),
+                       samples=n, max_stderr=se)
+
+# --------- 產生器登錄 ---------
+
+def _qimen_weights(at: datetime) -> np.ndarray:
+    from mapping_engine import qimen_number_weights
+    return qimen_number_weights(at, 120.0)
+
+
+def _qimen_simple_weights(at: datetime) -> np.ndarray:
+    from QimenZiwei_predictor import qimen_weights
+    return qimen_weights(at)
+
+# 名稱 → (精確計算函式或 None, 建立取樣器的函式(at))
+GENERATORS = {
+    'hexagram': (exact_hexagram, lambda at: sample_hexagram),
+    'mystic': (exact_mystic, lambda at: sample_mystic),
+    'qimen': (None, lambda at: partial(sample_weighted, weights=_qimen_weights(at))),
+    'qimen_simple': (None, lambda at: partial(sample_weighted, weights=_qimen_simple_weights(at))),
+}
+
+
+def analyze(name: str, at: datetime | None = None, force_mc: bool = False, **mc_options) -> dict:
+    """依產生器可行性選擇精確計算或 Monte Carlo"""
+    if name not in GENERATORS:
+        raise ValueError(f"未知的產生器：{name}（可用：{', '.join(GENERATORS)}）")
+    exact, make_sampler = GENERATORS[name]
+    if exact is not None and not force_mc:
+        return exact()
+    return monte_carlo(name, make_sampler(at or datetime.now()), **mc_options)
+
+
+def top_pairs(report: dict, n: int = 5) -> list[tuple[int, int, float]]:
+    pairs = np.triu(report['pairs'], 1)
+    flat = np.argsort(pairs, axis=None)[::-1][:n]
+    return [(int(i) + 1, int(j) + 1, float(pairs[i, j]))
+            for i, j in zip(*np.unravel_index(flat, pairs.shape))]
+
+
+def format_report(reports: list[dict]) -> str:
+    uniform_marg = TICKET_SIZE / N_NUMBERS
+    uniform_pair = uniform_marg * (TICKET_SIZE - 1) / (N_NUMBERS - 1)
+    lines = [f"{'產生器':<14}{'方式':<13}{'樣本數':>11}{'整注熵':>9}{'單號熵':>9}"
+             f"{'最大標準誤':>11}{'單號最小':>9}{'單號最大':>9}{'支撐組數':>11}",
+             f"（均勻基準：單號 {uniform_marg:.4f}、號碼對 {uniform_pair:.5f}、"
+             f"整注熵 {math.log2(math.comb(N_NUMBERS, TICKET_SIZE)):.3f}、單號熵 {UNIFORM_ENTROPY:.3f} bits）"]
+    for r in reports:
+        ent = '-' if r['entropy'] is None else f"{r['entropy']:.3f}"
+        samples = '-' if r['samples'] is None else str(r['samples'])
+        lines.append(f"{r['generator']:<16}{r['method']:<15}{samples:>11}{ent:>11}"
+                     f"{r['marginal_entropy']:>11.3f}{r['max_stderr']:>13.2e}"
+                     f"{r['marginals'].min():>11.4f}{r['marginals'].max():>11.4f}"
+                     f"{r.get('support', '-'):>12}")
+    for r in reports:
+        m = r['marginals']
+        hot = np.argsort(m)[::-1][:6] + 1
+        cold = np.flatnonzero(m == 0) + 1
+        lines.append(f"\n[{r['generator']}] 最常見號碼 {hot.tolist()}"
+                     + (f"，不可能出現 {cold.tolist()}" if cold.size else ''))
+        lines.append('  最常見號碼對 ' + ', '.join(f"{a}-{b}:{p:.4f}" for a, b, p in top_pairs(r)))
+        if 'acceptance' in r:
+            lines.append(f"  規則接受率 {r['acceptance']:.4%}，generate_combo 失敗機率 {r['failure_prob']:.2e}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='號碼產生器輸出分布分析')
+    parser.add_argument('generators', nargs='*', default=list(GENERATORS),
+                        help=f"產生器（{', '.join(GENERATORS)}）")
+    parser.add_argument('--mc', action='store_true', help='一律使用 Monte Carlo')
+    parser.add_argument('--at', help='奇門起盤時刻 (YYYY-MM-DD HH:MM，預設現在)')
+    parser.add_argument('--tol', type=float, default=1e-3, help='單號出現率標準誤上限')
+    parser.add_argument('--max-samples', type=int, default=50_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    a = parser.parse_args(argv)
+    at = datetime.strptime(a.at, '%Y-%m-%d %H:%M') if a.at else None
+    reports = [analyze(g, at, a.mc, tol=a.tol, max_samples=a.max_samples,
+                       seed=a.seed, workers=a.workers) for g in a.generators]
+    print(format_report(reports))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# gui_hexagram_predictor.py
+# 完整八卦預測器 Tkinter GUI：顯示卦象圖、本卦→變卦、六顆預測號碼
+# 計算皆在 GUA_hexagram_predictor（不依賴 tkinter）
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+from GUA_hexagram_predictor import auto_hexagram, datetime_hexagram, generate_numbers, lines_to_trigrams
+
+class HexagramGUI(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title('完整八卦預測器')
+        self.geometry('420x480')
+        self.lines = []
+        self.create_widgets()
+
+    def create_widgets(self):
+        frm = ttk.Frame(self)
+        frm.pack(pady=10)
+        ttk.Button(frm, text='隨機擲卦', command=self.random_hexagram).grid(row=0, column=0, padx=5)
+        ttk.Button(frm, text='以當前時間起卦', command=self.datetime_hexagram).grid(row=0, column=1, padx=5)
+        ttk.Button(frm, text='重新選號', command=self.refresh_numbers).grid(row=0, column=2, padx=5)
+
+        self.hex_text = tk.Text(self, height=8, width=40, state='disabled', font=('Consolas', 12))
+        self.hex_text.pack(pady=10)
+        self.num_var = tk.StringVar()
+        ttk.Label(self, text='預測號碼', font=('Arial', 12)).pack()
+        ttk.Label(self, textvariable=self.num_var, font=('Consolas', 20)).pack(pady=10)
+
+    # 事件
+    def random_hexagram(self):
+        self.lines = auto_hexagram()
+        self.display_hexagram()
+        self.generate_and_show()
+
+    def datetime_hexagram(self):
+        self.lines = datetime_hexagram(datetime.now())
+        self.display_hexagram()
+        self.generate_and_show()
+
+    def refresh_numbers(self):
+        if not self.lines:
+            messagebox.showinfo('提示', '請先起卦')
+            return
+        self.generate_and_show()
+
+    # Helper
+    def display_hexagram(self):
+        self.hex_text.configure(state='normal'); self.hex_text.delete('1.0', tk.END)
+        lines_disp = []
+        symbols = {6:'⚋ x', 7:'⚊', 8:'⚋', 9:'⚊ x'}
+        for v in self.lines[::-1]:  # 高爻在上
+            lines_disp.append(symbols[v])
+        lower, upper = lines_to_trigrams(self.lines)
+        self.hex_text.insert(tk.END, '\n'.join(lines_disp) + f"\n上卦: {upper}  下卦: {lower}\n")
+        self.hex_text.configure(state='disabled')
+
+    def generate_and_show(self):
+        nums = generate_numbers(self.lines)
+        self.num_var.set('  '.join(f"{n:02d}" for n in nums))
+
+
+if __name__ == '__main__':
+    try:
+        import numpy  # ensure numpy available for randomness consistency (optional)
+    except ImportError:
+        pass
+    app = HexagramGUI()
+    app.mainloop()
@@ -0,0 +1,112 @@
+# gui_lottery_predictor.py
+# GUI 版進階大樂透預測器：科學 + 玄學 權重組合並可選 top/random 策略
+# 權重與選號皆在 predict（不依賴 tkinter）
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from history_service import get_service
+from predict import (
+    frequency_weights, recency_weights, numerology_weights, fibonacci_weights,
+    combine, predict
+)
+
+class LotteryGUI(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title("大樂透預測器 (科學+玄學)")
+        self.geometry("400x500")
+        # 加載歷史資料並生成各權重；檔案更新時由共用服務在背景重新載入
+        self.history = get_service()
+        self.history.start_watching()
+        self._load_reds()
+        self.weights_funcs = {
+            '頻率': frequency_weights,
+            '時序': recency_weights,
+            '數字學': numerology_weights,
+            'Fibonacci': fibonacci_weights,
+        }
+        self.create_widgets()
+
+    def create_widgets(self):
+        frame = ttk.Frame(self)
+        frame.pack(padx=10, pady=10, fill='x')
+        # 科學方法
+        sci_label = ttk.Label(frame, text="科學方法：")
+        sci_label.pack(anchor='w')
+        self.sci_vars = {}
+        for name in ['頻率', '時序']:
+            var = tk.BooleanVar(value=True)
+            chk = ttk.Checkbutton(frame, text=name, variable=var)
+            chk.pack(anchor='w')
+            self.sci_vars[name] = var
+        # 玄學方法
+        myst_label = ttk.Label(frame, text="玄學方法：")
+        myst_label.pack(anchor='w', pady=(10,0))
+        self.myst_vars = {}
+        for name in ['數字學', 'Fibonacci']:
+            var = tk.BooleanVar(value=True)
+            chk = ttk.Checkbutton(frame, text=name, variable=var)
+            chk.pack(anchor='w')
+            self.myst_vars[name] = var
+        # 策略選擇
+        strat_label = ttk.Label(frame, text="預測策略：")
+        strat_label.pack(anchor='w', pady=(10,0))
+        self.method_var = tk.StringVar(value='top')
+        ttk.Radiobutton(frame, text='Top K', variable=self.method_var, value='top').pack(anchor='w')
+        ttk.Radiobutton(frame, text='隨機', variable=self.method_var, value='random').pack(anchor='w')
+        # K 值
+        k_frame = ttk.Frame(frame)
+        k_frame.pack(anchor='w', pady=(10,0))
+        ttk.Label(k_frame, text='選取數量 K:').pack(side='left')
+        self.k_var = tk.IntVar(value=6)
+        ttk.Spinbox(k_frame, from_=1, to=49, textvariable=self.k_var, width=5).pack(side='left')
+        # 預測按鈕
+        btn = ttk.Button(frame, text='預測號碼', command=self.on_predict)
+        btn.pack(pady=(20,0))
+        # 結果顯示
+        self.result_text = tk.Text(self, height=10)
+        self.result_text.pack(padx=10, pady=10, fill='both', expand=True)
+
+    def _load_reds(self):
+        snap = self.history.snapshot()
+        self.version, self.reds = snap.version, snap.reds_frame()
+
+    def on_predict(self):
+        if self.history.snapshot().version != self.version:
+            self._load_reds()
+        methods = []
+        weights = []
+        # 科學
+        for name, var in self.sci_vars.items():
+            if var.get():
+                w = self.weights_funcs[name](self.reds)
+                methods.append(name)
+                weights.append(w)
+        # 玄學
+        for name, var in self.myst_vars.items():
+            if var.get():
+                if name == '數字學':
+                    w = numerology_weights()
+                else:
+                    w = fibonacci_weights()
+                methods.append(name)
+                weights.append(w)
+        if not weights:
+            messagebox.showwarning("錯誤", "請至少選擇一種方法！")
+            return
+        alphas = [1/len(weights)] * len(weights)
+        comb = combine(weights, alphas)
+        k = self.k_var.get()
+        top_nums = predict(comb, 'top', k)
+        rand_nums = predict(comb, 'random', k)
+        # 顯示
+        self.result_text.delete('1.0', tk.END)
+        self.result_text.insert(tk.END, f"歷史資料：{len(self.reds)} 期（版本 {self.version}）\n")
+        self.result_text.insert(tk.END, f"方法：{', '.join(methods)}\n")
+        self.result_text.insert(tk.END, f"Top {k} 號碼：{top_nums}\n")
+        self.result_text.insert(tk.END, f"隨機 {k} 號碼：{rand_nums}\n")
+
+
+if __name__ == '__main__':
+    app = LotteryGUI()
+    app.mainloop()
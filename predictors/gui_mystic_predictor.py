@@ -0,0 +1,34 @@
+# gui_mystic_predictor.py
+# 玄學大樂透預測器 Tkinter GUI：顯示生成組合，可按鈕刷新
+# 規則與產生器皆在 mystic_predictor（不依賴 tkinter）
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from mystic_predictor import generate_combo
+
+class MysticGUI(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title("玄學大樂透預測器")
+        self.geometry("340x260")
+        ttk.Label(self, text="符合陰陽‧五行‧吉/忌規則的號碼：", font=("Arial", 12)).pack(pady=10)
+        self.num_var = tk.StringVar(value="點擊『生成』取得號碼")
+        lbl = ttk.Label(self, textvariable=self.num_var, font=("Consolas", 18))
+        lbl.pack(pady=10)
+        btn = ttk.Button(self, text="生成號碼", command=self.on_generate)
+        btn.pack(pady=10)
+        self.status_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.status_var, foreground="gray").pack(pady=5)
+
+    def on_generate(self):
+        combo = generate_combo()
+        if combo:
+            self.num_var.set('  '.join(f"{n:02d}" for n in combo))
+            self.status_var.set("成功生成！祝好運 ✨")
+        else:
+            messagebox.showwarning("生成失敗", "在上限嘗試次數內無法找到符合規則的組合，請稍後再試。")
+
+
+if __name__ == '__main__':
+    app = MysticGUI()
+    app.mainloop()
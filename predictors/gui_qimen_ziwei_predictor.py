@@ -0,0 +1,55 @@
+# gui_qimen_ziwei_predictor.py
+# 奇門遁甲 + 紫微斗數 預測器 Tkinter GUI
+# 權重與選號皆在 QimenZiwei_predictor（不依賴 tkinter）
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+import numpy as np
+from QimenZiwei_predictor import qimen_weights, ziwei_weights, pick_numbers
+
+class PredictorGUI(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title('奇門遁甲 + 紫微斗數 預測器')
+        self.geometry('480x380')
+        self.create_widgets()
+
+    def create_widgets(self):
+        frm = ttk.Frame(self)
+        frm.pack(pady=8)
+        # 紫微生日輸入
+        ttk.Label(frm, text='出生年月日 (YYYY-MM-DD):').grid(row=0,column=0,sticky='e')
+        self.birth_var = tk.StringVar()
+        ttk.Entry(frm, textvariable=self.birth_var,width=12).grid(row=0,column=1)
+        # 比重
+        ttk.Label(frm, text='奇門 (0~1):').grid(row=1,column=0,sticky='e')
+        self.qm_var = tk.DoubleVar(value=0.5)
+        ttk.Entry(frm, textvariable=self.qm_var,width=6).grid(row=1,column=1,sticky='w')
+        ttk.Label(frm, text='紫微 (補足):').grid(row=1,column=2,sticky='e')
+        # 按鈕
+        ttk.Button(self, text='生成號碼', command=self.on_generate).pack(pady=15)
+        self.output = tk.Text(self,height=10,state='disabled',font=('Consolas',12))
+        self.output.pack(fill='both',expand=True,padx=10)
+
+    def on_generate(self):
+        try:
+            birth = datetime.strptime(self.birth_var.get().strip(), '%Y-%m-%d')
+        except ValueError:
+            messagebox.showerror('格式錯誤','請輸入 YYYY-MM-DD 格式生日'); return
+        alpha = min(max(self.qm_var.get(),0),1)
+        qm_w = qimen_weights(datetime.now())
+        zw_w = ziwei_weights(birth)
+        combined = qm_w*alpha + zw_w*(1-alpha)
+        combined /= combined.sum()
+        nums_top = np.argsort(combined)[-6:][::-1]+1
+        nums_rand = pick_numbers(combined,6)
+        self.output.configure(state='normal'); self.output.delete('1.0',tk.END)
+        self.output.insert(tk.END, f"奇門權重: {alpha:.2f}\n紫微權重: {1-alpha:.2f}\n")
+        self.output.insert(tk.END, f"Top6: {' '.join(f'{n:02d}' for n in nums_top)}\n")
+        self.output.insert(tk.END, f"隨機6: {' '.join(f'{n:02d}' for n in nums_rand)}\n")
+        self.output.configure(state='disabled')
+
+
+if __name__ == '__main__':
+    PredictorGUI().mainloop()
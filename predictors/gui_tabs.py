@@ -0,0 +1,22 @@
+# gui_tabs.py
+"""
+all_gui 分頁 → 預測引擎模組對照表
+
+功能：
+ 1. TAB_ENGINES：各分頁第一次開啟時於背景 import 的引擎模組
+ 2. all_gui（延遲載入）與 startup_profiler（import 成本分析）共用同一份對照，
+    新增分頁只需改這裡
+
+依賴：無（不 import PySide6 或任何引擎，供分析工具單獨使用）
+
+使用：
+    from gui_tabs import TAB_ENGINES
+"""
+
+TAB_ENGINES = {
+    'gua': ['GUA_hexagram_predictor'],      # 八卦卦象預測
+    'mystic': ['mystic_predictor'],         # 玄學神秘預測
+    'map': ['mapping_engine'],              # 映射(奇門紫微)預測
+    'sci': ['predict'],                     # 科學權重預測
+    'qz': ['QimenZiwei_predictor'],         # 簡易奇門紫微預測
+}
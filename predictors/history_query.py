@@ -0,0 +1,142 @@
+# history_query.py
+"""
+投注號碼 vs 歷史開獎 對中查詢
+
+功能：
+ 1. 歷史開獎轉為 uint64 位元集合陣列（bitset），載入一次重複查詢
+    - 資料取自 history_service 共用快照；get_index(path) 於快照版本變動時重建索引
+ 2. 單注或整批 (M×6) 投注一次向量化 popcount，得到每注對每期的對中數
+ 3. 回傳每注的對中數分布（0–6 中幾期）與對中 ≥ min_match 的開獎日期（附是否中特別號）
+
+依賴：
+ - numpy
+ - bitset, history_service
+
+使用：
+    from history_query import get_index
+    idx = get_index('lottery_results.xlsx')
+    hist = idx.histogram([[1, 2, 3, 4, 5, 6]])     # (1,7)
+    res = idx.query([[1, 2, 3, 4, 5, 6]], min_match=3)
+    python history_query.py 3 8 15 22 31 44
+"""
+import argparse
+import numpy as np
+from bitset import popcount, to_masks
+from history_service import DEFAULT_PATH, get_service
+
+TICKET_SIZE = 6
+# 每次比對的 (注數 × 期數) 上限，控制記憶體
+BLOCK_CELLS = 8_000_000
+
+
+class HistoryIndex:
+    """歷史開獎的位元集合索引（依日期由新到舊）"""
+
+    def __init__(self, dates, reds, special=None, version=None):
+        self.version = version      # 來源快照版本（非由快照建立時為 None）
+        order = np.argsort(np.asarray(dates, dtype='datetime64[D]'))[::-1]
+        self.dates = np.asarray(dates, dtype='datetime64[D]')[order]
+        self._date_text = self.dates.astype(str).tolist()
+        self.masks = to_masks(np.asarray(reds, dtype=np.int64)[order])
+        if special is None:
+            self.special = np.zeros(len(self.dates), dtype=np.uint64)
+        else:
+            self.special = np.uint64(1) << np.asarray(special, dtype=np.uint64)[order]
+
+    @classmethod
+    def from_snapshot(cls, snap) -> 'HistoryIndex':
+        return cls(snap.dates, snap.reds, snap.special, version=snap.version)
+
+    @classmethod
+    def from_excel(cls, path: str = DEFAULT_PATH) -> 'HistoryIndex':
+        """經由共用的 history_service 取得目前快照（同一檔案只讀取一次）"""
+        return cls.from_snapshot(get_service(path).snapshot())
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    # ---- 比對 ----
+    def _blocks(self, tickets):
+        """依 BLOCK_CELLS 分塊產生 (起始列, 注位元集合, 對中數 (m,D) uint8)"""
+        t = to_masks(np.asarray(tickets, dtype=np.int64).reshape(-1, TICKET_SIZE))
+        step = max(1, BLOCK_CELLS // max(len(self), 1))
+        for start in range(0, len(t), step):
+            block = t[start:start + step]
+            yield start, block, popcount(block[:, None] & self.masks[None, :])
+
+    def match_counts(self, tickets) -> np.ndarray:
+        """(M,6) → (M,D) 每注對每期的一般號對中數"""
+        parts = [c for _, _, c in self._blocks(tickets)]
+        return np.concatenate(parts) if parts else np.zeros((0, len(self)), dtype=np.uint8)
+
+    def histogram(self, tickets) -> np.ndarray:
+        """(M,6) → (M,7)：第 k 欄為對中 k 顆的期數"""
+        parts = [_histogram(counts) for _, _, counts in self._blocks(tickets)]
+        return np.concatenate(parts) if parts else np.zeros((0, TICKET_SIZE + 1), dtype=np.int64)
+
+    def query(self, tickets, min_match: int = 3) -> list[dict]:
+        """每注回傳 {'ticket', 'histogram', 'matches': [(日期, 對中數, 中特別號), ...]}
+
+        matches 依日期由新到舊，只列對中數 ≥ min_match 的期別；分布與日期在同一次比對中取得。
+        """
+        tickets = np.sort(np.asarray(tickets, dtype=np.int64).reshape(-1, TICKET_SIZE), axis=1)
+        results = []
+        for start, block, counts in self._blocks(tickets):
+            hist = _histogram(counts)
+            matches = [[] for _ in range(len(block))]
+            rows, cols = np.nonzero(counts >= min_match)
+            sp = (block[rows] & self.special[cols]) != 0
+            text = self._date_text
+            for r, c, k, s in zip(rows.tolist(), cols.tolist(), counts[rows, cols].tolist(), sp.tolist()):
+                matches[r].append((text[c], k, s))
+            results.extend({'ticket': t.tolist(), 'histogram': h.tolist(), 'matches': m}
+                           for t, h, m in zip(tickets[start:start + len(block)], hist, matches))
+        return results
+
+
+_indexes = {}      # 路徑 → HistoryIndex
+
+
+def get_index(path: str = DEFAULT_PATH) -> HistoryIndex:
+    """共用索引；歷史檔更新（快照版本變動）後下次呼叫即重建"""
+    snap = get_service(path).snapshot()
+    index = _indexes.get(path)
+    if index is None or index.version != snap.version:
+        index = _indexes[path] = HistoryIndex.from_snapshot(snap)
+    return index
+
+
+def _histogram(counts: np.ndarray) -> np.ndarray:
+    return np.stack([(counts == k).sum(axis=1) for k in range(TICKET_SIZE + 1)], axis=1)
+
+
+def format_result(result: dict, total: int) -> str:
+    t = ' '.join(f'{n:02d}' for n in result['ticket'])
+    hist = '、'.join(f"{k} 顆 {c}" for k, c in enumerate(result['histogram']))
+    lines = [f"[{t}] 共 {total} 期：{hist}"]
+    for date, k, sp in result['matches']:
+        lines.append(f"  {date}  對中 {k} 顆" + (' + 特別號' if sp else ''))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='投注號碼歷史對中查詢')
+    parser.add_argument('numbers', nargs='*', type=int, help='6 顆號碼（可多注，依序每 6 顆一注）')
+    parser.add_argument('--file', help='投注 CSV（n1..n6）')
+    parser.add_argument('--history', default='lottery_results.xlsx')
+    parser.add_argument('--min-match', type=int, default=3, help='列出日期的最低對中數')
+    a = parser.parse_args(argv)
+    if a.file:
+        from prize_simulator import load_tickets
+        tickets = load_tickets(a.file)
+    elif a.numbers and len(a.numbers) % TICKET_SIZE == 0:
+        tickets = np.array(a.numbers).reshape(-1, TICKET_SIZE)
+    else:
+        parser.error('請輸入 6 的倍數個號碼或 --file')
+    idx = get_index(a.history)
+    for r in idx.query(tickets, a.min_match):
+        print(format_result(r, len(idx)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+# history_service.py
+"""
+歷史開獎資料服務（全程序共用）
+
+功能：
+ 1. 每個檔案只讀取一次，提供不可變的快照 HistorySnapshot（陣列唯讀，附版本號）
+    - 各模組取得同一份快照，不會對「有哪些期別」看法不一，也不重複 I/O
+ 2. 檔案監看：背景執行緒輪詢 mtime / 檔案大小；爬蟲寫入新資料後自動重新載入並遞增版本號
+    - 讀取失敗（例如檔案寫到一半）時保留舊快照，下次輪詢再試
+    - 尚未有人取用快照前不會載入
+ 3. 訂閱：subscribe(callback) 在新快照產生後以新快照呼叫，供相依的快取失效
+    （callback 於監看執行緒或呼叫 refresh() 的執行緒中執行，GUI 需自行轉回主執行緒）
+
+依賴：
+ - numpy, pandas（第一次載入時才 import）
+ - metrics（load_history 計時、重新載入次數）
+
+使用：
+    from history_service import get_service
+    svc = get_service('lottery_results.xlsx')
+    snap = svc.snapshot()            # snap.version, snap.dates, snap.reds, snap.special
+    svc.subscribe(lambda snap: print('新版本', snap.version))
+    svc.start_watching(interval=2.0)
+"""
+import os
+import threading
+import time
+import traceback
+from metrics import inc, timed
+
+DEFAULT_PATH = 'lottery_results.xlsx'
+POLL_INTERVAL = 2.0
+TICKET_SIZE = 6
+
+
+class HistorySnapshot:
+    """某一版本的歷史開獎（依檔案列序，爬蟲輸出為由新到舊）"""
+
+    def __init__(self, version: int, path: str, mtime_ns: int, dates, reds, special):
+        self.version = version
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.loaded_at = time.time()
+        self.dates, self.reds, self.special = dates, reds, special
+        for arr in (dates, reds, special):
+            arr.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.reds)
+
+    def reds_frame(self):
+        """red1..red6 的 DataFrame（與 predict.load_history 相同格式；每次回傳新物件）"""
+        import pandas as pd
+        return pd.DataFrame(self.reds, columns=[f'red{i}' for i in range(1, TICKET_SIZE + 1)])
+
+
+@timed('load_history')
+def read_history(path: str):
+    """讀取 xlsx → (dates datetime64[D], reds (D,6) int64, special (D,) int64)"""
+    import numpy as np
+    import pandas as pd
+    df = pd.read_excel(path)
+    reds = df[[f'red{i}' for i in range(1, TICKET_SIZE + 1)]].to_numpy(dtype=np.int64)
+    dates = df['date'].to_numpy(dtype='datetime64[D]')
+    if 'special' in df:
+        special = df['special'].to_numpy(dtype=np.int64)
+    else:
+        special = np.zeros(len(df), dtype=np.int64)
+    return dates, reds, special
+
+
+class HistoryService:
+    """單一歷史檔案的共用快照與監看"""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._snap = None
+        self._stat_seen = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, stat) -> HistorySnapshot:
+        version = self._snap.version + 1 if self._snap is not None else 1
+        return HistorySnapshot(version, self.path, stat[0], *read_history(self.path))
+
+    def snapshot(self) -> HistorySnapshot:
+        """目前快照；第一次呼叫時載入"""
+        snap = self._snap
+        if snap is not None:
+            return snap
+        with self._lock:
+            if self._snap is None:
+                stat = self._stat()
+                self._snap = self._load(stat)
+                self._stat_seen = stat
+            return self._snap
+
+    def refresh(self) -> bool:
+        """檔案有變動則重新載入並通知訂閱者；回傳是否產生新快照"""
+        with self._lock:
+            if self._snap is None:
+                return False
+            try:
+                stat = self._stat()
+            except OSError:
+                return False
+            if stat == self._stat_seen:
+                return False
+            try:
+                snap = self._load(stat)
+            except Exception:
+                inc('history_reload_failures')
+                return False          # 可能寫到一半，保留舊快照
+            inc('history_reloads')
+            self._snap, self._stat_seen = snap, stat
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(snap)
+            except Exception:
+                traceback.print_exc()     # 單一訂閱者出錯不影響其他訂閱者
+        return True
+
+    def subscribe(self, callback):
+        """註冊 callback(snapshot)；回傳取消訂閱的函式"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    # ---- 監看 ----
+    def start_watching(self, interval: float = POLL_INTERVAL) -> None:
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                         name=f'history-watch:{os.path.basename(self.path)}',
+                                         daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.refresh()
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(path: str = DEFAULT_PATH) -> HistoryService:
+    """依絕對路徑取得共用的 HistoryService"""
+    key = os.path.abspath(path)
+    with _services_lock:
+        if key not in _services:
+            _services[key] = HistoryService(key)
+        return _services[key]
+
+
+def snapshot(path: str = DEFAULT_PATH) -> HistorySnapshot:
+    return get_service(path).snapshot()
+
+
+if __name__ == '__main__':
+    import sys
+    svc = get_service(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)
+    snap = svc.snapshot()
+    print(f"版本 {snap.version}：{len(snap)} 期，最新 {snap.dates.max()}；監看中（Ctrl+C 結束）")
+    svc.subscribe(lambda s: print(f"版本 {s.version}：{len(s)} 期，最新 {s.dates.max()}"))
+    svc.start_watching()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        svc.stop_watching()
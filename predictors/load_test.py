@@ -0,0 +1,186 @@
+# load_test.py
+"""
+預測 HTTP 服務壓力測試（asyncio，僅標準函式庫）
+
+功能：
+ 1. 以 concurrency 條 keep-alive 連線送出共 requests 個請求
+    - 預設路徑混合所有方法；--distinct 控制不同 seed 的數量（越少越容易命中合併 / 快取）
+ 2. 回報吞吐量、延遲百分位 (p50 / p90 / p99 / max)、各狀態碼次數與服務端 /stats
+ 3. --spawn：自行在空閒埠啟動 prediction_server.py 子行程（獨立行程群組），測完連同工作行程一併關閉
+
+使用：
+    python load_test.py --spawn --concurrency 50 --requests 2000
+    python load_test.py --url http://127.0.0.1:8765 --path '/predict/mystic?count=5'
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/predict/hexagram?count=5',
+    '/predict/mystic?count=5',
+    '/predict/mapping?birth=1990-05-17%2015:30&count=5',
+    '/predict/qimen-ziwei?birth=1990-05-17&count=5',
+    '/predict/weights?count=5',
+]
+
+
+async def _request(reader, writer, host: str, path: str) -> tuple[int, bytes]:
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        k, _, v = line.decode('latin-1').partition(':')
+        if k.strip().lower() == 'content-length':
+            length = int(v)
+    return status, await reader.readexactly(length)
+
+
+async def _client(host, port, jobs: asyncio.Queue, latencies: list, statuses: Counter):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                path = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            try:
+                status, _ = await _request(reader, writer, host, path)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                statuses['連線錯誤'] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def _get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, body = await _request(reader, writer, host, path)
+        return json.loads(body)
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    i = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+async def load_test(url: str, paths: list[str], n_requests: int, concurrency: int, distinct: int) -> dict:
+    u = urlsplit(url)
+    host, port = u.hostname or '127.0.0.1', u.port or 80
+    jobs = asyncio.Queue()
+    for i in range(n_requests):
+        path = paths[i % len(paths)]
+        if distinct > 0:
+            path += ('&' if '?' in path else '?') + f'seed={i // len(paths) % distinct}'
+        jobs.put_nowait(path)
+    latencies, statuses = [], Counter()
+    t0 = time.perf_counter()
+    await asyncio.gather(*[_client(host, port, jobs, latencies, statuses) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        'requests': n_requests, 'elapsed': elapsed, 'throughput': len(latencies) / elapsed,
+        'latency_ms': {q: percentile(latencies, q) * 1000 for q in (50, 90, 99, 100)},
+        'statuses': dict(statuses), 'server': await _get_json(host, port, '/stats'),
+    }
+
+
+def format_report(r: dict) -> str:
+    lat = r['latency_ms']
+    lines = [f"{r['requests']} 個請求，{r['elapsed']:.2f} 秒，{r['throughput']:.1f} req/s",
+             f"延遲 ms：p50 {lat[50]:.1f}  p90 {lat[90]:.1f}  p99 {lat[99]:.1f}  max {lat[100]:.1f}",
+             '狀態：' + '、'.join(f"{k} × {v}" for k, v in r['statuses'].items()),
+             '服務端：' + '、'.join(f"{k} {v}" for k, v in r['server'].items())]
+    return '\n'.join(lines)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _spawn_server(port: int, workers, ttl: float) -> subprocess.Popen:
+    here = os.path.dirname(os.path.abspath(__file__))
+    cmd = [sys.executable, os.path.join(here, 'prediction_server.py'), '--port', str(port), '--ttl', str(ttl)]
+    if workers:
+        cmd += ['--workers', str(workers)]
+    proc = subprocess.Popen(cmd, cwd=here, start_new_session=True)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    _stop_server(proc)
+    raise RuntimeError('預測服務啟動逾時')
+
+
+def _stop_server(proc: subprocess.Popen, timeout: float = 10.0) -> None:
+    """SIGTERM 整個行程群組（服務與其工作行程），逾時則 SIGKILL"""
+    def send(sig):
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(proc.pid, sig)
+            else:
+                proc.send_signal(sig)
+        except ProcessLookupError:
+            pass
+    send(signal.SIGTERM)
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        send(getattr(signal, 'SIGKILL', signal.SIGTERM))
+        proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='預測 HTTP 服務壓力測試')
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--path', action='append', help='請求路徑（可多次指定；預設混合所有方法）')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--distinct', type=int, default=10, help='不同 seed 的數量（0 不帶 seed）')
+    parser.add_argument('--spawn', action='store_true', help='自行啟動 prediction_server.py')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--ttl', type=float, default=60.0)
+    a = parser.parse_args(argv)
+    proc = None
+    url = a.url
+    if a.spawn:
+        port = _free_port()
+        proc = _spawn_server(port, a.workers, a.ttl)
+        url = f'http://127.0.0.1:{port}'
+    try:
+        print(format_report(asyncio.run(load_test(url, a.path or DEFAULT_PATHS, a.requests,
+                                                  a.concurrency, a.distinct))))
+    finally:
+        if proc is not None:
+            _stop_server(proc)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,39 +9,29 @@ M4 號碼映射與權重合成模組
 
 依賴：
  - numpy
- - ziwei_engine.generate_chart
- - qimen_engine.generate_qimen_chart
+ - palace_projection（宮位 → 號碼投影矩陣）
+ - ziwei_engine.generate_chart / calculate_bazi_codes（批次版以命宮+四化鍵查表）
+ - qimen_engine.QIMEN_CHARTS / dun_state（預排盤局，權重於載入時建表）
 """
 import numpy as np
-from qimen_engine import generate_qimen_chart
-from ziwei_engine import generate_chart
+from qimen_engine import QIMEN_CHARTS, dun_state, dun_state_batch
+from ziwei_engine import (
+    generate_chart, calculate_bazi_codes, place_main_stars,
+    compute_transformations, HEAVENLY_STEMS
+)
+from palace_projection import (
+    LOSHU_TO_NUMBERS, palace_to_numbers_ziwei,
+    LOSHU_PROJECTION, ZIWEI_PROJECTION, project
+)
 from datetime import datetime
-
-# Lo Shu 九宮 → 號碼對應
-LOSHU_TO_NUMBERS = {
-    1: [1,10,19,28,37],
-    2: [2,11,20,29,38],
-    3: [3,12,21,30,39],
-    4: [4,13,22,31,40],
-    5: [5,14,23,32,41,46,47,48,49],
-    6: [6,15,24,33,42],
-    7: [7,16,25,34,43],
-    8: [8,17,26,35,44],
-    9: [9,18,27,36,45],
-}
-
-# 紫微 12 宮 → 號碼對應
-def palace_to_numbers_ziwei(pal: int):
-    base = (pal - 1) * 4 + 1
-    nums = list(range(base, min(base + 4, 50)))
-    return nums
+from rng_service import get_rng
+from metrics import timed
 
 # 奇門盤權重映射
 
-def qimen_number_weights(dt: datetime, longitude: float):
-    chart = generate_qimen_chart(dt, longitude)
-    # 初始數組
-    w = np.zeros(49, dtype=float)
+def _qimen_palace_weights(chart: dict) -> np.ndarray:
+    # 九宮權重 (索引 0 = 1 宮)
+    pw = np.ones(9, dtype=float)
     # 盤局內容
     stars = chart['stars']      # palace->star
     doors = chart['doors']      # palace->door
@@ -58,38 +48,83 @@ def qimen_number_weights(dt: datetime, longitude: float):
         if door == '開':        weight *= 3
         elif door in ('休','生'): weight *= 2
         elif door in ('死','驚'): weight *= 0.5
-        # 映射到號碼
-        nums = LOSHU_TO_NUMBERS.get(pal, [])
-        for n in nums:
-            w[n-1] += weight
-    # 正規化
-    return w / w.sum()
+        pw[pal-1] = weight
+    return pw
+
+
+def _normalize_rows(w: np.ndarray) -> np.ndarray:
+    return w / w.sum(axis=-1, keepdims=True)
+
+# 16 種盤局的九宮權重 (16×9) 與號碼權重 (16×49)，列順序同 qimen_engine.DUN_STATES
+QIMEN_PALACE_WEIGHTS = np.array([_qimen_palace_weights(ch) for ch in QIMEN_CHARTS])
+QIMEN_WEIGHT_TABLE = _normalize_rows(project(LOSHU_PROJECTION, QIMEN_PALACE_WEIGHTS))
+QIMEN_WEIGHT_TABLE.flags.writeable = False
+
+
+@timed('weights', source='qimen_chart')
+def qimen_number_weights(dt: datetime, longitude: float):
+    return QIMEN_WEIGHT_TABLE[dun_state(dt)].copy()
+
+
+def qimen_number_weights_batch(dts) -> np.ndarray:
+    """批次奇門權重，回傳 (M,49)；dts 為 datetime 序列或 datetime64 陣列（視為 UTC）"""
+    return QIMEN_WEIGHT_TABLE[dun_state_batch(dts)]
 
 # 紫微盤權重映射
 
-def ziwei_number_weights(birth_dt: datetime, tz_offset: float=8.0):
-    chart = generate_chart(birth_dt, 'male', tz_offset)
-    pal = chart['palaces']      # dict with 'ming','shen'
-    trans = chart['transform']   # dict of transformation name->palace
-    # 初始數組
-    w = np.zeros(49, dtype=float)
-    # 設定基礎權重
-    palace_weights = {i:1.0 for i in range(1,13)}
+def _ziwei_palace_weights(ming: int, trans: dict) -> np.ndarray:
+    # 設定基礎權重 (索引 0 = 1 宮)
+    pw = np.ones(12, dtype=float)
     # 命宮
-    palace_weights[ pal['ming'] ] *= 3
+    pw[ming-1] *= 3
     # 四化
     factors = {'化祿':3.0, '化權':2.0, '化科':1.5, '化忌':0.5}
     for name, p in trans.items():
         factor = factors.get(name, 1.0)
         if p:
-            palace_weights[p] *= factor
-    # 對每宮映射號碼
-    for palace, weight in palace_weights.items():
-        nums = palace_to_numbers_ziwei(palace)
-        for n in nums:
-            w[n-1] += weight
-    # 正規化
-    return w / w.sum()
+            pw[p-1] *= factor
+    return pw
+
+
+@timed('weights', source='ziwei_chart')
+def ziwei_number_weights(birth_dt: datetime, tz_offset: float=8.0):
+    chart = generate_chart(birth_dt, 'male', tz_offset)
+    pal = chart['palaces']      # dict with 'ming','shen'
+    trans = chart['transform']   # dict of transformation name->palace
+    return _normalize_rows(project(ZIWEI_PROJECTION, _ziwei_palace_weights(pal['ming'], trans)))
+
+# 紫微權重只取決於命宮 (1–12) 與年干四化 (年干 % 4)：
+# 鍵 = (命宮-1)*4 + 四化索引，共 48 種，載入時預算 (48×49)
+def _ziwei_key_chart(key: int):
+    ming, t = key // 4 + 1, key % 4
+    stars = place_main_stars({'ming': ming})
+    # 四化依年干 %4 決定，取天干序中對應的代表干
+    trans = compute_transformations({'year': HEAVENLY_STEMS[t]}, stars)
+    return ming, trans
+
+ZIWEI_PALACE_WEIGHTS = np.array([_ziwei_palace_weights(*_ziwei_key_chart(k)) for k in range(48)])
+ZIWEI_WEIGHT_TABLE = _normalize_rows(project(ZIWEI_PROJECTION, ZIWEI_PALACE_WEIGHTS))
+ZIWEI_WEIGHT_TABLE.flags.writeable = False
+
+
+def ziwei_keys_batch(births, tz_offsets=8.0) -> np.ndarray:
+    """批次計算紫微權重鍵 (M,) int8；births 為 datetime 序列或 datetime64 陣列"""
+    codes = calculate_bazi_codes(births, tz_offsets)
+    month_branch = codes[..., 1, 1].astype(np.int64)
+    year_stem = codes[..., 0, 0].astype(np.int64)
+    ming = (1 - month_branch) % 12 + 1
+    return ((ming - 1) * 4 + year_stem % 4).astype(np.int8)
+
+
+def ziwei_number_weights_batch(births, tz_offsets=8.0, dtype=float) -> np.ndarray:
+    """批次紫微權重，回傳 (M,49)
+
+    相同鍵只會算一次：先對鍵去重，再由 ZIWEI_WEIGHT_TABLE 查表展開。
+    百萬筆以上時可用 dtype=np.float32 減半記憶體，或只保留 ziwei_keys_batch 的鍵。
+    """
+    keys = ziwei_keys_batch(births, tz_offsets)
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    return ZIWEI_WEIGHT_TABLE[uniq].astype(dtype, copy=False)[inverse.reshape(keys.shape)]
 
 # 合併權重
 
@@ -105,9 +140,9 @@ def predict_top(weights: np.ndarray, k: int=6):
     return [i+1 for i in idx]
 
 
-def predict_random(weights: np.ndarray, k: int=6):
+def predict_random(weights: np.ndarray, k: int=6, rng: np.random.Generator | None = None):
     probs = weights / weights.sum()
-    return list(np.random.choice(np.arange(1,50), size=k, replace=False, p=probs))
+    return list(get_rng(rng).choice(np.arange(1,50), size=k, replace=False, p=probs))
 
 # 測試
 if __name__ == '__main__':
@@ -0,0 +1,241 @@
+# metrics.py
+"""
+輕量計時 / 計數（熱點量測與匯出）
+
+功能：
+ 1. timed(name, **labels)：函式裝飾器；timer(name, **labels)：context manager
+    inc(name, value, **labels)：計數器；observe(name, seconds, **labels)：手動記錄耗時
+ 2. 預設停用：停用時每次呼叫只多一次旗標檢查（timer 回傳共用的空 context，不配置物件）
+    - 啟用：環境變數 LOTTERY_METRICS=1 或 enable()
+    - LOTTERY_METRICS_FILE=路徑：程式結束時自動匯出（副檔名 .json 為 JSON，其餘為 Prometheus 文字格式）
+ 3. 匯出
+    - to_prometheus()：計時為 histogram（_bucket / _sum / _count），計數為 counter，名稱加上 lottery_ 前綴
+    - to_json() / snapshot()：{'timers': {...}, 'counters': {...}}，含 count / sum / max
+    - write(path)：先寫暫存檔再取代，可供 node_exporter textfile collector 讀取
+
+依賴：僅標準函式庫
+
+使用：
+    from metrics import timed, timer, inc
+    @timed('load_history')
+    def load_history(...): ...
+    with timer('weights', source='qimen'): ...
+    inc('combo_attempts', attempts)
+    LOTTERY_METRICS=1 LOTTERY_METRICS_FILE=metrics.prom python cli.py mystic -n 100
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+PREFIX = 'lottery_'
+# histogram 上界（秒）
+BUCKETS = (1e-5, 1e-4, 1e-3, 0.01, 0.1, 1.0, 10.0)
+
+
+class _State:
+    enabled = os.environ.get('LOTTERY_METRICS', '') not in ('', '0', 'false')
+
+
+_state = _State()
+_lock = threading.Lock()
+_timers = {}      # (名稱, 標籤) → [count, sum, max, bucket counts...]
+_counters = {}    # (名稱, 標籤) → 值
+
+
+def enable(on: bool = True) -> None:
+    _state.enabled = on
+
+
+def enabled() -> bool:
+    return _state.enabled
+
+
+def reset() -> None:
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+# --------- 記錄 ---------
+
+def observe(name: str, seconds: float, **labels) -> None:
+    if not _state.enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        t = _timers.get(key)
+        if t is None:
+            t = _timers[key] = [0, 0.0, 0.0] + [0] * len(BUCKETS)
+        t[0] += 1
+        t[1] += seconds
+        if seconds > t[2]:
+            t[2] = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                t[3 + i] += 1
+                break
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    if not _state.enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _Timer:
+    __slots__ = ('name', 'labels', 't0')
+
+    def __init__(self, name: str, labels: dict):
+        self.name, self.labels = name, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str, **labels):
+    """with timer('name'): ... ；停用時回傳共用的空 context"""
+    return _Timer(name, labels) if _state.enabled else _NULL_TIMER
+
+
+def timed(name: str | None = None, **labels):
+    """函式計時裝飾器；name 預設為函式名稱"""
+    def deco(func):
+        metric = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(metric, time.perf_counter() - t0, **labels)
+        return wrapper
+    return deco
+
+# --------- 匯出 ---------
+
+def snapshot() -> dict:
+    with _lock:
+        timers = {k: list(v) for k, v in _timers.items()}
+        counters = dict(_counters)
+
+    def label_text(labels):
+        return ','.join(f'{k}={v}' for k, v in labels)
+
+    return {
+        'timers': {f"{name}{{{label_text(labels)}}}" if labels else name:
+                   {'count': t[0], 'sum': t[1], 'max': t[2],
+                    'mean': t[1] / t[0] if t[0] else 0.0}
+                   for (name, labels), t in sorted(timers.items())},
+        'counters': {f"{name}{{{label_text(labels)}}}" if labels else name: v
+                     for (name, labels), v in sorted(counters.items())},
+    }
+
+
+def to_json() -> str:
+    return json.dumps(snapshot(), ensure_ascii=False, indent=2)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs, extra: str = '') -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in pairs]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _le(bound) -> str:
+    return 'le="%s"' % (bound if isinstance(bound, str) else '%g' % bound)
+
+
+def _number(v) -> str:
+    """計數值原樣輸出：整數不轉科學記號，浮點數保留完整精度"""
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def to_prometheus() -> str:
+    with _lock:
+        timers = sorted((k, list(v)) for k, v in _timers.items())
+        counters = sorted(_counters.items())
+    lines = []
+    seen = set()
+    for (name, labels), t in timers:
+        metric = f'{PREFIX}{name}_seconds'
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# TYPE {metric} histogram')
+        cumulative = 0
+        for bound, n in zip(BUCKETS, t[3:]):
+            cumulative += n
+            lines.append(f'{metric}_bucket{_labels(labels, _le(bound))} {cumulative}')
+        lines.append(f'{metric}_bucket{_labels(labels, _le("+Inf"))} {t[0]}')
+        lines.append(f'{metric}_sum{_labels(labels)} {t[1]:.9g}')
+        lines.append(f'{metric}_count{_labels(labels)} {t[0]}')
+    for (name, labels), v in counters:
+        metric = f'{PREFIX}{name}_total'
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric}{_labels(labels)} {_number(v)}')
+    return '\n'.join(lines) + '\n'
+
+
+def write(path: str) -> None:
+    """依副檔名寫出 JSON 或 Prometheus 文字格式（先寫暫存檔再取代）"""
+    text = to_json() if path.endswith('.json') else to_prometheus()
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+_EXPORT_PATH = os.environ.get('LOTTERY_METRICS_FILE')
+if _EXPORT_PATH:
+    atexit.register(lambda: _state.enabled and write(_EXPORT_PATH))
+
+
+if __name__ == '__main__':
+    enable()
+
+    @timed('demo')
+    def _demo(n):
+        return sum(range(n))
+
+    for n in (10, 1000, 100000):
+        _demo(n)
+    inc('demo_calls', 3)
+    with timer('demo_block', stage='x'):
+        time.sleep(0.01)
+    print(to_prometheus())
+    print(to_json())
@@ -1,19 +1,21 @@
-# gui_mystic_predictor.py
+# mystic_predictor.py
 # 玄學大樂透預測器：陰陽 + 五行 + 吉/忌 平衡
 # -------------------------------------------------
-# • 載入 lottery_results.xlsx 作為歷史資料
+# • 由 history_service 取得 lottery_results.xlsx 歷史資料（第一次產生組合時才讀取，檔案更新後自動重建）
+# • 規則以 rule_engine DSL 描述 (MYSTIC_RULES)，編譯後整批檢查
 # • 生成符合玄學規則的 6 顆號碼組合
 #   - 陰陽平衡：3 陽 3 陰 或 4 陽 2 陰
 #   - 五行旺木水：至少各含 1 顆木、水尾數；金尾不得超過 2
 #   - 吉/忌：最多 1 顆忌數 (4,14,24,44)，若出現忌數則必含吉數 6 或 8
 #   - 不得與歷史開獎完全重複
-# • Tkinter GUI：顯示生成組合，可按鈕刷新
+# • Tkinter GUI 見 gui_mystic_predictor.py（本模組不依賴 tkinter）
 
-import tkinter as tk
-from tkinter import ttk, messagebox
-import pandas as pd
+import threading
 import numpy as np
-import random
+from rule_engine import compile_rules, combo_keys
+from rng_service import get_rng
+from history_service import get_service
+from metrics import inc, timed
 
 # ---------------- 玄學映射 ----------------
 YIN = {n for n in range(1, 50) if n % 2 == 0}  # 偶數
@@ -30,81 +32,125 @@ TAIL_ELEMENT = {
 LUCKY = {6, 8, 9}
 UNLUCKY = {4, 14, 24, 44}
 
+# ---------------- 規則描述（rule_engine DSL） ----------------
+MYSTIC_RULES = {
+    'sets': {
+        'yang': {'parity': 'odd'},
+        '木': {'tail': [t for t, e in TAIL_ELEMENT.items() if e == '木']},
+        '水': {'tail': [t for t, e in TAIL_ELEMENT.items() if e == '水']},
+        '金': {'tail': [t for t, e in TAIL_ELEMENT.items() if e == '金']},
+        'lucky': sorted(LUCKY),
+        'unlucky': sorted(UNLUCKY),
+    },
+    'rules': [
+        # 1. 不得重複歷史
+        {'not_in_history': True},
+        # 2. 陰陽：3 陽 3 陰 或 4 陽 2 陰
+        {'count': 'yang', 'in': [3, 4]},
+        # 3. 五行：木、水至少各 1，金不得超過 2
+        {'count': '木', 'min': 1},
+        {'count': '水', 'min': 1},
+        {'count': '金', 'max': 2},
+        # 4. 吉/忌：最多 1 顆忌數，出現忌數則必含吉數
+        {'if': {'count': 'unlucky', 'min': 1}, 'then': {'count': 'lucky', 'min': 1}},
+        {'count': 'unlucky', 'max': 1},
+    ],
+}
+
 # ---------------- 載入歷史組合 ----------------
 
 def load_history(path: str = 'lottery_results.xlsx') -> set[str]:
-    df = pd.read_excel(path)
-    combos = df[[f'red{i}' for i in range(1, 7)]].astype(int)
-    combo_set = {
-        '-'.join(f"{n:02d}" for n in sorted(row))
-        for row in combos.values.tolist()
-    }
-    return combo_set
+    return _combo_texts(get_service(path).snapshot().reds)
+
+
+def _combo_texts(reds) -> set[str]:
+    return {'-'.join(f"{n:02d}" for n in sorted(row)) for row in reds.tolist()}
+
+# HISTORY / HISTORY_KEYS / RULES 於第一次使用時才由 history_service 取得並編譯，
+# import 本模組不做 I/O；歷史檔更新時（服務通知新快照）丟棄，下次使用再依新資料重建
+_LAZY = ('HISTORY', 'HISTORY_KEYS', 'RULES')
+_lock = threading.Lock()
+_spec = MYSTIC_RULES
+_subscribed = False
+
+
+def _invalidate(snapshot=None) -> None:
+    with _lock:
+        for name in _LAZY:
+            globals().pop(name, None)
+
+
+def _load() -> dict:
+    """必要時載入並編譯；回傳持鎖時取得的 {HISTORY, HISTORY_KEYS, RULES}
+    （監看執行緒可能在釋放鎖後立即 _invalidate，呼叫端一律使用回傳值）"""
+    global HISTORY, HISTORY_KEYS, RULES, _subscribed
+    with _lock:
+        if not _subscribed:
+            get_service().subscribe(_invalidate)
+            _subscribed = True
+        if 'HISTORY_KEYS' not in globals():
+            reds = get_service().snapshot().reds
+            HISTORY = _combo_texts(reds)
+            HISTORY_KEYS = combo_keys(reds)
+        if 'RULES' not in globals():
+            RULES = compile_rules(_spec, history_keys=HISTORY_KEYS)
+        return {'HISTORY': HISTORY, 'HISTORY_KEYS': HISTORY_KEYS, 'RULES': RULES}
 
-HISTORY = load_history()
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return _load()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_rules():
+    """目前使用的已編譯規則（必要時載入歷史資料）"""
+    rules = globals().get('RULES')
+    if rules is None:
+        rules = _load()['RULES']
+    return rules
 
 # ---------------- 規則檢查 ----------------
 
+def use_rules(spec: dict) -> None:
+    """換用自訂規則（例如 load_rules('custom.json') 的結果）；歷史資料更新後仍沿用"""
+    global _spec
+    with _lock:
+        _spec = spec
+        globals().pop('RULES', None)
+    _load()
+
+
 def check_rules(nums: list[int]) -> bool:
-    # 1. 不得重複歷史
-    key = '-'.join(f"{n:02d}" for n in sorted(nums))
-    if key in HISTORY:
-        return False
-    # 2. 陰陽
-    yang_cnt = sum(1 for n in nums if n in YANG)
-    yin_cnt = 6 - yang_cnt
-    if not ((yang_cnt == 3 and yin_cnt == 3) or (yang_cnt == 4 and yin_cnt == 2)):
-        return False
-    # 3. 五行
-    elements = [TAIL_ELEMENT[n % 10] for n in nums]
-    if elements.count('木') < 1 or elements.count('水') < 1:
-        return False
-    if elements.count('金') > 2:
-        return False
-    # 4. 吉/忌
-    unlucky_present = any(n in UNLUCKY for n in nums)
-    lucky_present = any(n in LUCKY for n in nums)
-    if unlucky_present and not lucky_present:
-        return False
-    if sum(1 for n in nums if n in UNLUCKY) > 1:
-        return False
-    return True
+    return bool(get_rules()([nums])[0])
+
+
+def check_rules_batch(batch) -> np.ndarray:
+    """一次檢查 (M,6) 組合，回傳 (M,) 布林陣列"""
+    inc('rule_checks', len(batch))
+    return get_rules()(batch)
 
 # ---------------- 組合產生器 ----------------
 
-def generate_combo(max_attempts: int = 10000) -> list[int] | None:
+@timed('generate_combo')
+def generate_combo(max_attempts: int = 10000, batch_size: int = 256,
+                  rng: np.random.Generator | None = None) -> list[int] | None:
+    rng = get_rng(rng)
     attempts = 0
     while attempts < max_attempts:
-        nums = random.sample(range(1, 50), 6)
-        if check_rules(nums):
-            return sorted(nums)
-        attempts += 1
+        size = min(batch_size, max_attempts - attempts)
+        keys = rng.random((size, 49))
+        batch = np.argpartition(keys, 6, axis=1)[:, :6] + 1
+        ok = np.flatnonzero(check_rules_batch(batch))
+        if ok.size:
+            inc('combo_attempts', attempts + int(ok[0]) + 1)
+            return sorted(int(n) for n in batch[ok[0]])
+        attempts += size
+    inc('combo_attempts', attempts)
+    inc('combo_failures')
     return None
 
-# ---------------- GUI ----------------
-class MysticGUI(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("玄學大樂透預測器")
-        self.geometry("340x260")
-        ttk.Label(self, text="符合陰陽‧五行‧吉/忌規則的號碼：", font=("Arial", 12)).pack(pady=10)
-        self.num_var = tk.StringVar(value="點擊『生成』取得號碼")
-        lbl = ttk.Label(self, textvariable=self.num_var, font=("Consolas", 18))
-        lbl.pack(pady=10)
-        btn = ttk.Button(self, text="生成號碼", command=self.on_generate)
-        btn.pack(pady=10)
-        self.status_var = tk.StringVar()
-        ttk.Label(self, textvariable=self.status_var, foreground="gray").pack(pady=5)
-
-    def on_generate(self):
-        combo = generate_combo()
-        if combo:
-            self.num_var.set('  '.join(f"{n:02d}" for n in combo))
-            self.status_var.set("成功生成！祝好運 ✨")
-        else:
-            messagebox.showwarning("生成失敗", "在上限嘗試次數內無法找到符合規則的組合，請稍後再試。")
-
 
 if __name__ == '__main__':
-    app = MysticGUI()
-    app.mainloop()
+    from gui_mystic_predictor import MysticGUI
+    MysticGUI().mainloop()
@@ -0,0 +1,57 @@
+# palace_projection.py
+"""
+宮位 → 號碼投影矩陣
+
+功能：
+ 1. 洛書九宮 → 1–49 號碼的投影矩陣 LOSHU_PROJECTION (49×9)
+ 2. 紫微十二宮 → 1–49 號碼的投影矩陣 ZIWEI_PROJECTION (49×12)
+ 3. 宮位權重向量（或多組權重的矩陣）一次投影成號碼權重
+
+每個號碼至多屬於一宮，因此：
+ - 加總型權重：w = M @ palace_weights
+ - 乘積型權重（多次 boost）：w = 1 + M @ (palace_factors - 1)
+批次時 palace_weights 為 (K, 宮數)，結果為 (K, 49)。
+
+依賴：numpy
+"""
+import numpy as np
+
+# Lo Shu 九宮 → 號碼對應
+LOSHU_TO_NUMBERS = {
+    1: [1,10,19,28,37],
+    2: [2,11,20,29,38],
+    3: [3,12,21,30,39],
+    4: [4,13,22,31,40],
+    5: [5,14,23,32,41,46,47,48,49],
+    6: [6,15,24,33,42],
+    7: [7,16,25,34,43],
+    8: [8,17,26,35,44],
+    9: [9,18,27,36,45],
+}
+
+# 紫微 12 宮 → 號碼對應
+def palace_to_numbers_ziwei(pal: int):
+    base = (pal - 1) * 4 + 1
+    nums = list(range(base, min(base + 4, 50)))
+    return nums
+
+
+def _projection(mapping: dict) -> np.ndarray:
+    m = np.zeros((49, len(mapping)))
+    for col, nums in enumerate(mapping.values()):
+        m[np.asarray(nums) - 1, col] = 1.0
+    m.flags.writeable = False
+    return m
+
+LOSHU_PROJECTION = _projection(LOSHU_TO_NUMBERS)
+ZIWEI_PROJECTION = _projection({p: palace_to_numbers_ziwei(p) for p in range(1, 13)})
+
+
+def project(matrix: np.ndarray, palace_weights) -> np.ndarray:
+    """加總型投影：(宮數,) → (49,)；(K, 宮數) → (K, 49)"""
+    return np.asarray(palace_weights, dtype=float) @ matrix.T
+
+
+def project_factors(matrix: np.ndarray, palace_factors) -> np.ndarray:
+    """乘積型投影：不屬於任何宮的號碼維持 1"""
+    return 1.0 + (np.asarray(palace_factors, dtype=float) - 1.0) @ matrix.T
@@ -0,0 +1,257 @@
+# portfolio_optimizer.py
+"""
+多注組合覆蓋最佳化（包牌 / wheeling）
+
+功能：
+ 1. 依 49 號碼權重抽出大量候選注（Gumbel top-k，多核心平行），或直接使用給定候選注
+ 2. 以 greedy 從候選中選出 N 注，最大化加權覆蓋率：
+      score = λ1·已覆蓋單號權重 + λ2·已覆蓋號碼對權重 + λ3·已覆蓋三號組權重
+    單號權重 w_n、號碼對權重 w_a·w_b、三號組權重 w_a·w_b·w_c，各層以總和正規化
+ 3. 注與覆蓋狀態皆為 uint64 位元集合：
+    - 單號：已覆蓋號碼集合
+    - 號碼對：pair_cover[a] = 已與 a 同注的號碼集合
+    - 三號組：triple_cover[a, b] = 已與 (a, b) 同注的號碼集合
+    候選注的邊際增益 = 各層「注內尚未覆蓋的較大號碼」以 bitset.weighted_popcount 加權計數
+
+覆蓋函數為次模函數，greedy 保證 ≥ (1-1/e) 最佳值。每步的增益以倒排索引增量更新，
+N=10,000 注、20 萬候選約數秒。
+
+依賴：
+ - numpy
+ - bitset, rng_service
+ - mapping_engine / QimenZiwei_predictor（CLI 取權重時）
+
+使用：
+    from portfolio_optimizer import optimize_portfolio
+    result = optimize_portfolio(weights, 1000)
+    result['tickets']     # (1000,6)
+    python portfolio_optimizer.py --tickets 5000 --source qimen --out tickets.csv
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from bitset import HIGHER, to_masks, popcount, weight_table, weighted_popcount
+from rng_service import RngService
+
+N_NUMBERS = 49
+TICKET_SIZE = 6
+PAIR_POS = np.array([(i, j) for i in range(TICKET_SIZE) for j in range(i + 1, TICKET_SIZE)])
+# 每注的計分項：1 個單號項 + 6 個號碼對項 + 15 個三號組項
+N_TERMS = 1 + TICKET_SIZE + len(PAIR_POS)
+
+# --------- 候選注 ---------
+
+def _sample_candidates(weights: np.ndarray, n: int, seed: np.random.SeedSequence) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    with np.errstate(divide='ignore'):
+        logw = np.log(weights)
+    keys = logw + rng.gumbel(size=(n, N_NUMBERS))
+    picks = np.argpartition(-keys, TICKET_SIZE - 1, axis=1)[:, :TICKET_SIZE] + 1
+    return np.unique(to_masks(picks))
+
+
+def sample_candidates(weights, n: int, seed: int = 0, workers: int | None = None) -> np.ndarray:
+    """依權重抽 n 注候選（去除重複），回傳 (C,6) 升冪號碼"""
+    weights = np.asarray(weights, dtype=float)
+    workers = workers or os.cpu_count() or 1
+    seeds = RngService(seed).seed_sequences(workers)
+    sizes = np.full(workers, n // workers)
+    sizes[:n % workers] += 1
+    if workers == 1 or n < 100_000:
+        parts = [_sample_candidates(weights, int(s), q) for s, q in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_sample_candidates, [weights] * workers, sizes.tolist(), seeds))
+    masks = np.unique(np.concatenate(parts))
+    bits = (masks[:, None] >> np.arange(N_NUMBERS + 1, dtype=np.uint64)) & np.uint64(1)
+    return np.nonzero(bits)[1].reshape(-1, TICKET_SIZE)
+
+# --------- 覆蓋狀態 ---------
+
+def _level_totals(w: np.ndarray) -> tuple[float, float, float]:
+    """單號、號碼對、三號組權重總和（基本對稱多項式 e1, e2, e3）"""
+    p1, p2, p3 = w.sum(), (w ** 2).sum(), (w ** 3).sum()
+    e2 = (p1 * p1 - p2) / 2
+    e3 = (p1 ** 3 - 3 * p1 * p2 + 2 * p3) / 6
+    return float(p1), float(e2), float(e3)
+
+
+class Coverage:
+    """已選注的覆蓋狀態與候選注的邊際增益計算"""
+
+    def __init__(self, weights, levels=(1.0, 1.0, 1.0)):
+        self.w = np.zeros(N_NUMBERS + 1)
+        self.w[1:] = np.asarray(weights, dtype=float)
+        self.table = weight_table(self.w[1:])
+        totals = _level_totals(self.w[1:])
+        self.scale = np.array([lv / t if t > 0 else 0.0 for lv, t in zip(levels, totals)])
+        self.numbers = np.uint64(0)
+        self.pairs = np.zeros(N_NUMBERS + 1, dtype=np.uint64)
+        self.triples = np.zeros((N_NUMBERS + 1, N_NUMBERS + 1), dtype=np.uint64)
+
+    def coefficients(self, nums: np.ndarray) -> np.ndarray:
+        """(C,6) → (C,22) 各計分項係數（與覆蓋狀態無關，可預先計算）"""
+        wa = self.w[nums]
+        coef = np.empty((len(nums), N_TERMS))
+        coef[:, 0] = self.scale[0]
+        coef[:, 1:1 + TICKET_SIZE] = self.scale[1] * wa
+        coef[:, 1 + TICKET_SIZE:] = self.scale[2] * wa[:, PAIR_POS[:, 0]] * wa[:, PAIR_POS[:, 1]]
+        return coef
+
+    def gains_terms(self, masks: np.ndarray, nums: np.ndarray) -> np.ndarray:
+        """(C,22) 各計分項中注內尚未覆蓋（且較大）的號碼集合"""
+        a, b = nums[:, PAIR_POS[:, 0]], nums[:, PAIR_POS[:, 1]]
+        covered = np.empty((len(masks), N_TERMS), dtype=np.uint64)
+        covered[:, 0] = self.numbers
+        covered[:, 1:1 + TICKET_SIZE] = self.pairs[nums] | ~HIGHER[nums]
+        covered[:, 1 + TICKET_SIZE:] = self.triples[a, b] | ~HIGHER[b]
+        return masks[:, None] & ~covered
+
+    def gains(self, masks: np.ndarray, nums: np.ndarray, coef: np.ndarray) -> np.ndarray:
+        """候選注加入後的分數增量"""
+        return (weighted_popcount(self.gains_terms(masks, nums), self.table) * coef).sum(axis=1)
+
+    def add(self, mask: np.uint64, nums: np.ndarray):
+        self.numbers |= mask
+        self.pairs[nums] |= mask
+        self.triples[nums[PAIR_POS[:, 0]], nums[PAIR_POS[:, 1]]] |= mask
+
+    def summary(self) -> dict:
+        """各層已覆蓋的項數與權重比例"""
+        w = self.w
+        n_idx = np.flatnonzero((self.numbers >> np.arange(N_NUMBERS + 1, dtype=np.uint64)) & np.uint64(1))
+        pair_masks = self.pairs & HIGHER                    # 只計較大的號碼，每組計一次
+        tri_masks = self.triples & HIGHER[None, :]
+        totals = _level_totals(w[1:])
+        pair_w = (w * weighted_popcount(pair_masks, self.table)).sum()
+        tri_w = (w[:, None] * w[None, :] * weighted_popcount(tri_masks, self.table)).sum()
+        return {
+            'numbers': int(len(n_idx)), 'pairs': int(popcount(pair_masks).sum()),
+            'triples': int(popcount(tri_masks).sum()),
+            'numbers_weight': float(w[n_idx].sum() / totals[0]),
+            'pairs_weight': float(pair_w / totals[1]), 'triples_weight': float(tri_w / totals[2]),
+        }
+
+# --------- greedy ---------
+# 號碼 / 號碼對 / 三號組的元素編號：n、a*50+b、(a*50+b)*50+c
+ELEMENT_BASE = N_NUMBERS + 1
+# (22,6)：第 j 顆號碼是否為該計分項的「較大號碼」（a<b<c 才計分，與 Coverage.gains 一致）
+TERM_HIGHER = np.zeros((N_TERMS, TICKET_SIZE), dtype=bool)
+TERM_HIGHER[0] = True
+TERM_HIGHER[1:1 + TICKET_SIZE] = np.arange(TICKET_SIZE)[None, :] > np.arange(TICKET_SIZE)[:, None]
+TERM_HIGHER[1 + TICKET_SIZE:] = np.arange(TICKET_SIZE)[None, :] > PAIR_POS[:, 1][:, None]
+
+
+def _element_ids(nums: np.ndarray) -> np.ndarray:
+    """(C,6) → (C,22,6)：第 r 計分項中第 j 顆號碼所對應的元素編號（不適用者為 -1）"""
+    c = len(nums)
+    ids = np.full((c, N_TERMS, TICKET_SIZE), -1, dtype=np.int64)
+    ids[:, 0, :] = nums
+    ids[:, 1:1 + TICKET_SIZE, :] = nums[:, :, None] * ELEMENT_BASE + nums[:, None, :]
+    ab = nums[:, PAIR_POS[:, 0]] * ELEMENT_BASE + nums[:, PAIR_POS[:, 1]]
+    ids[:, 1 + TICKET_SIZE:, :] = ab[:, :, None] * ELEMENT_BASE + nums[:, None, :]
+    ids[:, ~TERM_HIGHER] = -1
+    return ids
+
+
+def _inverted_index(ids: np.ndarray):
+    """元素編號 → 含該元素的候選注（CSR：indptr, cand）"""
+    flat = ids.reshape(len(ids), -1)
+    cand = np.repeat(np.arange(len(ids)), flat.shape[1])
+    flat = flat.ravel()
+    keep = flat >= 0
+    flat, cand = flat[keep], cand[keep]
+    order = np.argsort(flat, kind='stable')
+    counts = np.bincount(flat, minlength=ELEMENT_BASE ** 3)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return indptr, cand[order]
+
+
+def optimize_portfolio(weights, n_tickets: int, levels=(1.0, 1.0, 1.0), candidates=None,
+                       n_candidates: int | None = None, seed: int = 0,
+                       workers: int | None = None) -> dict:
+    """從候選注中 greedy 選 n_tickets 注，最大化加權覆蓋率
+
+    candidates：(C,6) 候選注；省略時依權重抽 n_candidates（預設 max(20N, 20000)）注。
+    回傳 {'tickets' (N,6), 'gains' (N,), 'coverage' 覆蓋摘要}
+
+    增益只在初始時對全部候選以 popcount 計算一次；之後每選一注，
+    僅對「含新覆蓋元素」的候選扣除該元素權重（倒排索引），增益始終為精確值。
+    全程新覆蓋的元素至多 49+1176+18424 個，總更新量與 N 無關。
+    """
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    if candidates is None:
+        n_candidates = n_candidates or max(20 * n_tickets, 20_000)
+        candidates = sample_candidates(weights, n_candidates, seed, workers)
+    nums = np.sort(np.asarray(candidates, dtype=np.int64).reshape(-1, TICKET_SIZE), axis=1)
+    if n_tickets > len(nums):
+        raise ValueError(f"候選注僅 {len(nums)} 注，少於要求的 {n_tickets} 注")
+    masks = to_masks(nums)
+    cov = Coverage(weights, levels)
+    coef = cov.coefficients(nums)
+    gain = cov.gains(masks, nums, coef)
+    indptr, cand = _inverted_index(_element_ids(nums))
+
+    chosen, gains = [], []
+    for _ in range(n_tickets):
+        i = int(np.argmax(gain))
+        chosen.append(i)
+        gains.append(float(gain[i]))
+        # 本注帶來的新覆蓋元素 = 增益計算中「尚未覆蓋」的位元
+        t = nums[i:i + 1]
+        fresh = cov.gains_terms(masks[i:i + 1], t)[0]                   # (22,) uint64
+        hit = ((fresh[:, None] >> t[0].astype(np.uint64)) & np.uint64(1)).astype(bool)
+        ids = _element_ids(t)[0]
+        values = coef[i][:, None] * cov.w[t[0]][None, :]
+        cov.add(masks[i], t[0])
+        for e, v in zip(ids[hit].tolist(), values[hit].tolist()):
+            gain[cand[indptr[e]:indptr[e + 1]]] -= v
+        gain[i] = -np.inf
+    return {'tickets': nums[chosen], 'gains': np.array(gains), 'coverage': cov.summary()}
+
+# --------- CLI ---------
+
+def _source_weights(source: str, at: datetime) -> np.ndarray:
+    if source == 'uniform':
+        return np.ones(N_NUMBERS)
+    if source == 'qimen':
+        from mapping_engine import qimen_number_weights
+        return qimen_number_weights(at, 120.0)
+    if source == 'qimen_simple':
+        from QimenZiwei_predictor import qimen_weights
+        return qimen_weights(at)
+    raise ValueError(f"未知的權重來源：{source}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='多注組合覆蓋最佳化（包牌）')
+    parser.add_argument('--tickets', type=int, default=100, help='要選出的注數 N')
+    parser.add_argument('--source', choices=['uniform', 'qimen', 'qimen_simple'], default='qimen')
+    parser.add_argument('--at', help='奇門起盤時刻 (YYYY-MM-DD HH:MM，預設現在)')
+    parser.add_argument('--levels', type=float, nargs=3, default=[1.0, 1.0, 1.0],
+                        metavar=('L1', 'L2', 'L3'), help='單號 / 號碼對 / 三號組 權重')
+    parser.add_argument('--candidates', type=int, default=None, help='候選注數')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', help='輸出 CSV（n1..n6）')
+    a = parser.parse_args(argv)
+    at = datetime.strptime(a.at, '%Y-%m-%d %H:%M') if a.at else datetime.now()
+    res = optimize_portfolio(_source_weights(a.source, at), a.tickets, a.levels,
+                             n_candidates=a.candidates, seed=a.seed, workers=a.workers)
+    if a.out:
+        np.savetxt(a.out, res['tickets'], fmt='%d', delimiter=',',
+                   header='n1,n2,n3,n4,n5,n6', comments='')
+    else:
+        for t in res['tickets'][:20]:
+            print(' '.join(f'{n:02d}' for n in t))
+    c = res['coverage']
+    print(f"覆蓋：單號 {c['numbers']}/49 ({c['numbers_weight']:.2%})、"
+          f"號碼對 {c['pairs']}/1176 ({c['pairs_weight']:.2%})、"
+          f"三號組 {c['triples']}/18424 ({c['triples_weight']:.2%})")
+
+
+if __name__ == '__main__':
+    main()
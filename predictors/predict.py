@@ -1,25 +1,27 @@
-# gui_lottery_predictor.py
-# GUI 版進階大樂透預測器：科學 + 玄學 權重組合並可選 top/random 策略
+# predict.py
+# 進階大樂透預測器：科學 + 玄學 權重組合並可選 top/random 策略
+# （Tkinter GUI 見 gui_lottery_predictor.py）
 
-import tkinter as tk
-from tkinter import ttk, messagebox
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from math import exp
-import random
+from rng_service import get_rng
+from history_service import get_service
+from metrics import timed
 
 # ---------- 權重計算函數 ----------
 def load_history(filename="lottery_results.xlsx") -> pd.DataFrame:
-    df = pd.read_excel(filename)
-    reds = df[[f"red{i}" for i in range(1,7)]].astype(int)
-    return reds
+    # 經由共用的 history_service 取得目前快照，同一檔案只讀取一次
+    return get_service(filename).snapshot().reds_frame()
 
+@timed('weights', source='frequency')
 def frequency_weights(reds: pd.DataFrame) -> np.ndarray:
     counts = reds.values.flatten()
     freq = pd.Series(counts).value_counts().sort_index().values.astype(float)
     return (freq - freq.min()) / (freq.max() - freq.min())
 
+@timed('weights', source='recency')
 def recency_weights(reds: pd.DataFrame, half_life: float = 50.0) -> np.ndarray:
     N = len(reds)
     weights = np.zeros(49)
@@ -30,6 +32,7 @@ def recency_weights(reds: pd.DataFrame, half_life: float = 50.0) -> np.ndarray:
             weights[num-1] += w
     return (weights - weights.min()) / (weights.max() - weights.min())
 
+@timed('weights', source='numerology')
 def numerology_weights(sigma: float = 8.0) -> np.ndarray:
     today = datetime.today().strftime("%Y%m%d")
     s = sum(int(d) for d in today)
@@ -37,6 +40,7 @@ def numerology_weights(sigma: float = 8.0) -> np.ndarray:
     w = np.array([exp(-((i-center)**2) / (2*sigma**2)) for i in range(1,50)])
     return (w - w.min()) / (w.max() - w.min())
 
+@timed('weights', source='fibonacci')
 def fibonacci_weights() -> np.ndarray:
     fib = [1,1]
     while len(fib) < 49:
@@ -50,104 +54,18 @@ def combine(weights_list, alphas) -> np.ndarray:
         combined += w * a
     return combined
 
-def predict(weights: np.ndarray, method: str = 'top', k: int = 6) -> list[int]:
+def predict(weights: np.ndarray, method: str = 'top', k: int = 6,
+            rng: np.random.Generator | None = None) -> list[int]:
     if method == 'top':
         idx = np.argsort(weights)[-k:][::-1]
         return [i + 1 for i in idx]
     elif method == 'random':
         p = weights / weights.sum()
-        return list(np.random.choice(np.arange(1,50), size=k, replace=False, p=p))
+        return list(get_rng(rng).choice(np.arange(1,50), size=k, replace=False, p=p))
     else:
         raise ValueError("Invalid method")
 
-# ---------- GUI ----------
-class LotteryGUI(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("大樂透預測器 (科學+玄學)")
-        self.geometry("400x500")
-        # 加載歷史資料並生成各權重
-        self.reds = load_history()
-        self.weights_funcs = {
-            '頻率': frequency_weights,
-            '時序': recency_weights,
-            '數字學': numerology_weights,
-            'Fibonacci': fibonacci_weights,
-        }
-        self.create_widgets()
-
-    def create_widgets(self):
-        frame = ttk.Frame(self)
-        frame.pack(padx=10, pady=10, fill='x')
-        # 科學方法
-        sci_label = ttk.Label(frame, text="科學方法：")
-        sci_label.pack(anchor='w')
-        self.sci_vars = {}
-        for name in ['頻率', '時序']:
-            var = tk.BooleanVar(value=True)
-            chk = ttk.Checkbutton(frame, text=name, variable=var)
-            chk.pack(anchor='w')
-            self.sci_vars[name] = var
-        # 玄學方法
-        myst_label = ttk.Label(frame, text="玄學方法：")
-        myst_label.pack(anchor='w', pady=(10,0))
-        self.myst_vars = {}
-        for name in ['數字學', 'Fibonacci']:
-            var = tk.BooleanVar(value=True)
-            chk = ttk.Checkbutton(frame, text=name, variable=var)
-            chk.pack(anchor='w')
-            self.myst_vars[name] = var
-        # 策略選擇
-        strat_label = ttk.Label(frame, text="預測策略：")
-        strat_label.pack(anchor='w', pady=(10,0))
-        self.method_var = tk.StringVar(value='top')
-        ttk.Radiobutton(frame, text='Top K', variable=self.method_var, value='top').pack(anchor='w')
-        ttk.Radiobutton(frame, text='隨機', variable=self.method_var, value='random').pack(anchor='w')
-        # K 值
-        k_frame = ttk.Frame(frame)
-        k_frame.pack(anchor='w', pady=(10,0))
-        ttk.Label(k_frame, text='選取數量 K:').pack(side='left')
-        self.k_var = tk.IntVar(value=6)
-        ttk.Spinbox(k_frame, from_=1, to=49, textvariable=self.k_var, width=5).pack(side='left')
-        # 預測按鈕
-        btn = ttk.Button(frame, text='預測號碼', command=self.on_predict)
-        btn.pack(pady=(20,0))
-        # 結果顯示
-        self.result_text = tk.Text(self, height=10)
-        self.result_text.pack(padx=10, pady=10, fill='both', expand=True)
-
-    def on_predict(self):
-        methods = []
-        weights = []
-        # 科學
-        for name, var in self.sci_vars.items():
-            if var.get():
-                w = self.weights_funcs[name](self.reds)
-                methods.append(name)
-                weights.append(w)
-        # 玄學
-        for name, var in self.myst_vars.items():
-            if var.get():
-                if name == '數字學':
-                    w = numerology_weights()
-                else:
-                    w = fibonacci_weights()
-                methods.append(name)
-                weights.append(w)
-        if not weights:
-            messagebox.showwarning("錯誤", "請至少選擇一種方法！")
-            return
-        alphas = [1/len(weights)] * len(weights)
-        comb = combine(weights, alphas)
-        k = self.k_var.get()
-        top_nums = predict(comb, 'top', k)
-        rand_nums = predict(comb, 'random', k)
-        # 顯示
-        self.result_text.delete('1.0', tk.END)
-        self.result_text.insert(tk.END, f"方法：{', '.join(methods)}\n")
-        self.result_text.insert(tk.END, f"Top {k} 號碼：{top_nums}\n")
-        self.result_text.insert(tk.END, f"隨機 {k} 號碼：{rand_nums}\n")
 
 if __name__ == '__main__':
-    app = LotteryGUI()
-    app.mainloop()
+    from gui_lottery_predictor import LotteryGUI
+    LotteryGUI().mainloop()
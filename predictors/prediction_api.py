@@ -0,0 +1,194 @@
+# prediction_api.py
+"""
+各預測方法的無 GUI 統一介面（CLI 與 HTTP 服務共用）
+
+功能：
+ 1. PREDICTORS 註冊表：名稱 → Predictor(說明、參數定義、執行函式)
+    - hexagram      八卦卦象（隨機擲卦或依時間起卦）
+    - mystic        玄學規則（陰陽 / 五行 / 吉忌）
+    - mapping       奇門紫微映射（mapping_engine）
+    - qimen-ziwei   簡易奇門紫微（QimenZiwei_predictor）
+    - weights       科學權重（predict.py：頻率 / 時序 / 數字學 / Fibonacci）
+ 2. run(name, params, count, seed)：依參數產生 count 注，回傳 [{'numbers': [...], ...}]
+    - 同一組 (名稱, seed) 結果可重現：亂數流為 RngService(seed).stream(名稱)
+    - 與注數無關的權重只計算一次
+ 3. 引擎於執行時才載入，且皆不依賴 tkinter / PySide6
+
+依賴：
+ - rng_service（引擎依方法另行載入）
+
+使用：
+    from prediction_api import run, PREDICTORS
+    run('mapping', {'birth': '1990-05-17 15:30', 'alpha': 0.6}, count=5, seed=42)
+"""
+from datetime import datetime
+from rng_service import RngService, get_rng
+
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+
+def parse_datetime(text) -> datetime:
+    if isinstance(text, datetime):
+        return text
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(str(text), fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"無法解析日期時間：{text!r}（格式 YYYY-MM-DD[ HH:MM]）")
+
+
+class Param:
+    """預測方法的參數：type 為 int / float / str / datetime；nargs='+' 表示清單"""
+
+    def __init__(self, name: str, type=str, default=None, help: str = '', choices=None, nargs=None):
+        self.name, self.type, self.default = name, type, default
+        self.help, self.choices, self.nargs = help, choices, nargs
+
+    def convert(self, value):
+        if value is None:
+            return self.default() if callable(self.default) else self.default
+        if self.nargs:
+            items = value.split(',') if isinstance(value, str) else list(value)
+            return [self._one(v) for v in items]
+        return self._one(value)
+
+    def _one(self, value):
+        if self.type is datetime:
+            value = parse_datetime(value)
+        else:
+            try:
+                value = self.type(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{self.name} 必須為 {self.type.__name__}：{value!r}")
+        if self.choices and value not in self.choices:
+            raise ValueError(f"{self.name} 必須為 {', '.join(map(str, self.choices))} 之一")
+        return value
+
+
+class Predictor:
+    def __init__(self, name: str, help: str, func, params: list[Param]):
+        self.name, self.help, self.func, self.params = name, help, func, params
+
+    def parse(self, params: dict | None) -> dict:
+        """外部參數（字串或已轉型的值）→ 函式參數；未知的參數視為錯誤"""
+        params = dict(params or {})
+        known = {p.name for p in self.params}
+        unknown = set(params) - known
+        if unknown:
+            raise ValueError(f"{self.name} 不接受參數：{', '.join(sorted(unknown))}")
+        return {p.name: p.convert(params.get(p.name)) for p in self.params}
+
+
+PREDICTORS: dict[str, Predictor] = {}
+
+
+def register(name: str, help: str, *params: Param):
+    def deco(func):
+        PREDICTORS[name] = Predictor(name, help, func, list(params))
+        return func
+    return deco
+
+
+def run(name: str, params: dict | None = None, count: int = 1, seed: int | None = None) -> list[dict]:
+    """執行預測方法 name，回傳 count 筆結果；seed 為 None 時使用模組預設亂數"""
+    if name not in PREDICTORS:
+        raise ValueError(f"未知的預測方法：{name}（可用：{', '.join(PREDICTORS)}）")
+    if count < 1:
+        raise ValueError("注數必須 ≥ 1")
+    predictor = PREDICTORS[name]
+    kwargs = predictor.parse(params)
+    rng = RngService(seed).stream(name) if seed is not None else get_rng()
+    return predictor.func(count=count, rng=rng, **kwargs)
+
+
+def _ints(nums) -> list[int]:
+    return [int(n) for n in nums]
+
+# --------- 各預測方法 ---------
+
+@register('hexagram', '八卦卦象預測：每注 6 爻決定號碼',
+          Param('mode', str, 'random', '起卦方式：random 隨機擲卦 / time 依時間起卦', ['random', 'time']),
+          Param('at', datetime, datetime.now, '起卦時間（mode=time）'))
+def _hexagram(count, rng, mode, at):
+    import numpy as np
+    from GUA_hexagram_predictor import auto_hexagram_batch, datetime_hexagram, generate_numbers_batch
+    if mode == 'time':
+        lines = np.tile(np.array(datetime_hexagram(at)), (count, 1))
+    else:
+        lines = auto_hexagram_batch(count, rng)
+    nums = generate_numbers_batch(lines, rng)
+    return [{'numbers': _ints(n), 'lines': _ints(l)} for n, l in zip(nums, lines)]
+
+
+@register('mystic', '玄學規則預測：陰陽 / 五行 / 吉忌平衡且不與歷史重複',
+          Param('max_attempts', int, 10000, '每注最多嘗試組合數'))
+def _mystic(count, rng, max_attempts):
+    from mystic_predictor import generate_combo
+    out = []
+    for _ in range(count):
+        combo = generate_combo(max_attempts, rng=rng)
+        if combo is None:
+            raise RuntimeError("在上限嘗試次數內無法找到符合規則的組合")
+        out.append({'numbers': combo})
+    return out
+
+
+@register('mapping', '奇門紫微映射預測（mapping_engine）',
+          Param('birth', datetime, '1990-05-17 15:30', '出生日期時間'),
+          Param('tz', float, 8.0, '時區偏移'),
+          Param('lon', float, 120.0, '當地經度（度）'),
+          Param('alpha', float, 0.5, '奇門比重 α（0~1）'),
+          Param('method', str, 'random', '選號策略', ['top', 'random']),
+          Param('k', int, 6, '選取數量'),
+          Param('at', datetime, datetime.now, '奇門起局時間'))
+def _mapping(count, rng, birth, tz, lon, alpha, method, k, at):
+    from mapping_engine import (qimen_number_weights, ziwei_number_weights, combine_weights,
+                                predict_top, predict_random)
+    w = combine_weights(qimen_number_weights(at, lon), ziwei_number_weights(birth, tz), alpha)
+    if method == 'top':
+        return [{'numbers': _ints(predict_top(w, k))} for _ in range(count)]
+    return [{'numbers': sorted(_ints(predict_random(w, k, rng)))} for _ in range(count)]
+
+
+@register('qimen-ziwei', '簡易奇門紫微預測（QimenZiwei_predictor）',
+          Param('birth', datetime, '1990-05-17', '出生日期'),
+          Param('alpha', float, 0.5, '奇門比重 α（0~1）'),
+          Param('method', str, 'random', '選號策略', ['top', 'random']),
+          Param('at', datetime, datetime.now, '奇門起局時間'))
+def _qimen_ziwei(count, rng, birth, alpha, method, at):
+    import numpy as np
+    from QimenZiwei_predictor import qimen_weights, ziwei_weights, pick_numbers
+    alpha = min(max(alpha, 0.0), 1.0)
+    w = qimen_weights(at) * alpha + ziwei_weights(birth) * (1 - alpha)
+    w = w / w.sum()
+    if method == 'top':
+        return [{'numbers': _ints(np.argsort(w)[-6:][::-1] + 1)} for _ in range(count)]
+    return [{'numbers': _ints(pick_numbers(w, 6, rng))} for _ in range(count)]
+
+
+WEIGHT_SOURCES = ['frequency', 'recency', 'numerology', 'fibonacci']
+
+
+@register('weights', '科學權重預測（predict.py）：各權重等比重合成',
+          Param('sources', str, lambda: list(WEIGHT_SOURCES), '權重來源（逗號分隔）',
+                WEIGHT_SOURCES, nargs='+'),
+          Param('method', str, 'random', '選號策略', ['top', 'random']),
+          Param('k', int, 6, '選取數量'),
+          Param('history', str, 'lottery_results.xlsx', '歷史開獎檔'))
+def _weights(count, rng, sources, method, k, history):
+    import predict
+    if not sources:
+        raise ValueError("請至少選擇一種權重來源")
+    reds = predict.load_history(history) if {'frequency', 'recency'} & set(sources) else None
+    funcs = {
+        'frequency': lambda: predict.frequency_weights(reds),
+        'recency': lambda: predict.recency_weights(reds),
+        'numerology': predict.numerology_weights,
+        'fibonacci': predict.fibonacci_weights,
+    }
+    weights = [funcs[s]() for s in sources]
+    w = predict.combine(weights, [1 / len(weights)] * len(weights))
+    if method == 'top':
+        return [{'numbers': _ints(predict.predict(w, 'top', k))} for _ in range(count)]
+    return [{'numbers': sorted(_ints(predict.predict(w, 'random', k, rng)))} for _ in range(count)]
@@ -0,0 +1,295 @@
+# prediction_server.py
+"""
+本機預測 HTTP 服務（asyncio，僅標準函式庫）
+
+功能：
+ 1. 以 prediction_api 的註冊表提供所有預測方法
+      GET  /methods                               方法與參數
+      GET  /predict/<方法>?count=5&seed=1&alpha=0.6 …
+      POST /predict/<方法>   {"params": {...}, "count": 5, "seed": 1}
+      GET  /stats                                 請求 / 快取 / 合併 / 計算次數
+      GET  /health
+ 2. 星曆等 CPU 密集計算在 ProcessPoolExecutor 執行，事件迴圈不被阻塞
+ 3. 請求合併：相同 (方法, 參數, 注數, 種子, 時段) 的並行請求只計算一次，共用結果
+    - 未指定 at 的方法以「目前整點」為起局時間，同一小時內的請求視為相同
+ 4. 回應快取：結果保留 ttl 秒（預設 60），fresh=1 可略過快取（仍參與合併）
+ 5. HTTP/1.1 keep-alive；錯誤以 JSON 回傳（400 參數錯誤、404 未知路徑 / 方法、500 其他）
+ 6. 收到 SIGTERM / SIGINT 時停止接受連線並關閉工作行程池，不留下孤兒行程
+
+依賴：
+ - prediction_api（工作行程中載入各引擎）
+
+使用：
+    python prediction_server.py --port 8765 --workers 4 --ttl 60
+    curl 'http://127.0.0.1:8765/predict/mapping?birth=1990-05-17%2015:30&count=3'
+    python load_test.py --url http://127.0.0.1:8765 --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit
+from prediction_api import PREDICTORS, run
+
+MAX_BODY = 1 << 20
+MAX_COUNT = 10000
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+          413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat(timespec='minutes')
+    raise TypeError(f"{type(obj).__name__} 無法輸出為 JSON")
+
+
+def _warmup() -> None:
+    """工作行程啟動時先載入引擎，避免第一個請求負擔 import 成本
+
+    暖身只是最佳化：失敗（例如歷史檔不存在）時只記錄，不可讓工作行程池損毀，
+    否則連不需要歷史資料的方法（hexagram、mapping）也會全部回傳 500。
+    """
+    try:
+        import GUA_hexagram_predictor, mapping_engine, predict, QimenZiwei_predictor  # noqa: F401
+        import mystic_predictor
+        mystic_predictor.get_rules()
+    except Exception as e:
+        print(f"工作行程 {os.getpid()} 暖身失敗（該方法於請求時再載入）：{type(e).__name__}: {e}",
+              file=sys.stderr, flush=True)
+
+
+def _compute(name: str, params: dict, count: int, seed):
+    return run(name, params, count, seed)
+
+def _consume_exception(task: asyncio.Task) -> None:
+    """所有等待者都已離開時仍取用例外，避免 'exception was never retrieved' 警告"""
+    if not task.cancelled():
+        task.exception()
+
+# --------- 合併與快取 ---------
+
+class PredictionService:
+    """以 (方法, 參數, 注數, 種子) 為鍵的 TTL 快取 + 並行請求合併"""
+
+    def __init__(self, pool, ttl: float = 60.0, max_entries: int = 10000):
+        self.pool, self.ttl, self.max_entries = pool, ttl, max_entries
+        self.cache = {}            # 鍵 → (到期時間, 結果)
+        self.inflight = {}         # 鍵 → asyncio.Future
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'computed': 0, 'errors': 0}
+
+    @staticmethod
+    def normalize(name: str, raw: dict) -> dict:
+        """外部參數 → 轉型後的參數；未給的時間參數取目前整點"""
+        if name not in PREDICTORS:
+            raise HTTPError(404, f"未知的預測方法：{name}")
+        predictor = PREDICTORS[name]
+        try:
+            params = predictor.parse(raw)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        for p in predictor.params:
+            if p.type is datetime and p.name not in raw:
+                params[p.name] = params[p.name].replace(minute=0, second=0, microsecond=0)
+        return params
+
+    @staticmethod
+    def key(name: str, params: dict, count: int, seed) -> str:
+        return json.dumps([name, params, count, seed], sort_keys=True, default=_json_default)
+
+    async def predict(self, name: str, raw: dict, count: int, seed, fresh: bool = False) -> dict:
+        self.stats['requests'] += 1
+        params = self.normalize(name, raw)
+        key = self.key(name, params, count, seed)
+        now = time.monotonic()
+        hit = self.cache.get(key)
+        if hit and not fresh and hit[0] > now:
+            self.stats['cache_hits'] += 1
+            return {**hit[1], 'cached': True}
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            return {**await asyncio.shield(task), 'coalesced': True}
+
+        # 計算以獨立 task 執行：發起請求的連線中斷（被取消）時，合併等待者仍能取得結果
+        task = asyncio.get_running_loop().create_task(self._compute(key, name, params, count, seed))
+        task.add_done_callback(_consume_exception)
+        self.inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, name: str, params: dict, count: int, seed) -> dict:
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _compute, name, params, count, seed)
+            body = {'method': name, 'params': params, 'count': count, 'seed': seed, 'results': results}
+            self.stats['computed'] += 1
+            self._store(key, body, time.monotonic())
+            return body
+        except Exception as e:
+            self.stats['errors'] += 1
+            if isinstance(e, (ValueError, RuntimeError)):
+                raise HTTPError(400, str(e)) from e
+            raise
+        finally:
+            del self.inflight[key]
+
+    def _store(self, key: str, body: dict, now: float) -> None:
+        if self.ttl <= 0:
+            return
+        if len(self.cache) >= self.max_entries:
+            self.cache = {k: v for k, v in self.cache.items() if v[0] > now}
+            if len(self.cache) >= self.max_entries:
+                self.cache.pop(next(iter(self.cache)))
+        self.cache[key] = (now + self.ttl, body)
+
+# --------- HTTP ---------
+
+def _response(status: int, body: dict, keep_alive: bool) -> bytes:
+    data = json.dumps(body, ensure_ascii=False, default=_json_default).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {STATUS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('ascii') + data
+
+
+def _int_arg(value, name: str, default=None, lo=None, hi=None):
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} 必須為整數")
+    if (lo is not None and value < lo) or (hi is not None and value > hi):
+        raise HTTPError(400, f"{name} 必須介於 {lo}–{hi}")
+    return value
+
+
+class Server:
+    def __init__(self, service: PredictionService):
+        self.service = service
+
+    async def route(self, method: str, target: str, body: bytes) -> dict:
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        if path == '/health':
+            return {'status': 'ok'}
+        if path == '/stats':
+            return {**self.service.stats, 'cache_entries': len(self.service.cache),
+                    'inflight': len(self.service.inflight)}
+        if path == '/methods':
+            return {name: {'help': p.help,
+                           'params': [{'name': q.name, 'help': q.help, 'choices': q.choices} for q in p.params]}
+                    for name, p in PREDICTORS.items()}
+        if not path.startswith('/predict/'):
+            raise HTTPError(404, f"未知的路徑：{path}")
+        name = path[len('/predict/'):]
+        if method == 'GET':
+            query = dict(parse_qsl(url.query))
+            count, seed = query.pop('count', None), query.pop('seed', None)
+            fresh = query.pop('fresh', '') in ('1', 'true')
+            raw = query
+        elif method == 'POST':
+            try:
+                doc = json.loads(body or b'{}')
+            except ValueError:
+                raise HTTPError(400, '請求內容不是合法的 JSON')
+            if not isinstance(doc, dict):
+                raise HTTPError(400, '請求內容必須為 JSON 物件')
+            raw = doc.get('params') or {}
+            count, seed, fresh = doc.get('count'), doc.get('seed'), bool(doc.get('fresh'))
+        else:
+            raise HTTPError(405, f"不支援的方法：{method}")
+        count = _int_arg(count, 'count', 1, 1, MAX_COUNT)
+        seed = _int_arg(seed, 'seed', None, 0)
+        return await self.service.predict(name, raw, count, seed, fresh)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b'\r\n', b'\n', b''):
+                        break
+                    k, _, v = h.decode('latin-1').partition(':')
+                    headers[k.strip().lower()] = v.strip()
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    writer.write(_response(413, {'error': '請求內容過大'}, False))
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b''
+                try:
+                    status, payload = 200, await self.route(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765, workers: int | None = None,
+                ttl: float = 60.0, ready=None) -> None:
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warmup) as pool:
+        server = Server(PredictionService(pool, ttl))
+        srv = await asyncio.start_server(server.handle, host, port)
+        addr = srv.sockets[0].getsockname()
+        print(f"預測服務：http://{addr[0]}:{addr[1]}（{workers} 個工作行程，快取 {ttl:g} 秒）", flush=True)
+        if ready is not None:
+            ready(addr)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass             # Windows：以 KeyboardInterrupt 結束，仍會離開 with 區塊
+        try:
+            async with srv:
+                await stop.wait()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本機預測 HTTP 服務')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--ttl', type=float, default=60.0, help='回應快取秒數（0 停用）')
+    a = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(a.host, a.port, a.workers, a.ttl))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+# prize_simulator.py
+"""
+大樂透獎項 Monte Carlo 模擬
+
+功能：
+ 1. 模擬開獎：49 取 6 顆一般號 + 剩餘 43 顆中取 1 顆特別號（皆均勻）
+ 2. 投注組合與開獎號碼皆為 uint64 位元集合（bitset），對中數 = popcount(注 & 開獎)
+ 3. 依 (一般號對中數, 是否中特別號) 查表得獎項：
+      頭獎 6、貳獎 5+特、參獎 5、肆獎 4+特、伍獎 4、陸獎 3+特、柒獎 2+特、普獎 3
+ 4. 依期數分塊，每塊的 (期數 × 注數) 有上限，多核心平行；各塊種子由 rng_service 產生
+ 5. 回報
+    - 每注每期中各獎項的頻率（95% CI，以每期平均計算樣本標準誤），並附理論值
+    - 每期「至少一注中該獎項」的比例（Wilson 95% CI）
+
+依賴：
+ - numpy, pandas（讀取投注 CSV）
+ - bitset, rng_service
+
+使用：
+    python prize_simulator.py tickets.csv --draws 5000000
+    python prize_simulator.py --random 100 --draws 1000000
+"""
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from bitset import popcount, to_masks
+from rng_service import RngService
+
+N_NUMBERS = 49
+TICKET_SIZE = 6
+Z95 = 1.959963984540054
+# (獎項, 一般號對中數, 是否需中特別號)；順序由高至低
+TIERS = [
+    ('頭獎', 6, False), ('貳獎', 5, True), ('參獎', 5, False), ('肆獎', 4, True),
+    ('伍獎', 4, False), ('陸獎', 3, True), ('柒獎', 2, True), ('普獎', 3, False),
+]
+TIER_NAMES = [name for name, _, _ in TIERS]
+# TIER_TABLE[對中數, 中特別號] → 獎項索引，未中獎為 len(TIERS)
+NO_PRIZE = len(TIERS)
+TIER_TABLE = np.full((TICKET_SIZE + 1, 2), NO_PRIZE, dtype=np.int64)
+for _t, (_name, _k, _sp) in enumerate(TIERS):
+    TIER_TABLE[_k, 1] = min(TIER_TABLE[_k, 1], _t)
+    if not _sp:
+        TIER_TABLE[_k, 0] = _t
+# 以 對中數*2 + 中特別號 為索引的平坦查表
+TIER_CODES = TIER_TABLE.ravel().astype(np.uint8)
+# 每塊 (期數 × 注數) 上限，控制記憶體
+BLOCK_CELLS = 4_000_000
+
+
+def exact_tier_probs() -> np.ndarray:
+    """單注各獎項理論機率：對中數為超幾何分布，特別號在其餘 43 顆中均勻"""
+    total = math.comb(N_NUMBERS, TICKET_SIZE)
+    probs = np.zeros(NO_PRIZE + 1)
+    for k in range(TICKET_SIZE + 1):
+        p_k = math.comb(TICKET_SIZE, k) * math.comb(N_NUMBERS - TICKET_SIZE, TICKET_SIZE - k) / total
+        p_sp = (TICKET_SIZE - k) / (N_NUMBERS - TICKET_SIZE)
+        probs[TIER_TABLE[k, 1]] += p_k * p_sp
+        probs[TIER_TABLE[k, 0]] += p_k * (1 - p_sp)
+    return probs[:NO_PRIZE]
+
+# --------- 模擬 ---------
+
+def simulate_draws(n: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """n 期開獎 → (一般號 uint64 位元集合, 特別號 uint64 單一位元)
+
+    每期獨立抽 7 個 1–49 整數，有重複者整列重抽（約 36%）；
+    條件於互不相同時為均勻的有序 7 元組，前 6 個為一般號、第 7 個為特別號。
+    """
+    out = np.empty((n, TICKET_SIZE + 1), dtype=np.uint64)
+    todo = np.arange(n)
+    while todo.size:
+        x = rng.integers(1, N_NUMBERS + 1, size=(todo.size, TICKET_SIZE + 1), dtype=np.uint64)
+        ok = popcount(to_masks(x)) == TICKET_SIZE + 1
+        out[todo[ok]] = x[ok]
+        todo = todo[~ok]
+    return to_masks(out[:, :TICKET_SIZE]), np.uint64(1) << out[:, TICKET_SIZE]
+
+
+def tier_matrix(portfolio: np.ndarray, main: np.ndarray, special: np.ndarray) -> np.ndarray:
+    """(D,) 期 × (T,) 注 → (D,T) 獎項索引"""
+    hits = popcount(main[:, None] & portfolio[None, :])
+    sp = (special[:, None] & portfolio[None, :]) != 0
+    return TIER_CODES[hits * 2 + sp]
+
+
+def _simulate_chunk(portfolio: np.ndarray, n_draws: int, seed: np.random.SeedSequence):
+    """回傳 (每期平均中獎比例之和, 平方和, 至少一注中獎的期數)，各為 (獎項數,)"""
+    rng = np.random.default_rng(seed)
+    block = max(1, BLOCK_CELLS // len(portfolio))
+    s1 = np.zeros(NO_PRIZE)
+    s2 = np.zeros(NO_PRIZE)
+    any_hit = np.zeros(NO_PRIZE, dtype=np.int64)
+    done = 0
+    while done < n_draws:
+        d = min(block, n_draws - done)
+        tiers = tier_matrix(portfolio, *simulate_draws(d, rng))
+        # 中獎格僅約 3%，只對其計數
+        rows, cols = np.nonzero(tiers < NO_PRIZE)
+        counts = np.bincount(rows * NO_PRIZE + tiers[rows, cols],
+                             minlength=d * NO_PRIZE).reshape(d, NO_PRIZE)
+        frac = counts / len(portfolio)
+        s1 += frac.sum(axis=0)
+        s2 += (frac ** 2).sum(axis=0)
+        any_hit += (counts > 0).sum(axis=0)
+        done += d
+    return s1, s2, any_hit
+
+
+def _wilson(k: int, n: int) -> tuple[float, float]:
+    p = k / n
+    denom = 1 + Z95 ** 2 / n
+    center = (p + Z95 ** 2 / (2 * n)) / denom
+    half = Z95 * math.sqrt(p * (1 - p) / n + Z95 ** 2 / (4 * n * n)) / denom
+    return center - half, center + half
+
+
+def simulate(tickets, n_draws: int = 1_000_000, seed: int = 0, workers: int | None = None,
+             chunk_draws: int = 250_000) -> dict:
+    """模擬 n_draws 期，回傳各獎項統計
+
+    回傳 {'draws', 'tickets', 'tiers': [{name, rate, rate_ci95, expected, any_rate, any_ci95}]}
+    rate 為每注每期中該獎項的頻率；any_rate 為每期至少一注中該獎項的比例。
+    """
+    portfolio = to_masks(np.asarray(tickets, dtype=np.int64).reshape(-1, TICKET_SIZE))
+    workers = workers or os.cpu_count() or 1
+    n_chunks = max(1, math.ceil(n_draws / chunk_draws))
+    sizes = [chunk_draws] * (n_chunks - 1) + [n_draws - chunk_draws * (n_chunks - 1)]
+    seeds = RngService(seed).seed_sequences(n_chunks)
+    if workers == 1 or n_chunks == 1:
+        results = [_simulate_chunk(portfolio, n, s) for n, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, [portfolio] * n_chunks, sizes, seeds))
+    s1 = sum(r[0] for r in results)
+    s2 = sum(r[1] for r in results)
+    any_hit = sum(r[2] for r in results)
+
+    mean = s1 / n_draws
+    var = np.maximum(s2 / n_draws - mean ** 2, 0.0) * n_draws / max(n_draws - 1, 1)
+    half = Z95 * np.sqrt(var / n_draws)
+    expected = exact_tier_probs()
+    tiers = []
+    for t, name in enumerate(TIER_NAMES):
+        tiers.append({
+            'name': name, 'rate': float(mean[t]),
+            'rate_ci95': (float(max(mean[t] - half[t], 0.0)), float(mean[t] + half[t])),
+            'expected': float(expected[t]),
+            'any_rate': any_hit[t] / n_draws, 'any_ci95': _wilson(int(any_hit[t]), n_draws),
+        })
+    return {'draws': n_draws, 'tickets': len(portfolio), 'tiers': tiers}
+
+
+def format_report(result: dict) -> str:
+    lines = [f"模擬 {result['draws']} 期、{result['tickets']} 注",
+             f"{'獎項':<6}{'每注機率':>12}{'95% CI':>28}{'理論值':>12}{'任一注中獎':>12}{'95% CI':>26}"]
+    for t in result['tiers']:
+        lo, hi = t['rate_ci95']
+        alo, ahi = t['any_ci95']
+        lines.append(f"{t['name']:<6}{t['rate']:>14.3e}   [{lo:.3e}, {hi:.3e}]{t['expected']:>13.3e}"
+                     f"{t['any_rate']:>15.3e}   [{alo:.3e}, {ahi:.3e}]")
+    return '\n'.join(lines)
+
+
+def load_tickets(path: str) -> np.ndarray:
+    """讀取投注 CSV：有 n1..n6 欄位則使用之，否則取前 6 欄"""
+    import pandas as pd
+    df = pd.read_csv(path)
+    cols = [f'n{i}' for i in range(1, TICKET_SIZE + 1)]
+    if not set(cols) <= set(df.columns):
+        cols = df.columns[:TICKET_SIZE]
+    return df[cols].to_numpy(dtype=np.int64)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='大樂透獎項 Monte Carlo 模擬')
+    parser.add_argument('tickets', nargs='?', help='投注 CSV（n1..n6）')
+    parser.add_argument('--random', type=int, default=0, help='不指定檔案時，隨機產生的注數')
+    parser.add_argument('--draws', type=int, default=1_000_000, help='模擬期數')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    a = parser.parse_args(argv)
+    if a.tickets:
+        tickets = load_tickets(a.tickets)
+    elif a.random > 0:
+        rng = RngService(a.seed).stream('tickets')
+        tickets = np.argpartition(rng.random((a.random, N_NUMBERS)), TICKET_SIZE, axis=1)[:, :TICKET_SIZE] + 1
+    else:
+        parser.error('請指定投注 CSV 或 --random N')
+    print(format_report(simulate(tickets, a.draws, a.seed, a.workers)))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,17 +6,19 @@
  1. 確定遁法 (陽/陰) 與遁數 (1~8)
  2. 飛布九星、八門、三奇、六儀、八神至中宮及八方宮
  3. 中宮放置值符與值使，其餘宮位依遁數逆時針飛入
+ 4. 16 種 (遁法, 遁數) 盤局於載入時預排，查詢僅需一次節氣查表
 
 依賴：
- - astronomical_core.solar_longitude
+ - astronomical_core.term_index_at（節氣預算表查詢）
 
 使用：
     from qimen_engine import generate_qimen_chart
     chart = generate_qimen_chart(datetime.now(), longitude=120.0)
 """
 from datetime import datetime
-from astronomical_core import solar_longitude
-import math
+from astronomical_core import term_index_at
+from metrics import timed
+import numpy as np
 
 # 環宮逆時針（排除中宮5）
 PALACES = [1,4,7,8,9,6,3,2]
@@ -36,11 +38,7 @@ VALUE_STAR = {'yang':'天蓬','yin':'天任'}
 VALUE_DOOR = '值使'
 
 # 遁法與遁數計算
-def determine_dun(dt: datetime):
-    # 計算太陽視黃經
-    jd = dt.timestamp() / 86400.0 + 2440587.5
-    lon = solar_longitude(jd) % 360
-    term_idx = int(math.floor(lon / 15.0))  # 0-23
+def _dun_from_term(term_idx: int):
     if term_idx >= 18 or term_idx < 6:
         dun_type = 'yang'
         dun_no = ((term_idx - 18) % 24) // 3 + 1
@@ -49,9 +47,25 @@ def determine_dun(dt: datetime):
         dun_no = ((term_idx - 6) // 3) + 1
     return dun_type, dun_no
 
-# 主盤生成
-def generate_qimen_chart(dt: datetime, longitude: float):
-    dun_type, dun_no = determine_dun(dt)
+
+def _julian_days(dts) -> np.ndarray:
+    """datetime 序列依 dt.timestamp() 換算 JD；datetime64 陣列視為 UTC"""
+    arr = np.asarray(dts)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        secs = arr.astype('datetime64[s]').astype(np.int64).astype(float)
+    else:
+        secs = np.array([dt.timestamp() for dt in arr.ravel()], dtype=float).reshape(arr.shape)
+    return secs / 86400.0 + 2440587.5
+
+
+@timed('determine_dun')
+def determine_dun(dt: datetime):
+    # 以節氣預算表查出當下節氣（等同 floor(太陽視黃經 / 15)）
+    jd = dt.timestamp() / 86400.0 + 2440587.5
+    return _dun_from_term(term_index_at(jd))
+
+
+def _build_chart(dun_type: str, dun_no: int) -> dict:
     # 計算飛宮起點 index
     start = PALACES.index(dun_no)
     # 旋轉八方宮
@@ -88,6 +102,37 @@ def generate_qimen_chart(dt: datetime, longitude: float):
         'gods': gods
     }
 
+# 盤局只由 (遁法, 遁數) 決定：遁數為八方宮起點，陰陽各 8 種共 16 盤，載入時預先排好
+DUN_STATES = [(t, n) for t in ('yang', 'yin') for n in sorted(PALACES)]
+STATE_INDEX = {state: i for i, state in enumerate(DUN_STATES)}
+QIMEN_CHARTS = [_build_chart(*state) for state in DUN_STATES]
+# 節氣索引 (0–23) → 盤局索引
+TERM_TO_STATE = np.array([STATE_INDEX[_dun_from_term(i)] for i in range(24)], dtype=np.int8)
+
+
+def dun_state(dt: datetime) -> int:
+    """當下盤局在 DUN_STATES 中的索引"""
+    return STATE_INDEX[determine_dun(dt)]
+
+
+def dun_state_batch(dts) -> np.ndarray:
+    """批次取得盤局索引；dts 為 datetime 序列或 datetime64 陣列（視為 UTC）"""
+    return TERM_TO_STATE[term_index_at(_julian_days(dts))]
+
+
+def determine_dun_batch(dts):
+    """批次計算遁法與遁數，回傳 (是否陽遁 bool 陣列, 遁數 int 陣列)"""
+    states = dun_state_batch(dts)
+    is_yang = np.array([t == 'yang' for t, _ in DUN_STATES])
+    dun_nos = np.array([n for _, n in DUN_STATES])
+    return is_yang[states], dun_nos[states]
+
+# 主盤生成
+def generate_qimen_chart(dt: datetime, longitude: float):
+    chart = QIMEN_CHARTS[dun_state(dt)]
+    # 回傳副本，避免呼叫端修改預排盤局
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in chart.items()}
+
 # 測試
 if __name__ == '__main__':
     ch = generate_qimen_chart(datetime.now(), longitude=120.0)
@@ -0,0 +1,77 @@
+# rng_service.py
+"""
+亂數串流管理
+
+功能：
+ 1. 由單一根種子衍生彼此獨立的 np.random.Generator (PCG64) 串流
+    - spawn(n)：依序分給各行程 / 批次（SeedSequence.spawn）
+    - stream(key)：依識別鍵（客戶 id、批次編號…）取得串流，與分塊方式、處理順序無關
+ 2. 模組預設串流 get_rng()：各產生器未傳入 rng 時使用，取代全域 random / np.random 狀態
+    - set_seed(seed) 可固定預設串流；fork 出的子行程會自動改用各自的串流，不會彼此重複
+
+依賴：numpy
+
+使用：
+    from rng_service import RngService, get_rng
+    svc = RngService(2025)
+    rngs = svc.spawn(8)                # 8 個平行工作各自的 Generator
+    rng = svc.stream('customer-42')    # 依客戶固定
+    generate_numbers(lines, rng=rng)
+"""
+import hashlib
+import os
+import numpy as np
+
+
+def key_hash(key) -> int:
+    """識別鍵 → 64 位元整數（以字串表示計算，跨行程、跨平台一致）"""
+    digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class RngService:
+    """以根種子衍生獨立亂數串流；seed=None 時取系統亂數為根種子"""
+
+    def __init__(self, seed: int | None = None):
+        self.root = np.random.SeedSequence(seed)
+        self.seed = self.root.entropy
+
+    def seed_sequences(self, n: int) -> list[np.random.SeedSequence]:
+        """n 個新的子種子（可 pickle，適合傳給子行程）；每次呼叫都接續產生新的子種子"""
+        return self.root.spawn(n)
+
+    def spawn(self, n: int) -> list[np.random.Generator]:
+        return [np.random.Generator(np.random.PCG64(s)) for s in self.seed_sequences(n)]
+
+    def stream(self, *key) -> np.random.Generator:
+        """依識別鍵取得固定串流；同一 (seed, key) 永遠得到相同序列"""
+        entropy = [self.seed] + [key_hash(k) for k in key]
+        return np.random.Generator(np.random.PCG64(np.random.SeedSequence(entropy)))
+
+# --------- 模組預設串流 ---------
+
+_default = RngService()
+_default_rng = _default.spawn(1)[0]
+
+
+def set_seed(seed: int | None = None) -> None:
+    """重設預設串流（seed=None 則重新取系統亂數）"""
+    global _default, _default_rng
+    _default = RngService(seed)
+    _default_rng = _default.spawn(1)[0]
+
+
+def get_rng(rng: np.random.Generator | None = None) -> np.random.Generator:
+    """傳入的 rng 優先，否則回傳模組預設串流"""
+    return rng if rng is not None else _default_rng
+
+
+def _reseed_after_fork():
+    # 子行程沿用父行程的根種子，改以行程編號取串流，避免各子行程抽出相同號碼；
+    # 需要可重現時請明確傳入 spawn / stream 取得的 rng
+    global _default_rng
+    _default_rng = _default.stream('fork', os.getpid())
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
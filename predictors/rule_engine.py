@@ -0,0 +1,251 @@
+# rule_engine.py
+"""
+玄學規則 DSL 編譯模組（M5）
+
+功能：
+ 1. 以 JSON / YAML 描述號碼集合與「計數限制」規則
+ 2. 將規則編譯為 NumPy 謂詞，一次檢查整批 (M×6) 組合
+    - 集合不多時（≤ 6 個）計數規則預先展開為查表，檢查成本與規則數量無關
+ 3. 支援「若…則…」條件規則與「不得與歷史重複」規則
+
+規則格式：
+    {
+      "sets": {
+        "yang":  {"parity": "odd"},         # 奇偶
+        "wood":  {"tail": [3, 8]},          # 尾數
+        "lucky": [6, 8, 9]                  # 明確號碼
+      },
+      "rules": [
+        {"count": "yang", "in": [3, 4]},    # 計數落在集合內
+        {"count": "wood", "min": 1},        # 計數下限
+        {"count": "metal", "max": 2},       # 計數上限
+        {"if": {"count": "unlucky", "min": 1},
+         "then": {"count": "lucky", "min": 1}},
+        {"not_in_history": true}
+      ]
+    }
+
+依賴：
+ - numpy
+ - PyYAML（選用，僅讀取 .yaml 規則檔時需要）
+
+使用：
+    from rule_engine import compile_rules
+    ruleset = compile_rules(spec, history_keys=keys)
+    ok = ruleset(batch)          # batch: (M,6) int 陣列 → (M,) bool
+"""
+import json
+import numpy as np
+
+MAX_NUMBER = 49
+TICKET_SIZE = 6
+
+# --------- 組合編碼 ---------
+
+_KEY_BITS = np.int64(1) << np.arange(MAX_NUMBER + 1, dtype=np.int64)
+
+
+def _as_batch(batch) -> np.ndarray:
+    """(M,6) 整數陣列；已是整數型別時不複製"""
+    arr = np.asarray(batch)
+    if arr.dtype.kind not in 'iu':
+        arr = arr.astype(np.int64)
+    return arr.reshape(-1, TICKET_SIZE)
+
+
+def combo_keys(batch) -> np.ndarray:
+    """將 (M,6) 組合編碼為 int64 位元遮罩鍵（第 n 位代表號碼 n），與順序無關"""
+    b = np.take(_KEY_BITS, _as_batch(batch))
+    return b[:, 0] + b[:, 1] + b[:, 2] + b[:, 3] + b[:, 4] + b[:, 5]
+
+# --------- 號碼集合 ---------
+
+def _set_mask(definition) -> np.ndarray:
+    """集合定義 → 長度 50 的布林遮罩（索引 0 不用）"""
+    mask = np.zeros(MAX_NUMBER + 1, dtype=bool)
+    numbers = np.arange(MAX_NUMBER + 1)
+    if isinstance(definition, dict):
+        mask[1:] = True
+        if 'parity' in definition:
+            parity = definition['parity']
+            if parity not in ('odd', 'even'):
+                raise ValueError(f"未知的奇偶設定：{parity}")
+            mask &= (numbers % 2 == 1) if parity == 'odd' else (numbers % 2 == 0)
+        if 'tail' in definition:
+            mask &= np.isin(numbers % 10, list(definition['tail']))
+        if 'numbers' in definition:
+            mask &= np.isin(numbers, list(definition['numbers']))
+        unknown = set(definition) - {'parity', 'tail', 'numbers'}
+        if unknown:
+            raise ValueError(f"未知的集合欄位：{sorted(unknown)}")
+    else:
+        for n in definition:
+            if not 1 <= int(n) <= MAX_NUMBER:
+                raise ValueError(f"號碼超出範圍：{n}")
+            mask[int(n)] = True
+    mask[0] = False
+    return mask
+
+# --------- 規則編譯 ---------
+# 每個集合在計數表中佔 3 bit（6 顆號碼計數 ≤ 6 不會溢位），
+# 一次查表加總即可同時得到所有集合的計數。
+COUNT_BITS = 3
+# 計數規則只取決於打包後的計數值；總位元數不超過此上限時，
+# 編譯時先對所有可能的計數值求出結果表，檢查時只需一次查表
+LUT_MAX_BITS = 20
+# 整批檢查時每次處理的列數
+CHUNK_ROWS = 1 << 14
+
+
+def _count_table(masks: dict) -> tuple[np.ndarray, dict]:
+    if len(masks) * COUNT_BITS > 63:
+        raise ValueError(f"集合數量過多（上限 {63 // COUNT_BITS}）")
+    bits = len(masks) * COUNT_BITS
+    # 用最小可容納的整數型別，降低整批查表的記憶體頻寬
+    dtype = np.int16 if bits <= 15 else np.int32 if bits <= 31 else np.int64
+    table = np.zeros(MAX_NUMBER + 1, dtype=dtype)
+    shifts = {}
+    for k, (name, mask) in enumerate(masks.items()):
+        shifts[name] = k * COUNT_BITS
+        table += mask.astype(dtype) << dtype(shifts[name])
+    return table, shifts
+
+
+def _compile_count(rule: dict, shifts: dict):
+    name = rule['count']
+    if name not in shifts:
+        raise ValueError(f"規則引用未定義的集合：{name}")
+    shift = shifts[name]
+    allowed = None
+    if 'in' in rule:
+        allowed = np.zeros(1 << COUNT_BITS, dtype=bool)
+        allowed[list(rule['in'])] = True
+    lo = rule.get('min', 0)
+    hi = rule.get('max', TICKET_SIZE)
+
+    def predicate(batch: np.ndarray, packed: np.ndarray) -> np.ndarray:
+        c = (packed >> shift) & ((1 << COUNT_BITS) - 1)
+        ok = (c >= lo) & (c <= hi)
+        if allowed is not None:
+            ok &= allowed[c]
+        return ok
+    return predicate
+
+
+# 歷史鍵先以 2^20 格雜湊表過濾，僅命中者再做二分搜尋確認
+HASH_BITS = 20
+
+
+# 乘法雜湊（Fibonacci hashing）：取乘積的高 HASH_BITS 位
+HASH_MULT = np.uint64(0x9E3779B97F4A7C15)
+HASH_SHIFT = np.uint64(64 - HASH_BITS)
+
+
+def _hash_keys(k: np.ndarray) -> np.ndarray:
+    return (k.view(np.uint64) * HASH_MULT) >> HASH_SHIFT
+
+
+def _compile_history(history_keys):
+    keys = np.unique(np.asarray(history_keys if history_keys is not None else [], dtype=np.int64))
+    if keys.size == 0:
+        return lambda batch, packed: np.ones(len(batch), dtype=bool)
+    last = keys.size - 1
+    seen = np.zeros(1 << HASH_BITS, dtype=bool)
+    seen[_hash_keys(keys)] = True
+
+    def predicate(batch: np.ndarray, packed: np.ndarray) -> np.ndarray:
+        k = combo_keys(batch)
+        ok = np.ones(len(k), dtype=bool)
+        hit = np.flatnonzero(seen[_hash_keys(k)])
+        if hit.size:
+            pos = np.minimum(np.searchsorted(keys, k[hit]), last)
+            ok[hit] = keys[pos] != k[hit]
+        return ok
+    return predicate
+
+
+def _compile_rule(rule: dict, shifts: dict):
+    if 'count' in rule:
+        return _compile_count(rule, shifts)
+    if 'if' in rule:
+        cond = _compile_rule(rule['if'], shifts)
+        then = _compile_rule(rule['then'], shifts)
+        return lambda batch, packed: ~cond(batch, packed) | then(batch, packed)
+    raise ValueError(f"無法辨識的規則：{rule}")
+
+
+class RuleSet:
+    """已編譯的規則集合；呼叫時對整批組合回傳布林陣列"""
+
+    def __init__(self, spec: dict, table: np.ndarray, predicates: list, history=None,
+                 bits: int = 0):
+        self.spec = spec
+        self.table = table
+        self.predicates = predicates
+        self.history = history
+        self.lut = None
+        if bits <= LUT_MAX_BITS:
+            # 計數規則不看號碼本身（batch 傳 None），對每個可能的打包計數值預先求值
+            packed = np.arange(1 << bits, dtype=table.dtype)
+            self.lut = np.ones(packed.size, dtype=bool)
+            for pred in predicates:
+                self.lut &= pred(None, packed)
+
+    def __call__(self, batch) -> np.ndarray:
+        batch = _as_batch(batch)
+        if len(batch) <= CHUNK_ROWS:
+            return self._check(batch)
+        # 大批次分塊檢查，中間陣列留在 CPU 快取內
+        ok = np.empty(len(batch), dtype=bool)
+        for start in range(0, len(batch), CHUNK_ROWS):
+            ok[start:start + CHUNK_ROWS] = self._check(batch[start:start + CHUNK_ROWS])
+        return ok
+
+    def _check(self, batch: np.ndarray) -> np.ndarray:
+        t = np.take(self.table, batch)
+        packed = t[:, 0] + t[:, 1] + t[:, 2] + t[:, 3] + t[:, 4] + t[:, 5]
+        if self.lut is not None:
+            ok = self.lut[packed]
+        else:
+            ok = np.ones(len(batch), dtype=bool)
+            for pred in self.predicates:
+                ok &= pred(batch, packed)
+        # 歷史比對成本最高，只檢查通過其餘規則者
+        if self.history is not None:
+            idx = np.flatnonzero(ok)
+            if idx.size:
+                ok[idx] = self.history(batch[idx], packed[idx])
+        return ok
+
+
+def compile_rules(spec: dict, history_keys=None) -> RuleSet:
+    """編譯規則描述為 RuleSet；history_keys 為 combo_keys 編碼後的歷史組合"""
+    masks = {name: _set_mask(d) for name, d in spec.get('sets', {}).items()}
+    table, shifts = _count_table(masks)
+    rules = spec.get('rules', [])
+    predicates = [_compile_rule(r, shifts) for r in rules if not r.get('not_in_history')]
+    history = None
+    if any(r.get('not_in_history') for r in rules):
+        history = _compile_history(history_keys)
+    return RuleSet(spec, table, predicates, history, bits=len(masks) * COUNT_BITS)
+
+
+def load_rules(path: str) -> dict:
+    """讀取 JSON 或 YAML 規則檔"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("讀取 YAML 規則需安裝 PyYAML (pip install pyyaml)") from e
+            return yaml.safe_load(f)
+        return json.load(f)
+
+# 測試
+if __name__ == '__main__':
+    spec = {
+        'sets': {'odd': {'parity': 'odd'}, 'lucky': [6, 8, 9]},
+        'rules': [{'count': 'odd', 'in': [3, 4]}, {'count': 'lucky', 'min': 1}],
+    }
+    rs = compile_rules(spec)
+    print(rs([[1, 3, 5, 6, 10, 12], [2, 4, 10, 12, 14, 16]]))
@@ -0,0 +1,116 @@
+# startup_profiler.py
+"""
+啟動時間分析（all_gui 與各分頁引擎）
+
+功能：
+ 1. Timeline：程式內的階段計時（span / mark），all_gui 以 --profile 啟動時記錄
+    「模組載入 → 主視窗顯示」以及各分頁第一次開啟時載入引擎的時間
+ 2. parse_importtime：解析 `python -X importtime` 的輸出為 (模組, 自身 µs, 累計 µs, 深度)
+ 3. profile_imports：每個模組在全新的直譯器中以 -X importtime 載入，
+    回報總時間與自身耗時最高的子模組；CLI 依 all_gui 的分頁列出各分頁引擎的成本
+
+依賴：僅標準函式庫與 gui_tabs（all_gui 啟動時即載入，不可拖慢啟動）
+
+使用：
+    python startup_profiler.py                 # 主程式與各分頁引擎的 import 成本
+    python startup_profiler.py --top 15 mystic_predictor predict
+    python all_gui.py --profile                # 實際啟動計時（需 PySide6）
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from gui_tabs import TAB_ENGINES
+
+STARTUP_BUDGET_MS = 300.0
+
+# --------- 程式內計時 ---------
+
+class Timeline:
+    """記錄各階段耗時（毫秒）；停用時 span / mark 幾乎不花時間"""
+
+    def __init__(self, enabled: bool = False, origin: float | None = None):
+        self.enabled = enabled
+        self.origin = time.perf_counter() if origin is None else origin
+        self.events = []            # (名稱, 開始 ms, 耗時 ms)
+
+    @contextmanager
+    def span(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            t1 = time.perf_counter()
+            self.events.append((name, (t0 - self.origin) * 1000, (t1 - t0) * 1000))
+
+    def mark(self, name: str):
+        """記錄自 origin 起經過的時間點"""
+        if self.enabled:
+            self.events.append((name, (time.perf_counter() - self.origin) * 1000, 0.0))
+
+    def report(self) -> str:
+        lines = [f"{'階段':<28}{'起點 ms':>10}{'耗時 ms':>10}"]
+        for name, start, dur in self.events:
+            lines.append(f"{name:<30}{start:>10.1f}{dur:>10.1f}")
+        return '\n'.join(lines)
+
+# --------- -X importtime ---------
+
+def parse_importtime(text: str) -> list[tuple[str, int, int, int]]:
+    """解析 -X importtime 輸出 → [(模組, 自身 µs, 累計 µs, 巢狀深度)]"""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cum_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def profile_imports(module: str, python: str = sys.executable, cwd: str | None = None) -> dict:
+    """在全新直譯器中載入 module，回傳 {'module', 'total_ms', 'rows'}"""
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        err = proc.stderr.strip().splitlines()
+        raise RuntimeError(f"import {module} 失敗：{err[-1] if err else proc.returncode}")
+    rows = parse_importtime(proc.stderr)
+    total = next((cum for name, _, cum, depth in rows if name == module and depth == 0), 0)
+    return {'module': module, 'total_ms': total / 1000, 'rows': rows}
+
+
+def format_profile(result: dict, top: int = 10) -> str:
+    lines = [f"{result['module']}: {result['total_ms']:.1f} ms"]
+    for name, self_us, cum_us, _ in sorted(result['rows'], key=lambda r: -r[1])[:top]:
+        lines.append(f"  {name:<40}{self_us / 1000:>9.1f} ms（累計 {cum_us / 1000:.1f}）")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='all_gui 啟動與各分頁引擎的 import 成本')
+    parser.add_argument('modules', nargs='*', help='指定模組（預設：all_gui 與各分頁引擎）')
+    parser.add_argument('--top', type=int, default=8, help='每個模組列出自身耗時最高的子模組數')
+    a = parser.parse_args(argv)
+    targets = [(m, m) for m in a.modules] or \
+        [('主視窗', 'all_gui')] + [(f'分頁 {tab}', m) for tab, mods in TAB_ENGINES.items() for m in mods]
+    for label, module in targets:
+        try:
+            res = profile_imports(module)
+        except RuntimeError as e:
+            print(f"[{label}] {e}\n")
+            continue
+        note = ''
+        if module == 'all_gui':
+            note = '  ✓' if res['total_ms'] <= STARTUP_BUDGET_MS else f"  ✗ 超過 {STARTUP_BUDGET_MS:.0f} ms"
+        print(f"[{label}]{note} " + format_profile(res, a.top) + '\n')
+
+
+if __name__ == '__main__':
+    main()
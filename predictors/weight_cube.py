@@ -0,0 +1,161 @@
+# weight_cube.py
+"""
+逐時權重立方體（M4 延伸）
+
+功能：
+ 1. 將一段日期範圍內每小時的號碼權重預先算成 (小時數 × 49) float32 陣列
+ 2. 以 memory-mapped 檔案儲存，附時間索引（起始小時 + 小時數）
+ 3. 依時間切片為零複製的 memmap 視圖，可逐步往後延伸
+
+檔案：
+ - <path>.f32   原始 float32 資料，列為小時、欄為號碼 1–49
+ - <path>.json  {"kind", "start", "hours"}，start 為 UTC 整點 (ISO 格式)
+
+依賴：
+ - numpy
+ - mapping_engine.qimen_number_weights_batch / ziwei_number_weights_batch
+
+使用：
+    from weight_cube import WeightCube
+    cube = WeightCube.build('qimen_cube', '2020-01-01', '2030-01-01')
+    w = cube.slice('2025-05-01', '2025-05-02')   # (24, 49) memmap 視圖
+    cube.extend_to('2031-01-01')
+
+注意：立方體一律以 UTC 整點為索引；datetime 物件若為 naive 亦視為 UTC。
+"""
+import json
+import os
+import numpy as np
+from mapping_engine import qimen_number_weights_batch, ziwei_number_weights_batch
+
+N_NUMBERS = 49
+HOUR = np.timedelta64(1, 'h')
+# 每次計算的小時數上限（約一年），控制建表時的記憶體
+BUILD_CHUNK_HOURS = 24 * 366
+
+# 權重來源：輸入 datetime64[h] 陣列 (UTC)，回傳 (N,49)
+# 'ziwei' 為各整點的時盤（以該 UTC 時刻起盤，等同 ziwei_number_weights(當地時間, 時區)）
+WEIGHT_BUILDERS = {
+    'qimen': qimen_number_weights_batch,
+    'ziwei': lambda times: ziwei_number_weights_batch(times, 0.0),
+}
+
+
+def _hour(t) -> np.datetime64:
+    return np.datetime64(t, 'h')
+
+
+class WeightCube:
+    """以 memmap 存取的逐時權重表"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path + '.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.kind = meta['kind']
+        self.start = _hour(meta['start'])
+        self.hours = int(meta['hours'])
+        self._open()
+
+    # ---- 建立 / 延伸 ----
+    @classmethod
+    def build(cls, path: str, start, end, kind: str = 'qimen') -> 'WeightCube':
+        """建立 [start, end) 的立方體；已存在的檔案會被覆寫"""
+        if kind not in WEIGHT_BUILDERS:
+            raise ValueError(f"未知的權重種類：{kind}")
+        start = _hour(start)
+        open(path + '.f32', 'wb').close()
+        cls._write_meta(path, kind, start, 0)
+        cube = cls(path)
+        cube.extend_to(end)
+        return cube
+
+    @classmethod
+    def open_or_build(cls, path: str, start, end, kind: str = 'qimen') -> 'WeightCube':
+        """檔案存在則開啟並延伸到 end，否則新建"""
+        if os.path.exists(path + '.json'):
+            cube = cls(path)
+            if cube.kind != kind:
+                raise ValueError(f"{path} 為 {cube.kind} 權重，與要求的 {kind} 不符")
+            cube.extend_to(end)
+            return cube
+        return cls.build(path, start, end, kind)
+
+    def extend_to(self, end) -> int:
+        """往後補算到 end（不含），回傳新增的小時數
+
+        先將資料檔截斷到 meta 記載的小時數（清除上次中斷留下的孤兒列），
+        每寫完一塊即更新 meta，中途失敗時已完成的區塊仍有效。
+        """
+        end = _hour(end)
+        target = int((end - self.start) / HOUR)
+        added = 0
+        if target <= self.hours:
+            return added
+        builder = WEIGHT_BUILDERS[self.kind]
+        row_bytes = N_NUMBERS * np.dtype(np.float32).itemsize
+        try:
+            with open(self.path + '.f32', 'r+b') as f:
+                f.truncate(self.hours * row_bytes)
+                f.seek(self.hours * row_bytes)
+                while self.hours < target:
+                    n = min(BUILD_CHUNK_HOURS, target - self.hours)
+                    times = self.start + self.hours * HOUR + np.arange(n) * HOUR
+                    f.write(np.ascontiguousarray(builder(times), dtype=np.float32).tobytes())
+                    f.flush()
+                    self.hours += n
+                    added += n
+                    self._write_meta(self.path, self.kind, self.start, self.hours)
+        finally:
+            self._open()
+        return added
+
+    # ---- 查詢 ----
+    @property
+    def end(self) -> np.datetime64:
+        return self.start + self.hours * HOUR
+
+    def index(self, t) -> int:
+        """時間 → 列索引；超出範圍時丟出 KeyError"""
+        i = int((_hour(t) - self.start) / HOUR)
+        if not 0 <= i < self.hours:
+            raise KeyError(f"{t} 不在立方體範圍 [{self.start}, {self.end}) 內")
+        return i
+
+    def weights_at(self, t) -> np.ndarray:
+        return self.data[self.index(t)]
+
+    def slice(self, start, end) -> np.ndarray:
+        """[start, end) 的零複製視圖，範圍會被裁切到立方體內"""
+        i = max(int((_hour(start) - self.start) / HOUR), 0)
+        j = min(int((_hour(end) - self.start) / HOUR), self.hours)
+        return self.data[i:max(i, j)]
+
+    def times(self) -> np.ndarray:
+        return self.start + np.arange(self.hours) * HOUR
+
+    # ---- 內部 ----
+    def _open(self):
+        if self.hours:
+            self.data = np.memmap(self.path + '.f32', dtype=np.float32, mode='r',
+                                  shape=(self.hours, N_NUMBERS))
+        else:
+            self.data = np.empty((0, N_NUMBERS), dtype=np.float32)
+
+    @staticmethod
+    def _write_meta(path: str, kind: str, start: np.datetime64, hours: int):
+        tmp = path + '.json.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'kind': kind, 'start': str(start), 'hours': hours}, f)
+        os.replace(tmp, path + '.json')
+
+# 測試
+if __name__ == '__main__':
+    import tempfile, time
+    path = os.path.join(tempfile.gettempdir(), 'qimen_cube')
+    t = time.perf_counter()
+    cube = WeightCube.build(path, '2020-01-01', '2025-01-01')
+    print('build', cube.hours, 'hours', round(time.perf_counter() - t, 3), 's')
+    cube.extend_to('2026-01-01')
+    print('extended to', cube.end)
+    print(cube.slice('2025-05-01', '2025-05-02').shape)
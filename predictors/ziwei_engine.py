@@ -3,14 +3,14 @@
 紫微斗數排盤引擎（M2 完整版）
 
 功能：
- 1. 四柱八字計算（年、月、日、時柱）
+ 1. 四柱八字計算（年、月、日、時柱；另提供陣列批次版，以整數干支碼運算）
  2. 命宮、身宮定位（斗君起盤法）
  3. 14 主星排布（紫微至破軍）
  4. 四化（化祿、化權、化科、化忌）演算法
 
 依賴：
- - lunardate (農曆轉換)
- - swisseph (天文曆算)
+ - astronomical_core.solar_to_lunar / solar_to_lunar_array (農曆查表，內部使用 lunardate)
+ - numpy
 
 使用示例：
     from ziwei_engine import generate_chart
@@ -18,8 +18,9 @@
     print(chart)
 """
 from datetime import datetime, timedelta
-import swisseph as swe
-from lunardate import LunarDate
+import numpy as np
+from astronomical_core import solar_to_lunar, solar_to_lunar_array
+from metrics import timed
 
 # 干支常數
 HEAVENLY_STEMS = ['甲','乙','丙','丁','戊','己','庚','辛','壬','癸']
@@ -50,10 +51,13 @@ def get_month_pillar(year_stem: str, lunar_month: int) -> str:
     return m_stem + m_branch
 
 
+# 日柱偏移：int(儒略日 0h + 49) = 公曆序數 (date.toordinal) + DAY_CYCLE_OFFSET
+DAY_CYCLE_OFFSET = 1721473
+
+
 def get_day_pillar(dt: datetime) -> str:
     """計算日柱，根據儒略日對60天循環"""
-    jd = swe.julday(dt.year, dt.month, dt.day, 0)
-    idx = int(jd + 49) % 60
+    idx = (dt.toordinal() + DAY_CYCLE_OFFSET) % 60
     ds = HEAVENLY_STEMS[idx % 10]
     db = EARTHLY_BRANCHES[idx % 12]
     return ds + db
@@ -69,16 +73,66 @@ def get_hour_pillar(day_stem: str, hour: int) -> str:
 
 # --------------- 四柱八字 ---------------
 
+@timed('calculate_bazi')
 def calculate_bazi(dt: datetime, tz_offset: float = 8.0) -> dict:
     """計算年、月、日、時柱，返回字典"""
     local = dt - timedelta(hours=tz_offset)
-    ld = LunarDate.fromSolarDate(local.year, local.month, local.day)
+    ld = solar_to_lunar(local)
     year_p = get_year_pillar(ld.year)
     month_p = get_month_pillar(year_p[0], ld.month)
     day_p = get_day_pillar(local)
     hour_p = get_hour_pillar(day_p[0], local.hour)
     return {'year': year_p, 'month': month_p, 'day': day_p, 'hour': hour_p}
 
+# --------------- 四柱批次計算 ---------------
+PILLAR_NAMES = ('year', 'month', 'day', 'hour')
+# 1970-01-01 的公曆序數
+EPOCH_ORDINAL = 719163
+
+
+def calculate_bazi_codes(dts, tz_offset=8.0) -> np.ndarray:
+    """批次計算四柱，回傳形狀 (M, 4, 2) 的 int8 陣列
+
+    第二維依 PILLAR_NAMES 排列，最後一維為 (天干碼 0–9, 地支碼 0–11)。
+    dts: datetime 序列或 datetime64 陣列；tz_offset: 純量或與 dts 等長的陣列。
+    規則與 calculate_bazi 逐筆計算相同。
+    """
+    t = np.asarray(dts, dtype='datetime64[m]')
+    offset = np.round(np.asarray(tz_offset, dtype=float) * 60).astype('timedelta64[m]')
+    local = t - offset
+    day = local.astype('datetime64[D]')
+    days = day.astype(np.int64)
+    hour = (local - day).astype(np.int64) // 60
+
+    ly, lm, _, _ = solar_to_lunar_array(day)
+    year_idx = (ly - 1984) % 60
+    year_stem = year_idx % 10
+    day_idx = (days + EPOCH_ORDINAL + DAY_CYCLE_OFFSET) % 60
+    day_stem = day_idx % 10
+    hour_branch = ((hour + 1) // 2) % 12
+
+    codes = np.empty(t.shape + (4, 2), dtype=np.int8)
+    codes[..., 0, 0] = year_stem
+    codes[..., 0, 1] = year_idx % 12
+    codes[..., 1, 0] = (year_stem * 2 + lm - 2) % 10
+    codes[..., 1, 1] = (lm + 1) % 12
+    codes[..., 2, 0] = day_stem
+    codes[..., 2, 1] = day_idx % 12
+    codes[..., 3, 0] = (day_stem * 2 + hour_branch) % 10
+    codes[..., 3, 1] = hour_branch
+    return codes
+
+
+_STEM_ARR = np.array(HEAVENLY_STEMS)
+_BRANCH_ARR = np.array(EARTHLY_BRANCHES)
+
+
+def render_pillars(codes: np.ndarray) -> list[dict]:
+    """將 calculate_bazi_codes 的結果轉為 calculate_bazi 格式的字串字典"""
+    codes = np.asarray(codes).reshape(-1, 4, 2)
+    text = np.char.add(_STEM_ARR[codes[..., 0]], _BRANCH_ARR[codes[..., 1]])
+    return [dict(zip(PILLAR_NAMES, row)) for row in text.tolist()]
+
 # --------------- 宮位定位 ---------------
 
 def locate_palaces(pillars: dict) -> dict: